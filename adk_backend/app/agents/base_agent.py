@@ -2,45 +2,185 @@
 Base agent class for ADK meal planning agents
 """
 
+import asyncio
+import hashlib
+import json
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, TypeVar, Generic
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Type, TypeVar, Generic
 import structlog
-from app.core.config import Settings
+from pydantic import BaseModel, ValidationError
+from app.core.config import settings
+from app.core.model_client import gemini_client
+from app.core.cache import response_cache
+from app.core.hedging import LatencyTracker, hedged
+from app.core.structured_output import gemini_response_schema, parse_json_object, response_schema_hash
+from app.core.tracing import span
+from app.services.stage_graph import stage_time_left
+from app.core.metrics import (
+    AGENT_LATENCY, AGENT_IN_FLIGHT, COALESCED_REQUESTS, MOCK_FALLBACKS, JSON_PARSE_FAILURES, JSON_REPAIRS,
+    GEMINI_CALLS, GEMINI_HEDGES, GEMINI_TOKENS, LLM_CACHE_REQUESTS, MODEL_ROUTING
+)
 
 logger = structlog.get_logger(__name__)
-settings = Settings()
 
 T = TypeVar('T')  # Request type
 R = TypeVar('R')  # Response type
 
+# When set, agents skip Gemini and build their result from local fallbacks
+_local_fallback: ContextVar[bool] = ContextVar("local_fallback", default=False)
+
+@contextmanager
+def local_fallback() -> Iterator[None]:
+    """Make agents processing in the current context use their local fallbacks"""
+    token = _local_fallback.set(True)
+    try:
+        yield
+    finally:
+        _local_fallback.reset(token)
+
+class _InFlightCall:
+    """A running process call shared by identical concurrent requests"""
+    
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
 class BaseAgent(ABC, Generic[T, R]):
     """Base class for all ADK agents"""
     
+    # Set to False in agents whose responses must not be reused across requests
+    cache_responses: bool = True
+    # Set to False in agents whose identical concurrent requests must each run
+    coalesce_requests: bool = True
+    # Request fields ignored when matching in-flight requests (timestamps
+    # taken when the request was built differ between otherwise identical ones)
+    coalesce_exclude: frozenset = frozenset({"current_date"})
+    
     def __init__(
         self,
         name: str,
         model: str = None,
         temperature: float = None,
-        max_tokens: int = None
+        max_tokens: int = None,
+        fast_model: Optional[str] = None
     ):
         self.name = name
         self.model = model or settings.default_model
+        # Tried first for JSON output, escalating to self.model when it falls short
+        self.fast_model = fast_model if fast_model and fast_model != self.model else None
         self.temperature = temperature or settings.default_temperature
         self.max_tokens = max_tokens or settings.default_max_tokens
+        # Canonical request hash -> call running for it
+        self._in_flight: Dict[str, _InFlightCall] = {}
+        # Recent Gemini call latencies per model, used to decide when to hedge
+        self._call_latency: Dict[str, LatencyTracker] = {}
         
         logger.info(
             "Initializing agent",
             agent_name=self.name,
             model=self.model,
+            fast_model=self.fast_model,
             temperature=self.temperature,
             max_tokens=self.max_tokens
         )
+        
+        if not gemini_client.enabled:
+            logger.warning("Gemini API key not configured, using mock responses", agent_name=self.name)
     
-    @abstractmethod
     async def process(self, request: T) -> R:
-        """Process the request and return response"""
+        """Process the request and return response
+        
+        Identical requests arriving while one is being processed await that
+        call (single-flight) instead of making their own Gemini calls.
+        """
+        key = self._coalesce_key(request)
+        if key is None:
+            return await self._process_measured(request)
+        
+        call = self._in_flight.get(key)
+        if call is not None and (call.task.cancelled() or call.task.cancelling()):
+            # Being cancelled, but its done callback has not removed it yet
+            call = None
+        leader = call is None
+        if leader:
+            call = _InFlightCall(asyncio.ensure_future(self._process_measured(request)))
+            self._in_flight[key] = call
+            call.task.add_done_callback(lambda _: self._forget_call(key, call))
+        else:
+            COALESCED_REQUESTS.labels(agent=self.name).inc()
+            logger.debug("Coalesced identical in-flight request", agent_name=self.name)
+        
+        # A cancelled waiter leaves the shared call running for the others,
+        # and the call is only cancelled once nobody waits for it
+        call.waiters += 1
+        try:
+            response = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Forget it first, so a request arriving before the task has
+                # finished cancelling starts a new call instead of joining it
+                self._forget_call(key, call)
+                call.task.cancel()
+        
+        # Followers get their own copy, since callers may modify results
+        if not leader and isinstance(response, BaseModel):
+            return response.model_copy(deep=True)
+        return response
+    
+    def _coalesce_key(self, request: T) -> Optional[str]:
+        """Canonical hash of a request, or None if it should not be coalesced"""
+        if not (self.coalesce_requests and settings.request_coalescing):
+            return None
+        
+        if isinstance(request, BaseModel):
+            payload = request.model_dump(mode="json", exclude=set(self.coalesce_exclude))
+        else:
+            payload = request
+        try:
+            canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+        
+        # Calls running on local fallbacks produce different results
+        mode = "local" if _local_fallback.get() else "ai"
+        return f"{mode}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+    
+    def _forget_call(self, key: str, call: _InFlightCall) -> None:
+        """Remove a finished call so later requests start a new one"""
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+    
+    async def _process_measured(self, request: T) -> R:
+        """Process the request, recording agent metrics"""
+        if not self.ai_enabled:
+            self.record_fallback("local_fallback" if _local_fallback.get() else "disabled")
+        
+        outcome = "error"
+        start_time = time.perf_counter()
+        AGENT_IN_FLIGHT.labels(agent=self.name).inc()
+        try:
+            with span(f"agent.{self.name}", agent=self.name):
+                response = await self.process_request(request)
+            outcome = "success"
+            return response
+        finally:
+            AGENT_IN_FLIGHT.labels(agent=self.name).dec()
+            AGENT_LATENCY.labels(agent=self.name, outcome=outcome).observe(time.perf_counter() - start_time)
+    
+    @abstractmethod
+    async def process_request(self, request: T) -> R:
+        """Process the request and return response (implemented by each agent)"""
         pass
     
+    @property
+    def ai_enabled(self) -> bool:
+        """Whether to call Gemini rather than use the local fallback"""
+        return gemini_client.enabled and not _local_fallback.get()
+    
     @abstractmethod
     def get_system_prompt(self) -> str:
         """Get the system prompt for this agent"""
@@ -56,6 +196,260 @@ class BaseAgent(ABC, Generic[T, R]):
             "system_prompt": self.get_system_prompt()
         }
     
+    async def generate_text(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        accept: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """Send a prompt to Gemini through the shared non-blocking client
+        
+        With a response_model the call asks for JSON output, constrained to
+        the model's schema unless gemini_json_mode says otherwise. A fresh
+        response is cached only if accept (when given) approves it, so an
+        unusable answer is not replayed from the cache.
+        """
+        model = model or self.model
+        generation_config = self._json_generation_config(response_model)
+        
+        cache_key = None
+        if self.cache_responses:
+            cache_key = response_cache.make_key(
+                model,
+                self.temperature,
+                self.max_tokens,
+                prompt,
+                response_format=self._response_format(response_model)
+            )
+            cached = await response_cache.get(cache_key)
+            LLM_CACHE_REQUESTS.labels(agent=self.name, result="hit" if cached is not None else "miss").inc()
+            if cached is not None:
+                logger.debug("LLM response cache hit", agent_name=self.name, model=model)
+                return cached
+        
+        async def call() -> Any:
+            try:
+                with span("gemini.generate_content", agent=self.name, model=model, prompt_chars=len(prompt)) as call_span:
+                    response = await gemini_client.generate_content(
+                        prompt,
+                        model=model,
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                        request_options={"timeout": settings.gemini_request_timeout},
+                        generation_config=generation_config,
+                        # Time in the rate limiter's queue is not model latency
+                        on_call_time=self._latency_tracker(model).record
+                    )
+                    usage = getattr(response, "usage_metadata", None)
+                    if call_span is not None and usage is not None:
+                        call_span.set_attribute("prompt_tokens", getattr(usage, "prompt_token_count", 0) or 0)
+                        call_span.set_attribute("completion_tokens", getattr(usage, "candidates_token_count", 0) or 0)
+            except Exception:
+                GEMINI_CALLS.labels(agent=self.name, model=model, outcome="error").inc()
+                raise
+            GEMINI_CALLS.labels(agent=self.name, model=model, outcome="success").inc()
+            self._record_token_usage(model, response)
+            return response
+        
+        response = await hedged(
+            call,
+            self._hedge_delay(model),
+            self._record_hedge,
+            # A hedge would queue behind the calls already waiting for a slot
+            can_hedge=lambda: gemini_client.has_capacity(model)
+        )
+        text = response.text
+        
+        if cache_key and text and (accept is None or accept(text)):
+            await response_cache.set(cache_key, text)
+        
+        return text
+    
+    def _latency_tracker(self, model: str) -> LatencyTracker:
+        """Get the latency tracker of one model"""
+        tracker = self._call_latency.get(model)
+        if tracker is None:
+            tracker = self._call_latency[model] = LatencyTracker(
+                window=settings.gemini_hedge_window,
+                min_samples=settings.gemini_hedge_min_samples
+            )
+        return tracker
+    
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """How long a Gemini call may run before a duplicate is fired, if hedging"""
+        if not settings.gemini_hedging:
+            return None
+        delay = self._latency_tracker(model).percentile(settings.gemini_hedge_percentile)
+        if delay is None:
+            return None
+        return max(delay, settings.gemini_hedge_min_delay)
+    
+    def _record_hedge(self, winner: str) -> None:
+        """Count a fired hedge and which call won"""
+        GEMINI_HEDGES.labels(agent=self.name, winner=winner).inc()
+    
+    async def generate_json(
+        self,
+        prompt: str,
+        response_model: Type[BaseModel],
+        model: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Ask Gemini for a JSON object matching response_model
+        
+        Unless a model is given, the agent's fast model is tried first and the
+        call escalates to its main model when the fast model's output fails
+        schema validation or check_output_quality, unless the running stage
+        has less time left than a main-model call usually takes. Returns the
+        validated object as a dict, or None if the response could not be used
+        and the caller should fall back to its mock.
+        """
+        if model is None and self.fast_model and settings.model_routing:
+            data = None
+            try:
+                data, reason = await self._generate_checked(prompt, self.fast_model, response_model, check_quality=True)
+            except Exception as e:
+                logger.warning("Fast model call failed", agent_name=self.name, model=self.fast_model, error=str(e))
+                reason = "error"
+            
+            MODEL_ROUTING.labels(agent=self.name, model=self.fast_model, decision=reason).inc()
+            if reason == "accepted":
+                return data
+            
+            time_left = stage_time_left()
+            expected = self._latency_tracker(self.model).percentile(0.5) or settings.escalation_expected_latency
+            if time_left is not None and time_left < expected:
+                # The main model would not finish before the stage falls back anyway
+                MODEL_ROUTING.labels(agent=self.name, model=self.model, decision="skipped").inc()
+                logger.info(
+                    "Not escalating, stage budget too short",
+                    agent_name=self.name,
+                    model=self.model,
+                    reason=reason,
+                    time_left=round(time_left, 2),
+                    expected_latency=round(expected, 2)
+                )
+                return None
+            logger.info(
+                "Escalating to main model",
+                agent_name=self.name,
+                fast_model=self.fast_model,
+                model=self.model,
+                reason=reason
+            )
+        
+        model = model or self.model
+        data, reason = await self._generate_checked(prompt, model, response_model, check_quality=False)
+        MODEL_ROUTING.labels(agent=self.name, model=model, decision=reason).inc()
+        return data
+    
+    async def _generate_checked(
+        self,
+        prompt: str,
+        model: str,
+        response_model: Type[BaseModel],
+        check_quality: bool
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Generate JSON and judge it: "accepted", "schema" or "quality"
+        
+        Only accepted responses are cached, so a rejected one is not served
+        again to the identical requests that follow.
+        """
+        outcome: Dict[str, Any] = {}
+        
+        def accept(text: str) -> bool:
+            data = self.parse_json_response(text, response_model)
+            if data is None:
+                reason = "schema"
+            elif check_quality and not self.check_output_quality(data):
+                reason = "quality"
+            else:
+                reason = "accepted"
+            outcome.update(data=data, reason=reason)
+            return reason == "accepted"
+        
+        response_text = await self.generate_text(prompt, model=model, response_model=response_model, accept=accept)
+        if not outcome:
+            # Served from the cache, or empty
+            accept(response_text)
+        return outcome["data"] if outcome["reason"] == "accepted" else None, outcome["reason"]
+    
+    def check_output_quality(self, data: Dict[str, Any]) -> bool:
+        """Whether validated output from the fast model is good enough to use"""
+        # Override in subclasses with agent-specific checks
+        return True
+    
+    def _response_format(self, response_model: Optional[Type[BaseModel]]) -> str:
+        """Output format of a call, part of its cache key"""
+        if response_model is None or settings.gemini_json_mode == "off":
+            return "text"
+        if settings.gemini_json_mode == "schema":
+            return f"schema-{response_schema_hash(response_model)}"
+        return "json"
+    
+    def _json_generation_config(self, response_model: Optional[Type[BaseModel]]) -> Optional[Dict[str, Any]]:
+        """Per-call generation config requesting JSON output"""
+        if response_model is None or settings.gemini_json_mode == "off":
+            return None
+        
+        config: Dict[str, Any] = {"response_mime_type": "application/json"}
+        if settings.gemini_json_mode == "schema":
+            config["response_schema"] = gemini_response_schema(response_model)
+        return config
+    
+    def parse_json_response(
+        self,
+        response_text: Optional[str],
+        response_model: Optional[Type[BaseModel]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Extract the JSON object from a Gemini response, or None if there is none
+        
+        Tolerates surrounding prose, trailing commas and truncated output. With
+        a response_model the object is validated against it, and only the
+        fields Gemini actually returned are kept so agents' defaults still apply.
+        """
+        with span("json.parse", agent=self.name, chars=len(response_text or "")):
+            data, repaired = parse_json_object(response_text)
+        if data is None:
+            logger.warning("Failed to parse JSON response", agent_name=self.name)
+            JSON_PARSE_FAILURES.labels(agent=self.name, reason="unparseable").inc()
+            return None
+        
+        if repaired:
+            logger.info("Repaired malformed JSON response", agent_name=self.name)
+            JSON_REPAIRS.labels(agent=self.name).inc()
+        
+        if response_model is None:
+            return data
+        
+        try:
+            with span("pydantic.validate", agent=self.name, model=response_model.__name__):
+                validated = response_model.model_validate(data)
+        except ValidationError as e:
+            logger.warning(
+                "JSON response does not match schema",
+                agent_name=self.name,
+                errors=e.error_count()
+            )
+            JSON_PARSE_FAILURES.labels(agent=self.name, reason="schema_mismatch").inc()
+            return None
+        
+        return validated.model_dump(mode="json", exclude_unset=True, exclude_none=True)
+    
+    def record_fallback(self, reason: str) -> None:
+        """Count a result built from the agent's local mock instead of Gemini"""
+        MOCK_FALLBACKS.labels(agent=self.name, reason=reason).inc()
+    
+    def _record_token_usage(self, model: str, response: Any) -> None:
+        """Count the tokens reported in the response usage metadata"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        for kind, field in (("prompt", "prompt_token_count"), ("completion", "candidates_token_count")):
+            count = getattr(usage, field, 0) or 0
+            if count:
+                GEMINI_TOKENS.labels(agent=self.name, model=model, kind=kind).inc(count)
+    
     async def validate_request(self, request: T) -> None:
         """Validate the incoming request"""
         # Override in subclasses for specific validation
@@ -3,15 +3,13 @@ Cooking Optimization Agent using Google ADK
 Optimizes cooking process and timing
 """
 
-import google.generativeai as genai
 from typing import List, Dict, Any
-import json
 import structlog
 
 from app.agents.base_agent import BaseAgent
 from app.models.schemas import (
     MealItem, CookingOptimizationRequest, CookingOptimizationResult,
-    DifficultyLevel
+    DifficultyLevel, CookingOptimizationOutput
 )
 from app.core.exceptions import CookingOptimizationError
 from app.core.config import settings
@@ -25,15 +23,10 @@ class CookingOptimizationAgent(BaseAgent[CookingOptimizationRequest, CookingOpti
         super().__init__(
             name="cooking_optimization",
             model=settings.cooking_optimization_model,
+            fast_model=settings.cooking_optimization_fast_model,
             temperature=settings.cooking_optimization_temperature,
             max_tokens=settings.cooking_optimization_max_tokens
         )
-        
-        # Initialize Gemini
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-        else:
-            logger.warning("Gemini API key not configured, using mock responses")
     
     def get_system_prompt(self) -> str:
         """Get system prompt for cooking optimization"""
@@ -79,7 +72,7 @@ class CookingOptimizationAgent(BaseAgent[CookingOptimizationRequest, CookingOpti
 すべてのテキストは日本語で出力してください。
 """
     
-    async def process(self, request: CookingOptimizationRequest) -> CookingOptimizationResult:
+    async def process_request(self, request: CookingOptimizationRequest) -> CookingOptimizationResult:
         """Process cooking optimization request"""
         try:
             await self.validate_request(request)
@@ -92,7 +85,7 @@ class CookingOptimizationAgent(BaseAgent[CookingOptimizationRequest, CookingOpti
             )
             
             # Generate AI optimization
-            if settings.gemini_api_key:
+            if self.ai_enabled:
                 ai_optimization = await self._generate_ai_optimization(processed_request)
             else:
                 ai_optimization = self._get_mock_optimization(processed_request)
@@ -124,7 +117,7 @@ class CookingOptimizationAgent(BaseAgent[CookingOptimizationRequest, CookingOpti
             recipes_summary = []
             for recipe in request.recipes:
                 recipes_summary.append(
-                    f"- {recipe.name}: {recipe.cookingTime}分 ({recipe.difficulty.name})"
+                    f"- {recipe.name}: {recipe.cooking_time}分 ({recipe.difficulty.value})"
                 )
             
             max_time = request.constraints.get('max_cooking_time', 60)
@@ -177,38 +170,32 @@ class CookingOptimizationAgent(BaseAgent[CookingOptimizationRequest, CookingOpti
 すべてのテキストは日本語で出力してください。
 """
             
-            model = genai.GenerativeModel(self.model)
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=self.max_tokens,
-                )
-            )
-            
-            if response.text:
-                # Parse JSON response
-                json_start = response.text.find('{')
-                json_end = response.text.rfind('}') + 1
-                
-                if json_start != -1 and json_end > json_start:
-                    json_str = response.text[json_start:json_end]
-                    data = json.loads(json_str)
-                    
-                    # Validate and clean data
-                    return {
-                        'optimized_recipes': data.get('optimized_recipes', []),
-                        'cooking_schedule': data.get('cooking_schedule', []),
-                        'total_time': max(1, data.get('total_time', 30)),
-                        'efficiency_score': max(0, min(100, data.get('efficiency_score', 75)))
-                    }
+            data = await self.generate_json(prompt, CookingOptimizationOutput)
+            if data is not None:
+                # Validate and clean data
+                return {
+                    'optimized_recipes': data.get('optimized_recipes', []),
+                    'cooking_schedule': data.get('cooking_schedule', []),
+                    'total_time': max(1, data.get('total_time', 30)),
+                    'efficiency_score': max(0, min(100, data.get('efficiency_score', 75)))
+                }
             
+            self.record_fallback("parse_error")
             return self._get_mock_optimization(request)
             
         except Exception as e:
             logger.warning(f"Failed to generate AI cooking optimization: {e}")
+            self.record_fallback("error")
             return self._get_mock_optimization(request)
     
+    def check_output_quality(self, data: Dict[str, Any]) -> bool:
+        """Require optimized recipes and a schedule with a positive total time"""
+        return (
+            bool(data['optimized_recipes'])
+            and bool(data.get('cooking_schedule'))
+            and data.get('total_time', 1) > 0
+        )
+    
     def _get_mock_optimization(self, request: CookingOptimizationRequest) -> Dict[str, Any]:
         """Get mock optimization when AI is not available"""
         recipes = request.recipes
@@ -220,11 +207,11 @@ class CookingOptimizationAgent(BaseAgent[CookingOptimizationRequest, CookingOpti
         current_time = 0
         
         # Sort recipes by cooking time (longest first)
-        sorted_recipes = sorted(recipes, key=lambda r: r.cookingTime, reverse=True)
+        sorted_recipes = sorted(recipes, key=lambda r: r.cooking_time, reverse=True)
         
         for i, recipe in enumerate(sorted_recipes):
             # Reduce cooking time by 10-20%
-            optimized_time = max(5, int(recipe.cookingTime * 0.8))
+            optimized_time = max(5, int(recipe.cooking_time * 0.8))
             
             optimized_recipes.append({
                 "name": recipe.name,
@@ -250,7 +237,7 @@ class CookingOptimizationAgent(BaseAgent[CookingOptimizationRequest, CookingOpti
         total_time = max(recipe['optimized_cooking_time'] for recipe in optimized_recipes)
         
         # Calculate efficiency score
-        original_time = sum(recipe.cookingTime for recipe in recipes)
+        original_time = sum(recipe.cooking_time for recipe in recipes)
         efficiency_score = min(100, int((original_time - total_time) / original_time * 100 + 70))
         
         return {
@@ -270,13 +257,13 @@ class CookingOptimizationAgent(BaseAgent[CookingOptimizationRequest, CookingOpti
         
         for original_recipe, opt_data in zip(original_recipes, optimized_data):
             # Create optimized recipe
-            optimized_recipe = original_recipe.copyWith(
-                cookingTime=opt_data.get('optimized_cooking_time', original_recipe.cookingTime),
-                recipe=original_recipe.recipe.copyWith(
-                    cookingTime=opt_data.get('optimized_cooking_time', original_recipe.cookingTime),
-                    tips=original_recipe.recipe.tips + opt_data.get('cooking_tips', [])
-                )
-            )
+            optimized_recipe = original_recipe.model_copy(update={
+                'cooking_time': opt_data.get('optimized_cooking_time', original_recipe.cooking_time),
+                'recipe': original_recipe.recipe.model_copy(update={
+                    'cooking_time': opt_data.get('optimized_cooking_time', original_recipe.cooking_time),
+                    'tips': original_recipe.recipe.tips + opt_data.get('cooking_tips', [])
+                })
+            })
             
             optimized_recipes.append(optimized_recipe)
         
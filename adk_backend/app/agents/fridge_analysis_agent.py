@@ -0,0 +1,175 @@
+"""
+Fridge Analysis Agent using Google ADK
+Produces the ingredient analysis and the nutrition analysis in one Gemini call
+"""
+
+from typing import Any, Dict, List
+import structlog
+
+from app.agents.base_agent import BaseAgent
+from app.agents.ingredient_analysis_agent import (
+    analyze_products, build_ingredient_analysis, ingredients_summary,
+    recommendations_complete, mock_ingredient_recommendations
+)
+from app.agents.nutrition_balance_agent import (
+    estimate_basic_nutrition, build_nutrition_analysis, nutrition_context,
+    nutrition_output_complete, clean_nutrition_recommendations, mock_nutrition_recommendations
+)
+from app.models.schemas import (
+    Ingredient, UserPreferences, FridgeAnalysisRequest, FridgeAnalysisResult, FridgeAnalysisOutput
+)
+from app.core.exceptions import FridgeAnalysisError
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+class FridgeAnalysisAgent(BaseAgent[FridgeAnalysisRequest, FridgeAnalysisResult]):
+    """Agent for analyzing ingredients and nutrition balance together
+
+    Uses the prioritization, nutrition estimates and mock fallbacks of the
+    ingredient analysis and nutrition balance agent modules, so its results
+    are interchangeable with theirs.
+    """
+    
+    def __init__(self):
+        super().__init__(
+            name="fridge_analysis",
+            model=settings.fridge_analysis_model,
+            fast_model=settings.fridge_analysis_fast_model,
+            temperature=settings.fridge_analysis_temperature,
+            max_tokens=settings.fridge_analysis_max_tokens
+        )
+    
+    def get_system_prompt(self) -> str:
+        """Get system prompt for fridge analysis"""
+        return """
+あなたは冷蔵庫管理と栄養学の専門家です。
+以下の責任を持って食材と栄養バランスを分析してください：
+
+1. 賞味期限を考慮した食材の使用推奨事項
+2. 栄養バランスの評価
+3. 不足している栄養素の特定
+4. 健康的な献立のための推奨事項
+
+分析結果は以下の形式でJSON出力してください：
+{
+  "ingredient_recommendations": ["推奨事項1", "推奨事項2", "推奨事項3"],
+  "nutrition": {
+    "nutrition_score": 0-100の数値,
+    "recommended_nutrients": {"protein": 推奨タンパク質量(g), ...},
+    "warnings": ["警告事項リスト"],
+    "suggestions": ["改善提案リスト"]
+  }
+}
+
+すべてのテキストは日本語で出力してください。
+"""
+    
+    async def process_request(self, request: FridgeAnalysisRequest) -> FridgeAnalysisResult:
+        """Process fridge analysis request"""
+        try:
+            await self.validate_request(request)
+            processed_request = await self.preprocess_request(request)
+            
+            logger.info(
+                "Processing fridge analysis",
+                product_count=len(processed_request.products)
+            )
+            
+            analyzed_ingredients = analyze_products(processed_request.products)
+            basic_analysis = estimate_basic_nutrition(analyzed_ingredients)
+            
+            # One AI call for both sets of recommendations
+            ai_analysis = await self._generate_ai_analysis(
+                analyzed_ingredients,
+                processed_request.user_preferences,
+                basic_analysis
+            )
+            
+            # Split back into the results of the two original stages
+            result = FridgeAnalysisResult(
+                ingredient_analysis=build_ingredient_analysis(
+                    analyzed_ingredients,
+                    ai_analysis['ingredient_recommendations']
+                ),
+                nutrition_analysis=build_nutrition_analysis(ai_analysis['nutrition'])
+            )
+            
+            return await self.postprocess_response(result)
+        
+        except Exception as e:
+            await self.handle_error(e, request)
+            raise FridgeAnalysisError(f"Failed to analyze fridge: {str(e)}")
+    
+    async def _generate_ai_analysis(
+        self,
+        ingredients: List[Ingredient],
+        user_preferences: UserPreferences,
+        basic_analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Generate ingredient and nutrition recommendations in one call"""
+        if not self.ai_enabled:
+            return self._get_mock_analysis(ingredients, basic_analysis)
+        
+        try:
+            prompt = f"""
+以下の冷蔵庫の食材とユーザー設定を基に、食材の使用推奨事項と栄養バランスを分析してください：
+
+【食材リスト】
+{ingredients_summary(ingredients, agent=self.name)}
+
+{nutrition_context(user_preferences, basic_analysis)}
+
+以下の形式でJSON出力してください：
+{{
+  "ingredient_recommendations": [
+    "推奨事項1",
+    "推奨事項2",
+    "推奨事項3"
+  ],
+  "nutrition": {{
+    "nutrition_score": 0-100の数値,
+    "recommended_nutrients": {{
+      "protein": 推奨タンパク質量(g),
+      "carbohydrates": 推奨炭水化物量(g),
+      "fat": 推奨脂質量(g),
+      "fiber": 推奨食物繊維量(g)
+    }},
+    "warnings": ["警告事項リスト"],
+    "suggestions": ["改善提案リスト"]
+  }}
+}}
+
+食材の使用推奨事項は、賞味期限の近い食材を優先した具体的で実用的なアドバイスを3つ提案してください。
+栄養スコアは、現在の食材で達成可能な栄養バランスを0-100で評価してください。
+すべてのテキストは日本語で出力してください。
+"""
+            
+            data = await self.generate_json(prompt, FridgeAnalysisOutput)
+            if data is not None:
+                return {
+                    'ingredient_recommendations': data.get('ingredient_recommendations', []),
+                    'nutrition': clean_nutrition_recommendations(data['nutrition'])
+                }
+            
+            self.record_fallback("parse_error")
+            return self._get_mock_analysis(ingredients, basic_analysis)
+        
+        except Exception as e:
+            logger.warning(f"Failed to generate AI fridge analysis: {e}")
+            self.record_fallback("error")
+            return self._get_mock_analysis(ingredients, basic_analysis)
+    
+    def check_output_quality(self, data: Dict[str, Any]) -> bool:
+        """Apply the ingredient and nutrition agents' checks to their parts"""
+        return (
+            recommendations_complete(data['ingredient_recommendations'])
+            and nutrition_output_complete(data['nutrition'])
+        )
+    
+    def _get_mock_analysis(self, ingredients: List[Ingredient], basic_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Get mock analysis when AI is not available"""
+        return {
+            'ingredient_recommendations': mock_ingredient_recommendations(ingredients),
+            'nutrition': mock_nutrition_recommendations(ingredients, basic_analysis)
+        }
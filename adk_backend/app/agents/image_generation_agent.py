@@ -3,7 +3,6 @@ Image Generation Agent using Google Imagen
 Generates images for menu items
 """
 
-import google.generativeai as genai
 from typing import List, Dict, Any
 import structlog
 import time
@@ -17,6 +16,9 @@ from app.core.config import settings
 
 logger = structlog.get_logger(__name__)
 
+# Imagen cannot rewrite prompts, so prompt optimization uses a text model
+PROMPT_OPTIMIZATION_MODEL = "gemini-1.5-pro"
+
 class ImageGenerationAgent(BaseAgent[ImageGenerationRequest, ImageGenerationResult]):
     """Agent for generating images for menu items using Google Imagen"""
     
@@ -27,12 +29,6 @@ class ImageGenerationAgent(BaseAgent[ImageGenerationRequest, ImageGenerationResu
             temperature=settings.image_generation_temperature,
             max_tokens=settings.image_generation_max_tokens
         )
-        
-        # Initialize Google Generative AI (Imagen)
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-        else:
-            logger.warning("Gemini API key not configured, using mock responses")
     
     def get_system_prompt(self) -> str:
         """Get system prompt for image generation"""
@@ -57,7 +53,7 @@ class ImageGenerationAgent(BaseAgent[ImageGenerationRequest, ImageGenerationResu
 Google Imagenを使用して高品質な料理画像を生成してください。
 """
     
-    async def process(self, request: ImageGenerationRequest) -> ImageGenerationResult:
+    async def process_request(self, request: ImageGenerationRequest) -> ImageGenerationResult:
         """Process image generation request"""
         try:
             await self.validate_request(request)
@@ -69,7 +65,7 @@ Google Imagenを使用して高品質な料理画像を生成してください
             )
             
             # Generate images
-            if settings.openai_api_key:
+            if self.ai_enabled:
                 ai_images = await self._generate_ai_images(processed_request)
             else:
                 ai_images = self._get_mock_images(processed_request)
@@ -146,6 +142,7 @@ Google Imagenを使用して高品質な料理画像を生成してください
             
         except Exception as e:
             logger.warning(f"Failed to generate AI images: {e}")
+            self.record_fallback("error")
             return self._get_mock_images(request)
     
     def _create_image_prompt(
@@ -196,7 +193,7 @@ Avoid: artificial lighting, overly processed look, cluttered background, poor co
     async def _optimize_prompt_for_imagen(self, prompt: str) -> str:
         """Gemini APIを使用してImagen用のプロンプトを最適化"""
         try:
-            if not settings.gemini_api_key:
+            if not self.ai_enabled:
                 return prompt
             
             optimization_prompt = f"""
@@ -214,16 +211,16 @@ Avoid: artificial lighting, overly processed look, cluttered background, poor co
 改善されたプロンプトを返してください：
 """
             
-            model = genai.GenerativeModel('gemini-1.5-pro')
-            response = model.generate_content(optimization_prompt)
+            response_text = await self.generate_text(optimization_prompt, model=PROMPT_OPTIMIZATION_MODEL)
             
-            if response.text:
-                return response.text.strip()
+            if response_text:
+                return response_text.strip()
             else:
                 return prompt
                 
         except Exception as e:
             logger.warning(f"Failed to optimize prompt: {e}")
+            self.record_fallback("error")
             return prompt
     
     def _generate_imagen_url(self, prompt: str) -> str:
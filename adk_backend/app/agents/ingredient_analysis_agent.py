@@ -3,38 +3,36 @@ Ingredient Analysis Agent using Google ADK
 Analyzes refrigerator ingredients and determines priorities
 """
 
-import google.generativeai as genai
 from typing import List, Dict, Any
-import json
 import structlog
 from datetime import datetime
 
 from app.agents.base_agent import BaseAgent
 from app.models.schemas import (
     Product, Ingredient, IngredientAnalysisRequest, 
-    IngredientAnalysisResult, ExpiryPriority
+    IngredientAnalysisResult, ExpiryPriority, IngredientRecommendationsOutput
 )
 from app.core.exceptions import IngredientAnalysisError
 from app.core.config import settings
+from app.core.prompt_builder import build_ingredient_section
 
 logger = structlog.get_logger(__name__)
 
 class IngredientAnalysisAgent(BaseAgent[IngredientAnalysisRequest, IngredientAnalysisResult]):
-    """Agent for analyzing refrigerator ingredients"""
+    """Agent for analyzing refrigerator ingredients
+
+    The prioritization, prompt and fallback helpers are module-level
+    functions, shared with the fused fridge analysis agent.
+    """
     
     def __init__(self):
         super().__init__(
             name="ingredient_analysis",
             model=settings.ingredient_analysis_model,
+            fast_model=settings.ingredient_analysis_fast_model,
             temperature=settings.ingredient_analysis_temperature,
             max_tokens=settings.ingredient_analysis_max_tokens
         )
-        
-        # Initialize Gemini
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-        else:
-            logger.warning("Gemini API key not configured, using mock responses")
     
     def get_system_prompt(self) -> str:
         """Get system prompt for ingredient analysis"""
@@ -76,7 +74,7 @@ class IngredientAnalysisAgent(BaseAgent[IngredientAnalysisRequest, IngredientAna
 すべてのテキストは日本語で出力してください。
 """
     
-    async def process(self, request: IngredientAnalysisRequest) -> IngredientAnalysisResult:
+    async def process_request(self, request: IngredientAnalysisRequest) -> IngredientAnalysisResult:
         """Process ingredient analysis request"""
         try:
             await self.validate_request(request)
@@ -88,18 +86,13 @@ class IngredientAnalysisAgent(BaseAgent[IngredientAnalysisRequest, IngredientAna
             )
             
             # Convert products to ingredients with priority analysis
-            analyzed_ingredients = await self._analyze_ingredients(processed_request.products)
+            analyzed_ingredients = analyze_products(processed_request.products)
             
             # Generate AI recommendations
             ai_recommendations = await self._generate_ai_recommendations(analyzed_ingredients)
             
             # Create result
-            result = IngredientAnalysisResult(
-                analyzed_ingredients=analyzed_ingredients,
-                priority_ingredients=[ing for ing in analyzed_ingredients if ing.priority in [ExpiryPriority.URGENT, ExpiryPriority.SOON]],
-                expiring_soon=[ing for ing in analyzed_ingredients if ing.priority == ExpiryPriority.URGENT],
-                recommendations=ai_recommendations
-            )
+            result = build_ingredient_analysis(analyzed_ingredients, ai_recommendations)
             
             return await self.postprocess_response(result)
             
@@ -107,93 +100,17 @@ class IngredientAnalysisAgent(BaseAgent[IngredientAnalysisRequest, IngredientAna
             await self.handle_error(e, request)
             raise IngredientAnalysisError(f"Failed to analyze ingredients: {str(e)}")
     
-    async def _analyze_ingredients(self, products: List[Product]) -> List[Ingredient]:
-        """Analyze products and convert to ingredients with priorities"""
-        ingredients = []
-        
-        for product in products:
-            # Determine expiry priority
-            priority = self._determine_expiry_priority(product.days_until_expiry)
-            
-            # Translate category to Japanese
-            category = self._translate_category(product.category)
-            
-            ingredient = Ingredient(
-                name=product.name,
-                quantity=str(product.quantity),
-                unit=product.unit,
-                available=True,
-                expiry_date=product.expiry_date,
-                shopping_required=False,
-                product_id=product.id,
-                priority=priority,
-                category=category,
-                image_url=product.current_image_url,
-                notes=f"賞味期限まで{product.days_until_expiry}日"
-            )
-            
-            ingredients.append(ingredient)
-        
-        # Sort by priority
-        ingredients.sort(key=lambda x: x.priority_score)
-        
-        return ingredients
-    
-    def _determine_expiry_priority(self, days_until_expiry: int) -> ExpiryPriority:
-        """Determine expiry priority based on days until expiry"""
-        if days_until_expiry <= 0:
-            return ExpiryPriority.URGENT
-        elif days_until_expiry <= 1:
-            return ExpiryPriority.URGENT
-        elif days_until_expiry <= 3:
-            return ExpiryPriority.SOON
-        elif days_until_expiry <= 7:
-            return ExpiryPriority.FRESH
-        else:
-            return ExpiryPriority.LONG_TERM
-    
-    def _translate_category(self, category: str) -> str:
-        """Translate category to Japanese"""
-        category_map = {
-            'vegetables': '野菜',
-            'fruits': '果物',
-            'meat': '肉',
-            'fish': '魚',
-            'dairy': '乳製品',
-            'grains': '主食',
-            'seasonings': '調味料',
-            'beverages': '飲み物',
-            'snacks': 'お菓子',
-            'frozen': '冷凍食品',
-        }
-        
-        return category_map.get(category.lower(), category)
-    
     async def _generate_ai_recommendations(self, ingredients: List[Ingredient]) -> List[str]:
         """Generate AI recommendations for ingredient usage"""
-        if not settings.gemini_api_key:
-            return self._get_mock_recommendations(ingredients)
+        if not self.ai_enabled:
+            return mock_ingredient_recommendations(ingredients)
         
         try:
-            # Create ingredients summary
-            ingredients_summary = []
-            for ingredient in ingredients:
-                priority_text = ""
-                if ingredient.priority == ExpiryPriority.URGENT:
-                    priority_text = "[緊急]"
-                elif ingredient.priority == ExpiryPriority.SOON:
-                    priority_text = "[期限間近]"
-                
-                ingredients_summary.append(
-                    f"{priority_text}{ingredient.name} {ingredient.quantity}{ingredient.unit} "
-                    f"(賞味期限まで{ingredient.notes.split('まで')[1].split('日')[0]}日)"
-                )
-            
             prompt = f"""
 以下の冷蔵庫の食材を分析して、使用推奨事項を3つ提案してください：
 
 食材リスト：
-{chr(10).join(ingredients_summary)}
+{ingredients_summary(ingredients, agent=self.name)}
 
 以下の形式でJSON出力してください：
 {{
@@ -207,44 +124,129 @@ class IngredientAnalysisAgent(BaseAgent[IngredientAnalysisRequest, IngredientAna
 推奨事項は具体的で実用的なアドバイスを日本語で提供してください。
 """
             
-            model = genai.GenerativeModel(self.model)
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=self.max_tokens,
-                )
-            )
-            
-            if response.text:
-                # Parse JSON response
-                json_start = response.text.find('{')
-                json_end = response.text.rfind('}') + 1
-                
-                if json_start != -1 and json_end > json_start:
-                    json_str = response.text[json_start:json_end]
-                    data = json.loads(json_str)
-                    return data.get('recommendations', [])
+            data = await self.generate_json(prompt, IngredientRecommendationsOutput)
+            if data is not None:
+                return data.get('recommendations', [])
             
-            return self._get_mock_recommendations(ingredients)
+            self.record_fallback("parse_error")
+            return mock_ingredient_recommendations(ingredients)
             
         except Exception as e:
             logger.warning(f"Failed to generate AI recommendations: {e}")
-            return self._get_mock_recommendations(ingredients)
+            self.record_fallback("error")
+            return mock_ingredient_recommendations(ingredients)
     
-    def _get_mock_recommendations(self, ingredients: List[Ingredient]) -> List[str]:
-        """Get mock recommendations when AI is not available"""
-        urgent_count = len([ing for ing in ingredients if ing.priority == ExpiryPriority.URGENT])
-        soon_count = len([ing for ing in ingredients if ing.priority == ExpiryPriority.SOON])
-        
-        recommendations = []
+    def check_output_quality(self, data: Dict[str, Any]) -> bool:
+        """Require the three recommendations the prompt asks for"""
+        return recommendations_complete(data.get('recommendations', []))
+
+def analyze_products(products: List[Product]) -> List[Ingredient]:
+    """Analyze products and convert to ingredients with priorities"""
+    ingredients = []
+    
+    for product in products:
+        # Determine expiry priority
+        priority = determine_expiry_priority(product.days_until_expiry)
         
-        if urgent_count > 0:
-            recommendations.append(f"期限切れ間近の食材{urgent_count}個を最優先で使用してください")
+        # Translate category to Japanese
+        category = translate_category(product.category)
         
-        if soon_count > 0:
-            recommendations.append(f"2-3日以内に期限切れの食材{soon_count}個の調理を計画してください")
+        ingredient = Ingredient(
+            name=product.name,
+            quantity=str(product.quantity),
+            unit=product.unit,
+            available=True,
+            expiry_date=product.expiry_date,
+            shopping_required=False,
+            product_id=product.id,
+            priority=priority,
+            category=category,
+            image_url=product.current_image_url,
+            notes=f"賞味期限まで{product.days_until_expiry}日"
+        )
         
-        recommendations.append("栄養バランスを考慮して野菜とタンパク質を組み合わせた献立を提案します")
+        ingredients.append(ingredient)
+    
+    # Sort by priority
+    ingredients.sort(key=lambda x: x.priority_score)
+    
+    return ingredients
+
+def determine_expiry_priority(days_until_expiry: int) -> ExpiryPriority:
+    """Determine expiry priority based on days until expiry"""
+    if days_until_expiry <= 0:
+        return ExpiryPriority.URGENT
+    elif days_until_expiry <= 1:
+        return ExpiryPriority.URGENT
+    elif days_until_expiry <= 3:
+        return ExpiryPriority.SOON
+    elif days_until_expiry <= 7:
+        return ExpiryPriority.FRESH
+    else:
+        return ExpiryPriority.LONG_TERM
+
+def translate_category(category: str) -> str:
+    """Translate category to Japanese"""
+    category_map = {
+        'vegetables': '野菜',
+        'fruits': '果物',
+        'meat': '肉',
+        'fish': '魚',
+        'dairy': '乳製品',
+        'grains': '主食',
+        'seasonings': '調味料',
+        'beverages': '飲み物',
+        'snacks': 'お菓子',
+        'frozen': '冷凍食品',
+    }
+    
+    return category_map.get(category.lower(), category)
+
+def build_ingredient_analysis(analyzed_ingredients: List[Ingredient], recommendations: List[str]) -> IngredientAnalysisResult:
+    """Create the analysis result from prioritized ingredients and recommendations"""
+    return IngredientAnalysisResult(
+        analyzed_ingredients=analyzed_ingredients,
+        priority_ingredients=[ing for ing in analyzed_ingredients if ing.priority in [ExpiryPriority.URGENT, ExpiryPriority.SOON]],
+        expiring_soon=[ing for ing in analyzed_ingredients if ing.priority == ExpiryPriority.URGENT],
+        recommendations=recommendations
+    )
+
+def ingredients_summary(ingredients: List[Ingredient], agent: str) -> str:
+    """Describe the most urgent ingredients with their days until expiry for a prompt
+
+    agent is the agent whose prompt metrics count the section.
+    """
+    def describe(ingredient: Ingredient) -> str:
+        priority_text = ""
+        if ingredient.priority == ExpiryPriority.URGENT:
+            priority_text = "[緊急]"
+        elif ingredient.priority == ExpiryPriority.SOON:
+            priority_text = "[期限間近]"
         
-        return recommendations
+        return (
+            f"{priority_text}{ingredient.name} {ingredient.quantity}{ingredient.unit} "
+            f"(賞味期限まで{ingredient.notes.split('まで')[1].split('日')[0]}日)"
+        )
+    
+    return build_ingredient_section(ingredients, describe, agent=agent).text
+
+def recommendations_complete(recommendations: List[str]) -> bool:
+    """Whether there are the three recommendations the prompts ask for"""
+    return len([r for r in recommendations if r.strip()]) >= 3
+
+def mock_ingredient_recommendations(ingredients: List[Ingredient]) -> List[str]:
+    """Get mock recommendations when AI is not available"""
+    urgent_count = len([ing for ing in ingredients if ing.priority == ExpiryPriority.URGENT])
+    soon_count = len([ing for ing in ingredients if ing.priority == ExpiryPriority.SOON])
+    
+    recommendations = []
+    
+    if urgent_count > 0:
+        recommendations.append(f"期限切れ間近の食材{urgent_count}個を最優先で使用してください")
+    
+    if soon_count > 0:
+        recommendations.append(f"2-3日以内に期限切れの食材{soon_count}個の調理を計画してください")
+    
+    recommendations.append("栄養バランスを考慮して野菜とタンパク質を組み合わせた献立を提案します")
+    
+    return recommendations
@@ -3,16 +3,15 @@ Meal Theme Agent using Google ADK
 Determines meal theme and creates unified meal plan
 """
 
-import google.generativeai as genai
 from typing import List, Dict, Any
-import json
 import structlog
 from datetime import datetime
 
 from app.agents.base_agent import BaseAgent
 from app.models.schemas import (
     MealItem, UserPreferences, MealThemeRequest, MealThemeResult,
-    MealPlan, MealPlanStatus, DifficultyLevel
+    MealPlan, MealPlanStatus, DifficultyLevel, MealThemeOutput,
+    normalize_confidence, normalize_score, normalize_minutes, normalize_iso_date
 )
 from app.core.exceptions import MealThemeError
 from app.core.config import settings
@@ -26,15 +25,10 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
         super().__init__(
             name="meal_theme",
             model=settings.meal_theme_model,
+            fast_model=settings.meal_theme_fast_model,
             temperature=settings.meal_theme_temperature,
             max_tokens=settings.meal_theme_max_tokens
         )
-        
-        # Initialize Gemini
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-        else:
-            logger.warning("Gemini API key not configured, using mock responses")
     
     def get_system_prompt(self) -> str:
         """Get system prompt for meal theme determination"""
@@ -82,7 +76,7 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
 すべてのテキストは日本語で出力してください。
 """
     
-    async def process(self, request: MealThemeRequest) -> MealThemeResult:
+    async def process_request(self, request: MealThemeRequest) -> MealThemeResult:
         """Process meal theme determination request"""
         try:
             await self.validate_request(request)
@@ -94,7 +88,7 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
             )
             
             # Generate AI theme determination
-            if settings.gemini_api_key:
+            if self.ai_enabled:
                 ai_theme = await self._generate_ai_theme(processed_request)
             else:
                 ai_theme = self._get_mock_theme(processed_request)
@@ -126,13 +120,13 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
             recipes_summary = []
             for recipe in request.recipes:
                 recipes_summary.append(
-                    f"- {recipe.name}: {recipe.description} ({recipe.cookingTime}分)"
+                    f"- {recipe.name}: {recipe.description} ({recipe.cooking_time}分)"
                 )
             
             # Create user preferences summary
             preferences_text = f"""
 - 最大調理時間: {request.user_preferences.max_cooking_time}分
-- 難易度: {request.user_preferences.preferred_difficulty.name}
+- 難易度: {request.user_preferences.preferred_difficulty.value}
 - 好みの料理ジャンル: {', '.join(request.user_preferences.preferred_cuisines)}
 - 食事制限: {', '.join(request.user_preferences.dietary_restrictions)}
 """
@@ -213,42 +207,32 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
 すべてのテキストは日本語で出力してください。
 """
             
-            model = genai.GenerativeModel(self.model)
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=self.max_tokens,
-                )
-            )
-            
-            if response.text:
-                # Parse JSON response
-                json_start = response.text.find('{')
-                json_end = response.text.rfind('}') + 1
-                
-                if json_start != -1 and json_end > json_start:
-                    json_str = response.text[json_start:json_end]
-                    data = json.loads(json_str)
-                    
-                    # Validate and clean data
-                    return {
-                        'theme_name': data.get('theme_name', '統一献立テーマ'),
-                        'theme_description': data.get('theme_description', 'バランスの取れた献立'),
-                        'unified_meal_plan': data.get('unified_meal_plan', {}),
-                        'visual_style': data.get('visual_style', {
-                            'color_palette': ['緑', '白', '茶'],
-                            'mood': '家庭的な雰囲気',
-                            'presentation_style': 'シンプルで温かみのある盛り付け'
-                        })
-                    }
+            data = await self.generate_json(prompt, MealThemeOutput)
+            if data is not None:
+                # Validate and clean data
+                return {
+                    'theme_name': data.get('theme_name', '統一献立テーマ'),
+                    'theme_description': data.get('theme_description', 'バランスの取れた献立'),
+                    'unified_meal_plan': data.get('unified_meal_plan', {}),
+                    'visual_style': data.get('visual_style', {
+                        'color_palette': ['緑', '白', '茶'],
+                        'mood': '家庭的な雰囲気',
+                        'presentation_style': 'シンプルで温かみのある盛り付け'
+                    })
+                }
             
+            self.record_fallback("parse_error")
             return self._get_mock_theme(request)
             
         except Exception as e:
             logger.warning(f"Failed to generate AI meal theme: {e}")
+            self.record_fallback("error")
             return self._get_mock_theme(request)
     
+    def check_output_quality(self, data: Dict[str, Any]) -> bool:
+        """Require a theme name and the unified meal plan"""
+        return bool(data['theme_name'].strip()) and 'unified_meal_plan' in data
+    
     def _get_mock_theme(self, request: MealThemeRequest) -> Dict[str, Any]:
         """Get mock theme when AI is not available"""
         recipes = request.recipes
@@ -269,7 +253,7 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
             theme_description = f"{season}の食材を活かした温かみのある家庭料理"
         
         # Calculate total cooking time and difficulty
-        total_time = sum(recipe.cookingTime for recipe in recipes)
+        total_time = sum(recipe.cooking_time for recipe in recipes)
         avg_difficulty = sum(self._difficulty_to_score(recipe.difficulty) for recipe in recipes) / len(recipes)
         overall_difficulty = self._score_to_difficulty(avg_difficulty)
         
@@ -281,29 +265,29 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
             "main_dish": {
                 "name": recipes[0].name if len(recipes) > 0 else "主菜",
                 "description": f"{theme_name}に合わせて調整された{recipes[0].description if len(recipes) > 0 else '主菜'}",
-                "cooking_time": recipes[0].cookingTime if len(recipes) > 0 else 20,
-                "difficulty": overall_difficulty.name
+                "cooking_time": recipes[0].cooking_time if len(recipes) > 0 else 20,
+                "difficulty": overall_difficulty.value
             },
             "side_dish": {
                 "name": recipes[1].name if len(recipes) > 1 else "副菜",
                 "description": f"{theme_name}に合わせて調整された{recipes[1].description if len(recipes) > 1 else '副菜'}",
-                "cooking_time": recipes[1].cookingTime if len(recipes) > 1 else 15,
-                "difficulty": overall_difficulty.name
+                "cooking_time": recipes[1].cooking_time if len(recipes) > 1 else 15,
+                "difficulty": overall_difficulty.value
             },
             "soup": {
                 "name": recipes[2].name if len(recipes) > 2 else "汁物",
                 "description": f"{theme_name}に合わせて調整された{recipes[2].description if len(recipes) > 2 else '汁物'}",
-                "cooking_time": recipes[2].cookingTime if len(recipes) > 2 else 10,
-                "difficulty": overall_difficulty.name
+                "cooking_time": recipes[2].cooking_time if len(recipes) > 2 else 10,
+                "difficulty": overall_difficulty.value
             },
             "rice": {
                 "name": recipes[3].name if len(recipes) > 3 else "主食",
                 "description": f"{theme_name}に合わせて調整された{recipes[3].description if len(recipes) > 3 else '主食'}",
-                "cooking_time": recipes[3].cookingTime if len(recipes) > 3 else 30,
-                "difficulty": overall_difficulty.name
+                "cooking_time": recipes[3].cooking_time if len(recipes) > 3 else 30,
+                "difficulty": overall_difficulty.value
             },
             "total_cooking_time": total_time,
-            "difficulty": overall_difficulty.name,
+            "difficulty": overall_difficulty.value,
             "nutrition_score": 85,
             "confidence": 0.8
         }
@@ -361,20 +345,24 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
         # This is a simplified implementation
         # In a real system, you would create new MealItem instances based on the unified data
         
+        # Model output may carry a free-form date or out-of-range numbers
+        # (e.g. a confidence of 85); fit them to what MealPlan accepts
+        plan_date = normalize_iso_date(unified_data.get('date'))
+        
         return MealPlan(
-            householdId=unified_data.get('household_id', 'household_123'),
-            date=datetime.fromisoformat(unified_data.get('date', datetime.now().isoformat())),
+            household_id=unified_data.get('household_id', 'household_123'),
+            date=datetime.fromisoformat(plan_date) if plan_date else datetime.now(),
             status=MealPlanStatus.SUGGESTED,
-            mainDish=original_recipes[0] if len(original_recipes) > 0 else self._create_default_meal_item("主菜"),
-            sideDish=original_recipes[1] if len(original_recipes) > 1 else self._create_default_meal_item("副菜"),
+            main_dish=original_recipes[0] if len(original_recipes) > 0 else self._create_default_meal_item("主菜"),
+            side_dish=original_recipes[1] if len(original_recipes) > 1 else self._create_default_meal_item("副菜"),
             soup=original_recipes[2] if len(original_recipes) > 2 else self._create_default_meal_item("汁物"),
             rice=original_recipes[3] if len(original_recipes) > 3 else self._create_default_meal_item("主食"),
-            totalCookingTime=unified_data.get('total_cooking_time', 60),
+            total_cooking_time=normalize_minutes(int(unified_data.get('total_cooking_time', 60))),
             difficulty=DifficultyLevel(unified_data.get('difficulty', 'easy')),
-            nutritionScore=float(unified_data.get('nutrition_score', 80)),
-            confidence=float(unified_data.get('confidence', 0.8)),
-            createdAt=datetime.now(),
-            createdBy='adk_agent'
+            nutrition_score=normalize_score(float(unified_data.get('nutrition_score', 80))),
+            confidence=normalize_confidence(float(unified_data.get('confidence', 0.8))),
+            created_at=datetime.now(),
+            created_by='adk_agent'
         )
     
     def _create_default_meal_item(self, name: str) -> MealItem:
@@ -387,16 +375,16 @@ class MealThemeAgent(BaseAgent[MealThemeRequest, MealThemeResult]):
             description=f"デフォルトの{name}",
             ingredients=[],
             recipe=Recipe(
-                steps=[RecipeStep(stepNumber=1, description=f"{name}を作る")],
-                cookingTime=20,
-                prepTime=10,
+                steps=[RecipeStep(step_number=1, description=f"{name}を作る")],
+                cooking_time=20,
+                prep_time=10,
                 difficulty=DifficultyLevel.EASY,
                 tips=[],
-                servingSize=4,
-                nutritionInfo=NutritionInfo(calories=200, protein=10, carbohydrates=20, fat=5)
+                serving_size=4,
+                nutrition_info=NutritionInfo(calories=200, protein=10, carbohydrates=20, fat=5)
             ),
-            cookingTime=20,
+            cooking_time=20,
             difficulty=DifficultyLevel.EASY,
-            nutritionInfo=NutritionInfo(calories=200, protein=10, carbohydrates=20, fat=5),
-            createdAt=datetime.now()
+            nutrition_info=NutritionInfo(calories=200, protein=10, carbohydrates=20, fat=5),
+            created_at=datetime.now()
         )
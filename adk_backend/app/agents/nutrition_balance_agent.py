@@ -3,37 +3,35 @@ Nutrition Balance Agent using Google ADK
 Analyzes nutrition balance and provides recommendations
 """
 
-import google.generativeai as genai
 from typing import List, Dict, Any
-import json
 import structlog
 
 from app.agents.base_agent import BaseAgent
 from app.models.schemas import (
     Ingredient, UserPreferences, NutritionAnalysisRequest, 
-    NutritionAnalysisResult
+    NutritionAnalysisResult, NutritionRecommendationsOutput
 )
 from app.core.exceptions import NutritionBalanceError
 from app.core.config import settings
+from app.core.prompt_builder import build_ingredient_section
 
 logger = structlog.get_logger(__name__)
 
 class NutritionBalanceAgent(BaseAgent[NutritionAnalysisRequest, NutritionAnalysisResult]):
-    """Agent for analyzing nutrition balance"""
+    """Agent for analyzing nutrition balance
+
+    The nutrition estimate, prompt and fallback helpers are module-level
+    functions, shared with the fused fridge analysis agent.
+    """
     
     def __init__(self):
         super().__init__(
             name="nutrition_balance",
             model=settings.nutrition_balance_model,
+            fast_model=settings.nutrition_balance_fast_model,
             temperature=settings.nutrition_balance_temperature,
             max_tokens=settings.nutrition_balance_max_tokens
         )
-        
-        # Initialize Gemini
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-        else:
-            logger.warning("Gemini API key not configured, using mock responses")
     
     def get_system_prompt(self) -> str:
         """Get system prompt for nutrition balance analysis"""
@@ -71,7 +69,7 @@ class NutritionBalanceAgent(BaseAgent[NutritionAnalysisRequest, NutritionAnalysi
 すべてのテキストは日本語で出力してください。
 """
     
-    async def process(self, request: NutritionAnalysisRequest) -> NutritionAnalysisResult:
+    async def process_request(self, request: NutritionAnalysisRequest) -> NutritionAnalysisResult:
         """Process nutrition balance analysis request"""
         try:
             await self.validate_request(request)
@@ -83,7 +81,7 @@ class NutritionBalanceAgent(BaseAgent[NutritionAnalysisRequest, NutritionAnalysi
             )
             
             # Calculate basic nutrition analysis
-            basic_analysis = self._calculate_basic_nutrition(processed_request.ingredients)
+            basic_analysis = estimate_basic_nutrition(processed_request.ingredients)
             
             # Generate AI recommendations
             ai_recommendations = await self._generate_ai_recommendations(
@@ -93,12 +91,7 @@ class NutritionBalanceAgent(BaseAgent[NutritionAnalysisRequest, NutritionAnalysi
             )
             
             # Create result
-            result = NutritionAnalysisResult(
-                nutrition_score=ai_recommendations['nutrition_score'],
-                recommended_nutrients=ai_recommendations['recommended_nutrients'],
-                warnings=ai_recommendations['warnings'],
-                suggestions=ai_recommendations['suggestions']
-            )
+            result = build_nutrition_analysis(ai_recommendations)
             
             return await self.postprocess_response(result)
             
@@ -106,44 +99,6 @@ class NutritionBalanceAgent(BaseAgent[NutritionAnalysisRequest, NutritionAnalysi
             await self.handle_error(e, request)
             raise NutritionBalanceError(f"Failed to analyze nutrition balance: {str(e)}")
     
-    def _calculate_basic_nutrition(self, ingredients: List[Ingredient]) -> Dict[str, Any]:
-        """Calculate basic nutrition information from ingredients"""
-        total_calories = 0.0
-        total_protein = 0.0
-        total_carbs = 0.0
-        total_fat = 0.0
-        
-        # Simple nutrition estimation based on ingredient categories
-        for ingredient in ingredients:
-            category = ingredient.category.lower()
-            
-            # Basic nutrition values per 100g (rough estimates)
-            if '野菜' in category or '果物' in category:
-                total_calories += 25
-                total_carbs += 5
-            elif '肉' in category or '魚' in category:
-                total_calories += 200
-                total_protein += 20
-                total_fat += 10
-            elif '乳製品' in category:
-                total_calories += 150
-                total_protein += 8
-                total_fat += 8
-            elif '主食' in category or '米' in category:
-                total_calories += 350
-                total_carbs += 75
-            else:
-                # Default estimation
-                total_calories += 100
-                total_carbs += 15
-        
-        return {
-            'calories': total_calories,
-            'protein': total_protein,
-            'carbohydrates': total_carbs,
-            'fat': total_fat
-        }
-    
     async def _generate_ai_recommendations(
         self, 
         ingredients: List[Ingredient], 
@@ -151,43 +106,24 @@ class NutritionBalanceAgent(BaseAgent[NutritionAnalysisRequest, NutritionAnalysi
         basic_analysis: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Generate AI recommendations for nutrition balance"""
-        if not settings.gemini_api_key:
-            return self._get_mock_recommendations(ingredients, basic_analysis)
+        if not self.ai_enabled:
+            return mock_nutrition_recommendations(ingredients, basic_analysis)
         
         try:
             # Create ingredients summary
-            ingredients_summary = []
-            for ingredient in ingredients:
-                ingredients_summary.append(
-                    f"- {ingredient.name} ({ingredient.category})"
-                )
-            
-            # Create user preferences summary
-            restrictions_text = ""
-            if user_preferences.dietary_restrictions:
-                restrictions_text = f"食事制限: {', '.join(user_preferences.dietary_restrictions)}"
-            
-            allergies_text = ""
-            if user_preferences.allergies:
-                allergies_text = f"アレルギー: {', '.join(user_preferences.allergies)}"
+            ingredients_summary = build_ingredient_section(
+                ingredients,
+                lambda ingredient: f"- {ingredient.name} ({ingredient.category})",
+                agent=self.name
+            )
             
             prompt = f"""
 以下の食材とユーザー設定を基に、栄養バランスを分析してください：
 
 【食材リスト】
-{chr(10).join(ingredients_summary)}
-
-【現在の栄養素（推定）】
-- カロリー: {basic_analysis['calories']:.1f}kcal
-- タンパク質: {basic_analysis['protein']:.1f}g
-- 炭水化物: {basic_analysis['carbohydrates']:.1f}g
-- 脂質: {basic_analysis['fat']:.1f}g
+{ingredients_summary.text}
 
-【ユーザー設定】
-- 最大調理時間: {user_preferences.max_cooking_time}分
-- 難易度: {user_preferences.preferred_difficulty}
-{restrictions_text}
-{allergies_text}
+{nutrition_context(user_preferences, basic_analysis)}
 
 以下の形式でJSON出力してください：
 {{
@@ -206,86 +142,152 @@ class NutritionBalanceAgent(BaseAgent[NutritionAnalysisRequest, NutritionAnalysi
 推奨事項は具体的で実用的なアドバイスを日本語で提供してください。
 """
             
-            model = genai.GenerativeModel(self.model)
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=self.max_tokens,
-                )
-            )
-            
-            if response.text:
-                # Parse JSON response
-                json_start = response.text.find('{')
-                json_end = response.text.rfind('}') + 1
-                
-                if json_start != -1 and json_end > json_start:
-                    json_str = response.text[json_start:json_end]
-                    data = json.loads(json_str)
-                    
-                    # Validate and clean data
-                    nutrition_score = max(0, min(100, data.get('nutrition_score', 75)))
-                    recommended_nutrients = data.get('recommended_nutrients', {})
-                    warnings = data.get('warnings', [])
-                    suggestions = data.get('suggestions', [])
-                    
-                    return {
-                        'nutrition_score': nutrition_score,
-                        'recommended_nutrients': recommended_nutrients,
-                        'warnings': warnings if isinstance(warnings, list) else [],
-                        'suggestions': suggestions if isinstance(suggestions, list) else []
-                    }
+            data = await self.generate_json(prompt, NutritionRecommendationsOutput)
+            if data is not None:
+                return clean_nutrition_recommendations(data)
             
-            return self._get_mock_recommendations(ingredients, basic_analysis)
+            self.record_fallback("parse_error")
+            return mock_nutrition_recommendations(ingredients, basic_analysis)
             
         except Exception as e:
             logger.warning(f"Failed to generate AI nutrition recommendations: {e}")
-            return self._get_mock_recommendations(ingredients, basic_analysis)
+            self.record_fallback("error")
+            return mock_nutrition_recommendations(ingredients, basic_analysis)
     
-    def _get_mock_recommendations(
-        self, 
-        ingredients: List[Ingredient], 
-        basic_analysis: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Get mock recommendations when AI is not available"""
-        # Calculate nutrition score based on ingredient diversity
-        categories = set(ingredient.category for ingredient in ingredients)
-        diversity_score = min(len(categories) * 15, 100)
-        
-        # Adjust score based on basic nutrition
-        protein_score = min(basic_analysis['protein'] * 2, 30)
-        carb_score = min(basic_analysis['carbohydrates'] / 5, 30)
-        fat_score = min(basic_analysis['fat'] * 3, 30)
-        
-        nutrition_score = min(diversity_score + protein_score + carb_score + fat_score, 100)
-        
-        recommendations = {
-            'nutrition_score': nutrition_score,
-            'recommended_nutrients': {
-                'protein': 60.0,
-                'carbohydrates': 200.0,
-                'fat': 50.0,
-                'fiber': 25.0
-            },
-            'warnings': [],
-            'suggestions': []
-        }
-        
-        # Add warnings based on analysis
-        if basic_analysis['protein'] < 30:
-            recommendations['warnings'].append('タンパク質が不足しています')
-            recommendations['suggestions'].append('肉類や魚類を追加してください')
-        
-        if basic_analysis['carbohydrates'] < 100:
-            recommendations['warnings'].append('炭水化物が不足しています')
-            recommendations['suggestions'].append('主食を追加してください')
-        
-        if len(categories) < 4:
-            recommendations['warnings'].append('食材の種類が少ないです')
-            recommendations['suggestions'].append('野菜や果物を追加してください')
-        
-        if not recommendations['warnings']:
-            recommendations['suggestions'].append('バランスの良い献立です')
+    def check_output_quality(self, data: Dict[str, Any]) -> bool:
+        """Require a score in range and at least one improvement suggestion"""
+        return nutrition_output_complete(data)
+
+def estimate_basic_nutrition(ingredients: List[Ingredient]) -> Dict[str, Any]:
+    """Calculate basic nutrition information from ingredients"""
+    total_calories = 0.0
+    total_protein = 0.0
+    total_carbs = 0.0
+    total_fat = 0.0
+    
+    # Simple nutrition estimation based on ingredient categories
+    for ingredient in ingredients:
+        category = ingredient.category.lower()
         
-        return recommendations
+        # Basic nutrition values per 100g (rough estimates)
+        if '野菜' in category or '果物' in category:
+            total_calories += 25
+            total_carbs += 5
+        elif '肉' in category or '魚' in category:
+            total_calories += 200
+            total_protein += 20
+            total_fat += 10
+        elif '乳製品' in category:
+            total_calories += 150
+            total_protein += 8
+            total_fat += 8
+        elif '主食' in category or '米' in category:
+            total_calories += 350
+            total_carbs += 75
+        else:
+            # Default estimation
+            total_calories += 100
+            total_carbs += 15
+    
+    return {
+        'calories': total_calories,
+        'protein': total_protein,
+        'carbohydrates': total_carbs,
+        'fat': total_fat
+    }
+
+def build_nutrition_analysis(ai_recommendations: Dict[str, Any]) -> NutritionAnalysisResult:
+    """Create the analysis result from cleaned recommendations"""
+    return NutritionAnalysisResult(
+        nutrition_score=ai_recommendations['nutrition_score'],
+        recommended_nutrients=ai_recommendations['recommended_nutrients'],
+        warnings=ai_recommendations['warnings'],
+        suggestions=ai_recommendations['suggestions']
+    )
+
+def nutrition_context(user_preferences: UserPreferences, basic_analysis: Dict[str, Any]) -> str:
+    """Describe the estimated nutrients and user settings for a prompt"""
+    # Create user preferences summary
+    restrictions_text = ""
+    if user_preferences.dietary_restrictions:
+        restrictions_text = f"食事制限: {', '.join(user_preferences.dietary_restrictions)}"
+    
+    allergies_text = ""
+    if user_preferences.allergies:
+        allergies_text = f"アレルギー: {', '.join(user_preferences.allergies)}"
+    
+    return f"""【現在の栄養素（推定）】
+- カロリー: {basic_analysis['calories']:.1f}kcal
+- タンパク質: {basic_analysis['protein']:.1f}g
+- 炭水化物: {basic_analysis['carbohydrates']:.1f}g
+- 脂質: {basic_analysis['fat']:.1f}g
+
+【ユーザー設定】
+- 最大調理時間: {user_preferences.max_cooking_time}分
+- 難易度: {user_preferences.preferred_difficulty.value}
+{restrictions_text}
+{allergies_text}"""
+
+def nutrition_output_complete(data: Dict[str, Any]) -> bool:
+    """Require a score in range and at least one improvement suggestion"""
+    return 0 <= data['nutrition_score'] <= 100 and bool(data.get('suggestions'))
+
+def clean_nutrition_recommendations(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate and clean nutrition recommendations parsed from Gemini"""
+    nutrition_score = max(0, min(100, data.get('nutrition_score', 75)))
+    recommended_nutrients = data.get('recommended_nutrients', {})
+    warnings = data.get('warnings', [])
+    suggestions = data.get('suggestions', [])
+    
+    return {
+        'nutrition_score': nutrition_score,
+        'recommended_nutrients': recommended_nutrients,
+        'warnings': warnings if isinstance(warnings, list) else [],
+        'suggestions': suggestions if isinstance(suggestions, list) else []
+    }
+
+def mock_nutrition_recommendations(
+    ingredients: List[Ingredient],
+    basic_analysis: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Get mock recommendations when AI is not available"""
+    # Calculate nutrition score based on ingredient diversity
+    categories = set(ingredient.category for ingredient in ingredients)
+    diversity_score = min(len(categories) * 15, 100)
+    
+    # Adjust score based on basic nutrition
+    protein_score = min(basic_analysis['protein'] * 2, 30)
+    carb_score = min(basic_analysis['carbohydrates'] / 5, 30)
+    fat_score = min(basic_analysis['fat'] * 3, 30)
+    
+    nutrition_score = min(diversity_score + protein_score + carb_score + fat_score, 100)
+    
+    recommendations = {
+        'nutrition_score': nutrition_score,
+        'recommended_nutrients': {
+            'protein': 60.0,
+            'carbohydrates': 200.0,
+            'fat': 50.0,
+            'fiber': 25.0
+        },
+        'warnings': [],
+        'suggestions': []
+    }
+    
+    # Add warnings based on analysis
+    if basic_analysis['protein'] < 30:
+        recommendations['warnings'].append('タンパク質が不足しています')
+        recommendations['suggestions'].append('肉類や魚類を追加してください')
+    
+    if basic_analysis['carbohydrates'] < 100:
+        recommendations['warnings'].append('炭水化物が不足しています')
+        recommendations['suggestions'].append('主食を追加してください')
+    
+    if len(categories) < 4:
+        recommendations['warnings'].append('食材の種類が少ないです')
+        recommendations['suggestions'].append('野菜や果物を追加してください')
+    
+    if not recommendations['warnings']:
+        recommendations['suggestions'].append('バランスの良い献立です')
+    
+    return recommendations
@@ -3,9 +3,7 @@ Recipe Suggestion Agent using Google ADK
 Suggests recipes based on ingredients and nutrition requirements
 """
 
-import google.generativeai as genai
 from typing import List, Dict, Any
-import json
 import structlog
 from datetime import datetime
 
@@ -13,10 +11,13 @@ from app.agents.base_agent import BaseAgent
 from app.models.schemas import (
     IngredientAnalysisResult, NutritionAnalysisResult, UserPreferences,
     RecipeSuggestionRequest, RecipeSuggestionResult, MealItem, MealCategory,
-    Ingredient, Recipe, RecipeStep, NutritionInfo, DifficultyLevel
+    Ingredient, Recipe, RecipeStep, NutritionInfo, DifficultyLevel, RecipeSuggestionOutput,
+    normalize_confidence, normalize_score, normalize_minutes
 )
 from app.core.exceptions import RecipeSuggestionError
 from app.core.config import settings
+from app.core.prompt_builder import build_ingredient_section
+from app.core.recipe_cache import FridgeSignature, recipe_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -27,15 +28,10 @@ class RecipeSuggestionAgent(BaseAgent[RecipeSuggestionRequest, RecipeSuggestionR
         super().__init__(
             name="recipe_suggestion",
             model=settings.recipe_suggestion_model,
+            fast_model=settings.recipe_suggestion_fast_model,
             temperature=settings.recipe_suggestion_temperature,
             max_tokens=settings.recipe_suggestion_max_tokens
         )
-        
-        # Initialize Gemini
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-        else:
-            logger.warning("Gemini API key not configured, using mock responses")
     
     def get_system_prompt(self) -> str:
         """Get system prompt for recipe suggestion"""
@@ -87,7 +83,7 @@ class RecipeSuggestionAgent(BaseAgent[RecipeSuggestionRequest, RecipeSuggestionR
 すべてのテキストは日本語で出力してください。
 """
     
-    async def process(self, request: RecipeSuggestionRequest) -> RecipeSuggestionResult:
+    async def process_request(self, request: RecipeSuggestionRequest) -> RecipeSuggestionResult:
         """Process recipe suggestion request"""
         try:
             await self.validate_request(request)
@@ -100,27 +96,28 @@ class RecipeSuggestionAgent(BaseAgent[RecipeSuggestionRequest, RecipeSuggestionR
             )
             
             # Generate AI recipe suggestions
-            if settings.gemini_api_key:
+            if self.ai_enabled:
                 ai_suggestion = await self._generate_ai_recipes(processed_request)
             else:
                 ai_suggestion = self._get_mock_recipes(processed_request)
             
             # Parse and create meal items
-            main_dish = self._create_meal_item(ai_suggestion['main_dish'], MealCategory.main, processed_request.ingredient_analysis.analyzed_ingredients)
-            side_dish = self._create_meal_item(ai_suggestion['side_dish'], MealCategory.side, processed_request.ingredient_analysis.analyzed_ingredients)
-            soup = self._create_meal_item(ai_suggestion['soup'], MealCategory.soup, processed_request.ingredient_analysis.analyzed_ingredients)
-            rice = self._create_meal_item(ai_suggestion['rice'], MealCategory.rice, processed_request.ingredient_analysis.analyzed_ingredients)
+            main_dish = self._create_meal_item(ai_suggestion['main_dish'], MealCategory.MAIN, processed_request.ingredient_analysis.analyzed_ingredients)
+            side_dish = self._create_meal_item(ai_suggestion['side_dish'], MealCategory.SIDE, processed_request.ingredient_analysis.analyzed_ingredients)
+            soup = self._create_meal_item(ai_suggestion['soup'], MealCategory.SOUP, processed_request.ingredient_analysis.analyzed_ingredients)
+            rice = self._create_meal_item(ai_suggestion['rice'], MealCategory.RICE, processed_request.ingredient_analysis.analyzed_ingredients)
             
-            # Create result
+            # Create result. Suggestions from the recipe cache may predate the
+            # output model's normalization, so the bounds MealPlan needs are applied here
             result = RecipeSuggestionResult(
                 main_dish=main_dish,
                 side_dish=side_dish,
                 soup=soup,
                 rice=rice,
-                total_cooking_time=ai_suggestion['total_cooking_time'],
+                total_cooking_time=normalize_minutes(int(ai_suggestion['total_cooking_time'])),
                 difficulty=DifficultyLevel(ai_suggestion['difficulty']),
-                nutrition_score=ai_suggestion['nutrition_score'],
-                confidence=ai_suggestion['confidence']
+                nutrition_score=normalize_score(float(ai_suggestion['nutrition_score'])),
+                confidence=normalize_confidence(float(ai_suggestion['confidence']))
             )
             
             return await self.postprocess_response(result)
@@ -130,20 +127,28 @@ class RecipeSuggestionAgent(BaseAgent[RecipeSuggestionRequest, RecipeSuggestionR
             raise RecipeSuggestionError(f"Failed to suggest recipes: {str(e)}")
     
     async def _generate_ai_recipes(self, request: RecipeSuggestionRequest) -> Dict[str, Any]:
-        """Generate AI recipe suggestions"""
+        """Generate AI recipe suggestions, reusing those of similar refrigerators"""
         try:
+            signature = FridgeSignature.from_request(request)
+            cached = await recipe_cache.lookup(signature)
+            if cached is not None:
+                return cached
+            
             # Create ingredients summary
-            ingredients_summary = []
-            for ingredient in request.ingredient_analysis.analyzed_ingredients:
+            def describe(ingredient: Ingredient) -> str:
                 priority_text = ""
-                if ingredient.priority.name == "urgent":
+                if ingredient.priority.value == "urgent":
                     priority_text = "[緊急]"
-                elif ingredient.priority.name == "soon":
+                elif ingredient.priority.value == "soon":
                     priority_text = "[期限間近]"
                 
-                ingredients_summary.append(
-                    f"{priority_text}{ingredient.name} {ingredient.quantity}{ingredient.unit} ({ingredient.category})"
-                )
+                return f"{priority_text}{ingredient.name} {ingredient.quantity}{ingredient.unit} ({ingredient.category})"
+            
+            ingredients_summary = build_ingredient_section(
+                request.ingredient_analysis.analyzed_ingredients,
+                describe,
+                agent=self.name
+            )
             
             # Create user preferences summary
             restrictions_text = ""
@@ -154,6 +159,16 @@ class RecipeSuggestionAgent(BaseAgent[RecipeSuggestionRequest, RecipeSuggestionR
             if request.user_preferences.allergies:
                 allergies_text = f"Allergies: {', '.join(request.user_preferences.allergies)}"
             
+            # Alternative meal plans must differ from what was already suggested
+            variation_lines = []
+            if request.variation_hint:
+                variation_lines.append(f"- Style: {request.variation_hint}")
+            if request.avoid_dishes:
+                variation_lines.append(f"- Do NOT suggest these dishes: {', '.join(request.avoid_dishes)}")
+            variation_text = ""
+            if variation_lines:
+                variation_text = "[Variation]\n" + chr(10).join(variation_lines)
+            
             prompt = f"""
 You are a cooking expert. Please suggest a meal plan following these principles:
 
@@ -165,11 +180,11 @@ You are a cooking expert. Please suggest a meal plan following these principles:
 5. Consist of main dish, side dish, soup, and staple food (4 items)
 
 [Available Ingredients]
-{chr(10).join(ingredients_summary)}
+{ingredients_summary.text}
 
 [User Settings]
 - Max cooking time: {request.user_preferences.max_cooking_time} minutes
-- Difficulty: {request.user_preferences.preferred_difficulty.name}
+- Difficulty: {request.user_preferences.preferred_difficulty.value}
 {restrictions_text}
 {allergies_text}
 
@@ -177,6 +192,8 @@ You are a cooking expert. Please suggest a meal plan following these principles:
 - Current nutrition score: {request.nutrition_analysis.nutrition_score}
 - Recommended nutrients: {request.nutrition_analysis.recommended_nutrients}
 
+{variation_text}
+
 [Output Format]
 Please suggest a meal plan in the following JSON format:
 
@@ -226,29 +243,17 @@ CRITICAL REQUIREMENTS:
 - Do NOT include any text outside the JSON
 """
             
-            model = genai.GenerativeModel(self.model)
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=self.max_tokens,
-                )
-            )
-            
-            if response.text:
-                # Parse JSON response
-                json_start = response.text.find('{')
-                json_end = response.text.rfind('}') + 1
-                
-                if json_start != -1 and json_end > json_start:
-                    json_str = response.text[json_start:json_end]
-                    data = json.loads(json_str)
-                    return data
+            data = await self.generate_json(prompt, RecipeSuggestionOutput)
+            if data is not None:
+                await recipe_cache.store(signature, data)
+                return data
             
+            self.record_fallback("parse_error")
             return self._get_mock_recipes(request)
             
         except Exception as e:
             logger.warning(f"Failed to generate AI recipes: {e}")
+            self.record_fallback("error")
             return self._get_mock_recipes(request)
     
     def _get_mock_recipes(self, request: RecipeSuggestionRequest) -> Dict[str, Any]:
@@ -256,7 +261,7 @@ CRITICAL REQUIREMENTS:
         # Use priority ingredients for mock recipes
         priority_ingredients = [
             ing for ing in request.ingredient_analysis.analyzed_ingredients 
-            if ing.priority.name in ['urgent', 'soon']
+            if ing.priority.value in ['urgent', 'soon']
         ]
         
         if not priority_ingredients:
@@ -284,7 +289,7 @@ CRITICAL REQUIREMENTS:
                         "quantity": "適量",
                         "unit": "g",
                         "available": True,
-                        "priority": main_ingredient.priority.name if main_ingredient else "fresh"
+                        "priority": main_ingredient.priority.value if main_ingredient else "fresh"
                     }
                 ],
                 "recipe": {
@@ -425,11 +430,11 @@ CRITICAL REQUIREMENTS:
             )
             
             if available_ingredient:
-                ingredient = available_ingredient.copyWith(
-                    quantity=ing_data.get('quantity', available_ingredient.quantity),
-                    unit=ing_data.get('unit', available_ingredient.unit),
-                    available=ing_data.get('available', True),
-                )
+                ingredient = available_ingredient.model_copy(update={
+                    'quantity': ing_data.get('quantity', available_ingredient.quantity),
+                    'unit': ing_data.get('unit', available_ingredient.unit),
+                    'available': ing_data.get('available', True),
+                })
             else:
                 # Create new ingredient if not found in available ingredients
                 from app.models.schemas import ExpiryPriority
@@ -438,7 +443,7 @@ CRITICAL REQUIREMENTS:
                     quantity=ing_data.get('quantity', '適量'),
                     unit=ing_data.get('unit', 'g'),
                     available=ing_data.get('available', False),
-                    shoppingRequired=not ing_data.get('available', False),
+                    shopping_required=not ing_data.get('available', False),
                     priority=ExpiryPriority(ing_data.get('priority', 'fresh')),
                     category='その他',
                 )
@@ -449,15 +454,15 @@ CRITICAL REQUIREMENTS:
         recipe_data = dish_data.get('recipe', {})
         recipe = Recipe(
             steps=[
-                RecipeStep(stepNumber=i+1, description=step)
+                RecipeStep(step_number=i+1, description=step)
                 for i, step in enumerate(recipe_data.get('steps', []))
             ],
-            cookingTime=dish_data.get('cooking_time', 30),
-            prepTime=10,
+            cooking_time=dish_data.get('cooking_time', 30),
+            prep_time=10,
             difficulty=DifficultyLevel(dish_data.get('difficulty', 'easy')),
             tips=recipe_data.get('tips', []),
-            servingSize=4,
-            nutritionInfo=NutritionInfo(
+            serving_size=4,
+            nutrition_info=NutritionInfo(
                 calories=float(dish_data.get('nutrition_info', {}).get('calories', 0)),
                 protein=float(dish_data.get('nutrition_info', {}).get('protein', 0)),
                 carbohydrates=float(dish_data.get('nutrition_info', {}).get('carbohydrates', 0)),
@@ -472,8 +477,8 @@ CRITICAL REQUIREMENTS:
             description=dish_data.get('description', ''),
             ingredients=ingredients,
             recipe=recipe,
-            cookingTime=dish_data.get('cooking_time', 30),
+            cooking_time=dish_data.get('cooking_time', 30),
             difficulty=DifficultyLevel(dish_data.get('difficulty', 'easy')),
-            nutritionInfo=recipe.nutritionInfo,
-            createdAt=datetime.now()
+            nutrition_info=recipe.nutrition_info,
+            created_at=datetime.now()
         )
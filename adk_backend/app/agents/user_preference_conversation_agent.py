@@ -3,37 +3,36 @@ User Preference Conversation Agent using Google ADK
 Collects and structures user preferences through conversation
 """
 
-import google.generativeai as genai
 from typing import List, Dict, Any, Optional
 import json
 import structlog
+from datetime import datetime
 
 from app.agents.base_agent import BaseAgent
 from app.models.schemas import (
     Ingredient, UserPreferences, UserPreferenceRequest, UserPreferenceResult,
-    DifficultyLevel
+    DifficultyLevel, PreferenceConversationOutput
 )
 from app.core.exceptions import UserPreferenceError
 from app.core.config import settings
+from app.core.prompt_builder import build_ingredient_section
 
 logger = structlog.get_logger(__name__)
 
 class UserPreferenceConversationAgent(BaseAgent[UserPreferenceRequest, UserPreferenceResult]):
     """Agent for collecting user preferences through conversation"""
     
+    # Conversations are personal and carry their own history
+    cache_responses = False
+    
     def __init__(self):
         super().__init__(
             name="user_preference_conversation",
             model=settings.user_preference_model,
+            fast_model=settings.user_preference_fast_model,
             temperature=settings.user_preference_temperature,
             max_tokens=settings.user_preference_max_tokens
         )
-        
-        # Initialize Gemini
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-        else:
-            logger.warning("Gemini API key not configured, using mock responses")
     
     def get_system_prompt(self) -> str:
         """Get system prompt for user preference conversation"""
@@ -76,7 +75,7 @@ class UserPreferenceConversationAgent(BaseAgent[UserPreferenceRequest, UserPrefe
 すべてのテキストは日本語で出力してください。
 """
     
-    async def process(self, request: UserPreferenceRequest) -> UserPreferenceResult:
+    async def process_request(self, request: UserPreferenceRequest) -> UserPreferenceResult:
         """Process user preference conversation request"""
         try:
             await self.validate_request(request)
@@ -88,7 +87,7 @@ class UserPreferenceConversationAgent(BaseAgent[UserPreferenceRequest, UserPrefe
             )
             
             # Generate AI conversation response
-            if settings.gemini_api_key:
+            if self.ai_enabled:
                 ai_response = await self._generate_ai_conversation(processed_request)
             else:
                 ai_response = self._get_mock_conversation(processed_request)
@@ -114,9 +113,11 @@ class UserPreferenceConversationAgent(BaseAgent[UserPreferenceRequest, UserPrefe
         """Generate AI conversation response"""
         try:
             # Create available ingredients summary
-            ingredients_summary = []
-            for ingredient in request.available_ingredients:
-                ingredients_summary.append(f"- {ingredient.name} ({ingredient.category})")
+            ingredients_summary = build_ingredient_section(
+                request.available_ingredients,
+                lambda ingredient: f"- {ingredient.name} ({ingredient.category})",
+                agent=self.name
+            )
             
             # Create existing profile summary
             existing_profile_text = ""
@@ -135,7 +136,7 @@ class UserPreferenceConversationAgent(BaseAgent[UserPreferenceRequest, UserPrefe
 ユーザーからの入力: "{request.user_input}"
 
 【利用可能な食材】
-{chr(10).join(ingredients_summary) if ingredients_summary else "食材情報なし"}
+{ingredients_summary.text if ingredients_summary.lines else "食材情報なし"}
 {existing_profile_text}
 
 上記のユーザー入力から、献立提案に必要な設定を抽出・更新してください。
@@ -185,42 +186,26 @@ class UserPreferenceConversationAgent(BaseAgent[UserPreferenceRequest, UserPrefe
 すべてのテキストは日本語で出力してください。
 """
             
-            model = genai.GenerativeModel(self.model)
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=self.max_tokens,
-                )
-            )
-            
-            if response.text:
-                # Parse JSON response
-                json_start = response.text.find('{')
-                json_end = response.text.rfind('}') + 1
-                
-                if json_start != -1 and json_end > json_start:
-                    json_str = response.text[json_start:json_end]
-                    data = json.loads(json_str)
-                    
-                    # Validate and clean data
-                    return {
-                        'structured_preferences': data.get('structured_preferences', {}),
-                        'confidence_score': max(0.0, min(1.0, data.get('confidence_score', 0.5))),
-                        'next_questions': data.get('next_questions', []),
-                        'updated_profile': data.get('updated_profile', {})
-                    }
+            data = await self.generate_json(prompt, PreferenceConversationOutput)
+            if data is not None:
+                # Validate and clean data
+                return {
+                    'structured_preferences': data.get('structured_preferences', {}),
+                    'confidence_score': max(0.0, min(1.0, data.get('confidence_score', 0.5))),
+                    'next_questions': data.get('next_questions', []),
+                    'updated_profile': data.get('updated_profile', {})
+                }
             
+            self.record_fallback("parse_error")
             return self._get_mock_conversation(request)
             
         except Exception as e:
             logger.warning(f"Failed to generate AI conversation: {e}")
+            self.record_fallback("error")
             return self._get_mock_conversation(request)
     
     def _get_mock_conversation(self, request: UserPreferenceRequest) -> Dict[str, Any]:
         """Get mock conversation when AI is not available"""
-        from datetime import datetime
-        
         # Simple mock parsing based on keywords
         user_input = request.user_input.lower()
         
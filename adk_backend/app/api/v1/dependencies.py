@@ -0,0 +1,115 @@
+"""
+Shared FastAPI dependencies for API v1
+"""
+
+import asyncio
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException, Request, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import structlog
+
+from app.core.config import settings
+from app.core.profiling import ProfileStore, RequestProfiler
+from app.core.tracing import current_trace
+from app.services.agent_registry import AgentRegistry
+from app.services.meal_planning_service import MealPlanningService
+from app.services.image_jobs import ImageJobManager
+
+logger = structlog.get_logger(__name__)
+
+profile_store = ProfileStore(settings.profiling_dir, settings.profiling_max_profiles)
+
+def get_agent_registry(request: Request) -> AgentRegistry:
+    """Get the application-scoped agent registry created at startup"""
+    return request.app.state.agents
+
+def get_meal_planning_service(request: Request) -> MealPlanningService:
+    """Get the shared meal planning service"""
+    return get_agent_registry(request).meal_planning_service
+
+def get_image_job_manager(request: Request) -> ImageJobManager:
+    """Get the shared background image job manager"""
+    return get_agent_registry(request).image_jobs
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """Allow only callers presenting the profiling admin token"""
+    if not settings.profiling_token:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not x_profile_token or not hmac.compare_digest(x_profile_token, settings.profiling_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+async def profile_request(
+    request: Request,
+    response: Response,
+    x_profile_token: Optional[str] = Header(None)
+) -> Optional[RequestProfiler]:
+    """Profile the request when it carries the profiling admin token
+
+    Requests without the header are not profiled and cost one header lookup.
+    The profile ID is returned in the X-Profile-Id response header; the
+    profile is saved by ProfileSavingMiddleware before the response completes.
+    """
+    if x_profile_token is None:
+        return None
+
+    require_profiling_token(x_profile_token)
+    profiler = RequestProfiler(
+        interval=settings.profiling_interval,
+        max_duration=settings.profiling_max_duration,
+        label=f"{request.method} {request.url.path}"
+    )
+    trace = current_trace()
+    if trace is not None:
+        trace.profiler = profiler
+    response.headers["X-Profile-Id"] = profiler.profile_id
+    request.state.profiler = profiler
+    profiler.start()
+    return profiler
+
+class ProfileSavingMiddleware:
+    """ASGI middleware saving the profile started by profile_request
+
+    The profile is saved before the last chunk of the response body is
+    sent, so it can be fetched by X-Profile-Id as soon as the client has
+    the response. (A yield dependency's teardown only runs afterwards.)
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Shared with request.state, where profile_request leaves the profiler
+        state = scope.setdefault("state", {})
+
+        async def send_after_saving(message: Message) -> None:
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                await _save_profile(state.pop("profiler", None))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_after_saving)
+        finally:
+            # The response was not completed
+            await _save_profile(state.pop("profiler", None))
+
+async def _save_profile(profiler: Optional[RequestProfiler]) -> None:
+    """Stop the profiler and save its profile"""
+    if profiler is None:
+        return
+    profiler.stop()
+    try:
+        await asyncio.to_thread(profile_store.save, profiler)
+    except OSError as e:
+        logger.warning("Failed to save profile", profile_id=profiler.profile_id, error=str(e))
+    else:
+        logger.info(
+            "Request profiled",
+            profile_id=profiler.profile_id,
+            samples=profiler.samples,
+            duration=round(profiler.duration, 4)
+        )
@@ -14,33 +14,24 @@ from app.models.schemas import (
     ImageGenerationRequest, ImageGenerationResult,
     UserPreferenceRequest, UserPreferenceResult
 )
-from app.agents.ingredient_analysis_agent import IngredientAnalysisAgent
-from app.agents.nutrition_balance_agent import NutritionBalanceAgent
-from app.agents.recipe_suggestion_agent import RecipeSuggestionAgent
-from app.agents.cooking_optimization_agent import CookingOptimizationAgent
-from app.agents.meal_theme_agent import MealThemeAgent
-from app.agents.image_generation_agent import ImageGenerationAgent
-from app.agents.user_preference_conversation_agent import UserPreferenceConversationAgent
+from app.services.agent_registry import AgentRegistry
+from app.api.v1.dependencies import get_agent_registry
 from app.core.exceptions import AgentException
+from app.core.cache import response_cache
+from app.core.recipe_cache import recipe_cache
 
 logger = structlog.get_logger(__name__)
 router = APIRouter()
 
-# Agent instances
-ingredient_agent = IngredientAnalysisAgent()
-nutrition_agent = NutritionBalanceAgent()
-recipe_agent = RecipeSuggestionAgent()
-cooking_agent = CookingOptimizationAgent()
-theme_agent = MealThemeAgent()
-image_agent = ImageGenerationAgent()
-preference_agent = UserPreferenceConversationAgent()
-
 @router.post("/ingredient-analysis", response_model=IngredientAnalysisResult)
-async def analyze_ingredients(request: IngredientAnalysisRequest):
+async def analyze_ingredients(
+    request: IngredientAnalysisRequest,
+    registry: AgentRegistry = Depends(get_agent_registry)
+):
     """Analyze refrigerator ingredients and determine priorities"""
     try:
         logger.info("Processing ingredient analysis request")
-        result = await ingredient_agent.process(request)
+        result = await registry.ingredient_agent.process(request)
         logger.info("Ingredient analysis completed")
         return result
     except AgentException as e:
@@ -51,11 +42,14 @@ async def analyze_ingredients(request: IngredientAnalysisRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/nutrition-balance", response_model=NutritionAnalysisResult)
-async def analyze_nutrition(request: NutritionAnalysisRequest):
+async def analyze_nutrition(
+    request: NutritionAnalysisRequest,
+    registry: AgentRegistry = Depends(get_agent_registry)
+):
     """Analyze nutrition balance and provide recommendations"""
     try:
         logger.info("Processing nutrition analysis request")
-        result = await nutrition_agent.process(request)
+        result = await registry.nutrition_agent.process(request)
         logger.info("Nutrition analysis completed")
         return result
     except AgentException as e:
@@ -66,11 +60,14 @@ async def analyze_nutrition(request: NutritionAnalysisRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/recipe-suggestion", response_model=RecipeSuggestionResult)
-async def suggest_recipes(request: RecipeSuggestionRequest):
+async def suggest_recipes(
+    request: RecipeSuggestionRequest,
+    registry: AgentRegistry = Depends(get_agent_registry)
+):
     """Suggest recipes based on ingredients and nutrition requirements"""
     try:
         logger.info("Processing recipe suggestion request")
-        result = await recipe_agent.process(request)
+        result = await registry.recipe_agent.process(request)
         logger.info("Recipe suggestion completed")
         return result
     except AgentException as e:
@@ -81,11 +78,14 @@ async def suggest_recipes(request: RecipeSuggestionRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/cooking-optimization", response_model=CookingOptimizationResult)
-async def optimize_cooking(request: CookingOptimizationRequest):
+async def optimize_cooking(
+    request: CookingOptimizationRequest,
+    registry: AgentRegistry = Depends(get_agent_registry)
+):
     """Optimize cooking process and timing"""
     try:
         logger.info("Processing cooking optimization request")
-        result = await cooking_agent.process(request)
+        result = await registry.cooking_agent.process(request)
         logger.info("Cooking optimization completed")
         return result
     except AgentException as e:
@@ -96,11 +96,14 @@ async def optimize_cooking(request: CookingOptimizationRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/meal-theme", response_model=MealThemeResult)
-async def determine_meal_theme(request: MealThemeRequest):
+async def determine_meal_theme(
+    request: MealThemeRequest,
+    registry: AgentRegistry = Depends(get_agent_registry)
+):
     """Determine meal theme and create unified meal plan"""
     try:
         logger.info("Processing meal theme request")
-        result = await theme_agent.process(request)
+        result = await registry.theme_agent.process(request)
         logger.info("Meal theme determination completed")
         return result
     except AgentException as e:
@@ -111,11 +114,14 @@ async def determine_meal_theme(request: MealThemeRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/image-generation", response_model=ImageGenerationResult)
-async def generate_menu_images(request: ImageGenerationRequest):
+async def generate_menu_images(
+    request: ImageGenerationRequest,
+    registry: AgentRegistry = Depends(get_agent_registry)
+):
     """Generate images for menu items"""
     try:
         logger.info("Processing image generation request")
-        result = await image_agent.process(request)
+        result = await registry.image_agent.process(request)
         logger.info("Image generation completed")
         return result
     except AgentException as e:
@@ -126,11 +132,14 @@ async def generate_menu_images(request: ImageGenerationRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/user-preferences", response_model=UserPreferenceResult)
-async def collect_user_preferences(request: UserPreferenceRequest):
+async def collect_user_preferences(
+    request: UserPreferenceRequest,
+    registry: AgentRegistry = Depends(get_agent_registry)
+):
     """Collect and structure user preferences through conversation"""
     try:
         logger.info("Processing user preference collection request")
-        result = await preference_agent.process(request)
+        result = await registry.preference_agent.process(request)
         logger.info("User preference collection completed")
         return result
     except AgentException as e:
@@ -154,5 +163,7 @@ async def agents_health_check():
             "meal_theme",
             "image_generation",
             "user_preference_conversation"
-        ]
+        ],
+        "cache": response_cache.stats(),
+        "recipe_cache": recipe_cache.stats()
     }
@@ -3,27 +3,40 @@ Meal planning API endpoints
 """
 
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
 import structlog
 import time
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from app.models.schemas import (
-    MealPlanningRequest, MealPlanningResponse, MealPlan, ShoppingItem
+    MealPlanningRequest, MealPlanningResponse, MealPlanningBatchRequest,
+    MealPlan, ImageJob, RequestTimings
 )
-from app.services.meal_planning_service import MealPlanningService
+from app.services.meal_planning_service import MealPlanningService, IMAGE_STAGES
+from app.services.image_jobs import ImageJobManager
+from app.api.v1.dependencies import get_meal_planning_service, get_image_job_manager, profile_request
 from app.core.exceptions import MealPlanningException
+from app.core.config import settings
+from app.core.tracing import current_trace
 
 logger = structlog.get_logger(__name__)
 router = APIRouter()
 
-# Dependency injection for meal planning service
-async def get_meal_planning_service() -> MealPlanningService:
-    """Get meal planning service instance"""
-    return MealPlanningService()
+AGENTS_USED = [
+    "ingredient_analysis",
+    "nutrition_balance",
+    "recipe_suggestion",
+    "cooking_optimization",
+    "meal_theme",
+    "image_generation"
+]
 
-@router.post("/suggest", response_model=MealPlanningResponse)
+@router.post("/suggest", response_model=MealPlanningResponse, dependencies=[Depends(profile_request)])
 async def suggest_meal_plan(
     request: MealPlanningRequest,
+    include_timings: bool = False,
     service: MealPlanningService = Depends(get_meal_planning_service)
 ) -> MealPlanningResponse:
     """
@@ -36,6 +49,17 @@ async def suggest_meal_plan(
     4. Optimize cooking process
     5. Determine meal theme
     6. Generate menu images
+    
+    Steps 4 and 5 run concurrently. Unless image generation is configured
+    inline, step 6 runs as background jobs: the response returns as soon as
+    the menu is ready and image_jobs maps each dish to a job ID to poll at
+    /image-jobs/{job_id}.
+    
+    With include_timings=true the response carries the request's trace:
+    a span per stage, Gemini call, JSON parse and model construction.
+    
+    Sent with the profiling admin token in X-Profile-Token, the request is
+    profiled and X-Profile-Id names the profile to fetch from /profiles.
     """
     start_time = time.time()
     
@@ -48,7 +72,8 @@ async def suggest_meal_plan(
         )
         
         # Process meal planning using ADK agents
-        meal_plan = await service.suggest_meal_plan(request)
+        execution = await service.execute_meal_plan(request)
+        meal_plan = execution.meal_plan
         
         # Generate shopping list
         shopping_list = await service.generate_shopping_list(meal_plan, request.refrigerator_items)
@@ -59,21 +84,18 @@ async def suggest_meal_plan(
             "Meal planning completed",
             household_id=request.household_id,
             processing_time=processing_time,
-            confidence=meal_plan.confidence
+            confidence=meal_plan.confidence,
+            stage_timings=execution.stage_timings
         )
         
         return MealPlanningResponse(
             meal_plan=meal_plan,
             shopping_list=shopping_list,
             processing_time=processing_time,
-            agents_used=[
-                "ingredient_analysis",
-                "nutrition_balance", 
-                "recipe_suggestion",
-                "cooking_optimization",
-                "meal_theme",
-                "image_generation"
-            ]
+            agents_used=AGENTS_USED,
+            image_jobs=execution.image_jobs,
+            degraded_stages=execution.degraded_stages,
+            timings=_request_timings() if include_timings else None
         )
         
     except MealPlanningException as e:
@@ -93,6 +115,267 @@ async def suggest_meal_plan(
         )
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/suggest/stream")
+async def suggest_meal_plan_stream(
+    request: MealPlanningRequest,
+    service: MealPlanningService = Depends(get_meal_planning_service)
+) -> StreamingResponse:
+    """
+    Suggest a meal plan, streaming each stage as NDJSON as soon as it completes
+    
+    Each line is a JSON object with an "event" field:
+    - "ingredient_analysis", "nutrition_balance", "cooking_optimization",
+      "meal_theme": the stage result
+    - "meal_item": one of the four dishes, with its "dish" field name
+    - "image": the generated image URL for one dish
+    - "meal_plan": the complete MealPlanningResponse, always last on success
+    - "error": the pipeline failed; no further lines follow
+    """
+    logger.info(
+        "Processing streaming meal planning request",
+        household_id=request.household_id,
+        product_count=len(request.refrigerator_items)
+    )
+    
+    return StreamingResponse(
+        _stream_meal_plan(request, service),
+        media_type="application/x-ndjson"
+    )
+
+async def _stream_meal_plan(
+    request: MealPlanningRequest,
+    service: MealPlanningService
+) -> AsyncIterator[str]:
+    """Run the pipeline in the background and yield its events as NDJSON lines"""
+    start_time = time.time()
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    
+    async def on_stage_complete(stage: str, value: Any) -> None:
+        for event in _stage_events(stage, value):
+            await queue.put(event)
+    
+    async def run_pipeline() -> None:
+        try:
+            # Images are streamed as they finish, so there is nothing to poll
+            execution = await service.execute_meal_plan(
+                request,
+                on_stage_complete=on_stage_complete,
+                inline_images=True
+            )
+            shopping_list = await service.generate_shopping_list(execution.meal_plan, request.refrigerator_items)
+            response = MealPlanningResponse(
+                meal_plan=execution.meal_plan,
+                shopping_list=shopping_list,
+                processing_time=time.time() - start_time,
+                agents_used=AGENTS_USED,
+                degraded_stages=execution.degraded_stages
+            )
+            await queue.put({"event": "meal_plan", "data": response.model_dump(mode="json")})
+        except MealPlanningException as e:
+            await queue.put({"event": "error", "error": e.error_code, "message": e.message})
+        except Exception as e:
+            logger.error(
+                "Unexpected error in streaming meal planning",
+                error=str(e),
+                household_id=request.household_id,
+                exc_info=True
+            )
+            await queue.put({"event": "error", "error": "INTERNAL_SERVER_ERROR", "message": "Internal server error"})
+        finally:
+            await queue.put(None)
+    
+    task = asyncio.create_task(run_pipeline())
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    finally:
+        # Stop the pipeline if the client went away before it finished
+        if not task.done():
+            task.cancel()
+    
+    logger.info(
+        "Streaming meal planning completed",
+        household_id=request.household_id,
+        processing_time=time.time() - start_time
+    )
+
+def _stage_events(stage: str, value: Any) -> List[Dict[str, Any]]:
+    """Convert a completed pipeline stage into client-facing stream events"""
+    if stage == "recipe_suggestion":
+        return [
+            {"event": "meal_item", "dish": dish, "data": getattr(value, dish).model_dump(mode="json")}
+            for dish in ("main_dish", "side_dish", "soup", "rice")
+        ]
+    
+    if stage == "fridge_analysis":
+        # Streamed as its ingredient_analysis and nutrition_balance split stages
+        return []
+    
+    if stage in IMAGE_STAGES:
+        return [{"event": "image", "dish": IMAGE_STAGES[stage], "image_url": value}]
+    
+    if stage == "meal_theme":
+        # The unified meal plan repeats the dishes already streamed
+        return [{"event": stage, "data": value.model_dump(mode="json", exclude={"unified_meal_plan"})}]
+    
+    if stage == "cooking_optimization":
+        # Optimized recipes repeat the dishes already streamed
+        return [{"event": stage, "data": value.model_dump(mode="json", exclude={"optimized_recipes"})}]
+    
+    if value is None:
+        return []
+    
+    return [{"event": stage, "data": value.model_dump(mode="json")}]
+
+@router.post("/suggest-batch")
+async def suggest_meal_plan_batch(
+    batch: MealPlanningBatchRequest,
+    service: MealPlanningService = Depends(get_meal_planning_service)
+) -> StreamingResponse:
+    """
+    Suggest meal plans for many households, streaming results as NDJSON
+    
+    Requests are processed with bounded concurrency and share the agent
+    response cache. Dish images are only generated with generate_images=true,
+    as background jobs listed in each result's image_jobs. Lines arrive in
+    completion order; "index" refers to the position in the submitted list:
+    - "result": the MealPlanningResponse for one request
+    - "error": one request failed; the rest of the batch continues
+    - "summary": totals, always last
+    """
+    if len(batch.requests) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds the maximum of {settings.batch_max_items} requests"
+        )
+    
+    concurrency = min(batch.max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+    
+    logger.info(
+        "Processing batch meal planning request",
+        request_count=len(batch.requests),
+        concurrency=concurrency,
+        generate_images=batch.generate_images
+    )
+    
+    return StreamingResponse(
+        _stream_meal_plan_batch(batch.requests, service, concurrency, batch.generate_images),
+        media_type="application/x-ndjson"
+    )
+
+async def _stream_meal_plan_batch(
+    requests: List[MealPlanningRequest],
+    service: MealPlanningService,
+    concurrency: int,
+    generate_images: bool = False
+) -> AsyncIterator[str]:
+    """Plan every request on a fixed pool of workers and yield results as NDJSON lines"""
+    start_time = time.time()
+    pending = iter(enumerate(requests))
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    
+    async def worker() -> None:
+        # Workers share one iterator, so at most `concurrency` plans run at once
+        for index, request in pending:
+            await queue.put(await _plan_batch_item(index, request, service, generate_images))
+    
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(requests)))]
+    failed = 0
+    try:
+        for _ in range(len(requests)):
+            event = await queue.get()
+            if event["event"] == "error":
+                failed += 1
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    finally:
+        # Stop outstanding work if the client went away before the batch finished
+        for task in workers:
+            task.cancel()
+    
+    processing_time = time.time() - start_time
+    summary = {
+        "event": "summary",
+        "total": len(requests),
+        "succeeded": len(requests) - failed,
+        "failed": failed,
+        "processing_time": processing_time
+    }
+    yield json.dumps(summary) + "\n"
+    
+    logger.info(
+        "Batch meal planning completed",
+        request_count=len(requests),
+        failed=failed,
+        processing_time=processing_time
+    )
+
+async def _plan_batch_item(
+    index: int,
+    request: MealPlanningRequest,
+    service: MealPlanningService,
+    generate_images: bool = False
+) -> Dict[str, Any]:
+    """Plan one batch item, turning any failure into an error event"""
+    start_time = time.time()
+    try:
+        execution = await service.execute_meal_plan(request, generate_images=generate_images)
+        shopping_list = await service.generate_shopping_list(execution.meal_plan, request.refrigerator_items)
+        response = MealPlanningResponse(
+            meal_plan=execution.meal_plan,
+            shopping_list=shopping_list,
+            processing_time=time.time() - start_time,
+            agents_used=AGENTS_USED,
+            image_jobs=execution.image_jobs,
+            degraded_stages=execution.degraded_stages
+        )
+        return {
+            "event": "result",
+            "index": index,
+            "household_id": request.household_id,
+            "data": response.model_dump(mode="json")
+        }
+    except MealPlanningException as e:
+        error, message = e.error_code, e.message
+    except Exception as e:
+        logger.error(
+            "Unexpected error in batch meal planning",
+            error=str(e),
+            household_id=request.household_id,
+            exc_info=True
+        )
+        error, message = "INTERNAL_SERVER_ERROR", "Internal server error"
+    
+    return {
+        "event": "error",
+        "index": index,
+        "household_id": request.household_id,
+        "error": error,
+        "message": message
+    }
+
+def _request_timings() -> Optional[RequestTimings]:
+    """Span breakdown of the current request, if it is being traced"""
+    trace = current_trace()
+    if trace is None:
+        return None
+    return RequestTimings.model_validate(trace.timings())
+
+@router.get("/image-jobs/{job_id}", response_model=ImageJob)
+async def get_image_job(
+    job_id: str,
+    image_jobs: ImageJobManager = Depends(get_image_job_manager)
+) -> ImageJob:
+    """
+    Get the status of a background menu image job
+    """
+    job = await image_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Image job not found")
+    return job
+
 @router.post("/alternatives", response_model=List[MealPlan])
 async def suggest_alternatives(
     original_meal_plan: MealPlan,
@@ -0,0 +1,35 @@
+"""
+Request profile API endpoints (admin only)
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import FileResponse
+
+from app.api.v1.dependencies import profile_store, require_profiling_token
+
+router = APIRouter(dependencies=[Depends(require_profiling_token)])
+
+def _profile_file(profile_id: str, extension: str) -> str:
+    path = profile_store.path(profile_id, extension)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return path
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str) -> FileResponse:
+    """Summary of a profiled request: sample counts and its hottest functions"""
+    return FileResponse(_profile_file(profile_id, ".json"), media_type="application/json")
+
+@router.get("/{profile_id}/flamegraph")
+async def get_profile_flamegraph(profile_id: str) -> FileResponse:
+    """Collapsed stacks of a profiled request, for flamegraph.pl or speedscope"""
+    return FileResponse(_profile_file(profile_id, ".collapsed"), media_type="text/plain; charset=utf-8")
+
+@router.get("/{profile_id}/pstats")
+async def get_profile_pstats(profile_id: str) -> FileResponse:
+    """pstats file of a profiled request, for python -m pstats or snakeviz"""
+    return FileResponse(
+        _profile_file(profile_id, ".pstats"),
+        media_type="application/octet-stream",
+        filename=f"{profile_id}.pstats"
+    )
@@ -3,7 +3,7 @@ API router for ADK Meal Planning API v1
 """
 
 from fastapi import APIRouter
-from app.api.v1.endpoints import meal_planning, agents
+from app.api.v1.endpoints import meal_planning, agents, profiles
 
 # Create main API router
 api_router = APIRouter()
@@ -20,3 +20,9 @@ api_router.include_router(
     prefix="/agents",
     tags=["agents"]
 )
+
+api_router.include_router(
+    profiles.router,
+    prefix="/profiles",
+    tags=["profiles"]
+)
@@ -0,0 +1,175 @@
+"""
+Content-addressed LLM response cache for ADK agents
+In-process LRU in front of Redis
+"""
+
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import redis.asyncio as redis
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+class ResponseCache:
+    """Two-tier cache for model responses
+
+    The first tier is a size-capped in-process LRU, the second a shared
+    Redis instance. Both tiers expire entries after the configured TTL.
+    When Redis is unreachable the cache degrades to the local tier and
+    retries Redis after a cooldown.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: int = 3600,
+        redis_url: Optional[str] = None,
+        enabled: bool = True,
+        key_prefix: str = "adk:llm:",
+        redis_retry_interval: float = 30.0
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self.enabled = enabled
+        self.key_prefix = key_prefix
+        self.redis_retry_interval = redis_retry_interval
+
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._redis: Optional[redis.Redis] = None
+        self._redis_disabled_until = 0.0
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "redis_errors": 0,
+        }
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Normalize a prompt so formatting-only differences share a key"""
+        return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", prompt)).strip()
+
+    def make_key(
+        self,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        prompt: str,
+        response_format: str = "text"
+    ) -> str:
+        """Build the cache key for a model call
+
+        response_format tells plain text, JSON and schema-constrained calls
+        (with a hash of the schema) apart, since one prompt gets different
+        answers in each.
+        """
+        prompt_hash = hashlib.sha256(self.normalize_prompt(prompt).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}{model}:{temperature}:{max_tokens}:{response_format}:{prompt_hash}"
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look a key up in the local tier, then in Redis"""
+        if not self.enabled:
+            return None
+
+        entry = self._local.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._local.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return value
+            del self._local[key]
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                value = await client.get(key)
+            except Exception as e:
+                self._on_redis_error(e)
+            else:
+                if value is not None:
+                    self._stats["redis_hits"] += 1
+                    self._set_local(key, value)
+                    return value
+
+        self._stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        """Store a value in both tiers"""
+        if not self.enabled:
+            return
+
+        self._stats["stores"] += 1
+        self._set_local(key, value)
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await client.set(key, value, ex=self.ttl)
+            except Exception as e:
+                self._on_redis_error(e)
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and the current local tier size"""
+        return {**self._stats, "memory_entries": len(self._local)}
+
+    def clear(self) -> None:
+        """Drop every entry from the local tier"""
+        self._local.clear()
+
+    async def close(self) -> None:
+        """Close the Redis connection pool"""
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def _set_local(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Insert into the LRU, evicting the least recently used entries"""
+        self._local[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _get_redis(self) -> Optional[redis.Redis]:
+        """Get the Redis client unless Redis is disabled or cooling down"""
+        if not self.redis_url or time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            self._redis = redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5
+            )
+        return self._redis
+
+    def _on_redis_error(self, error: Exception) -> None:
+        """Fall back to the local tier for a while after a Redis failure"""
+        self._stats["redis_errors"] += 1
+        self._redis_disabled_until = time.monotonic() + self.redis_retry_interval
+        logger.warning(
+            "Redis cache unavailable, using in-process cache only",
+            error=str(error),
+            retry_in=self.redis_retry_interval
+        )
+
+# Global cache instance shared by all agents
+response_cache = ResponseCache(
+    max_entries=settings.cache_max_entries,
+    ttl=settings.cache_ttl,
+    redis_url=settings.redis_url,
+    enabled=settings.cache_enabled
+)
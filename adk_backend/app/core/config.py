@@ -18,48 +18,163 @@ class Settings(BaseSettings):
     gemini_api_key: Optional[str] = None
     # OpenAI API key is no longer needed - using Google Imagen instead
     
+    # Gemini client ("async" uses the SDK async API, "executor" a bounded thread pool)
+    gemini_client_mode: str = "async"
+    gemini_executor_workers: int = 16
+    gemini_request_timeout: float = 30.0  # seconds
+    # Alternative Gemini endpoint, such as the local stand-in server
+    # (python -m app.devtools.fake_gemini); uses the REST transport unless
+    # gemini_transport says otherwise
+    gemini_api_endpoint: Optional[str] = None
+    gemini_transport: Optional[str] = None  # rest, grpc or grpc_asyncio
+    # JSON output for agent responses ("schema" constrains Gemini to each
+    # agent's response schema, "mime" only requests JSON, "off" sends plain prompts)
+    gemini_json_mode: str = "schema"
+    # Hedged requests (opt-in): a call running longer than this percentile of
+    # the agent's recent call latencies gets a duplicate, and the first wins
+    gemini_hedging: bool = False
+    gemini_hedge_percentile: float = 0.95
+    gemini_hedge_min_delay: float = 1.0  # seconds
+    gemini_hedge_window: int = 200  # recent calls per agent
+    gemini_hedge_min_samples: int = 20
+    
+    # Identical concurrent agent requests share one in-flight call
+    request_coalescing: bool = True
+    
+    # Latency budget (seconds) for one meal plan; stages that overrun their
+    # own timeout or the overall deadline are replaced by local fallbacks
+    meal_plan_deadline: float = 45.0
+    
     # Agent Configuration
     default_model: str = "gemini-1.5-pro"
     default_temperature: float = 0.7
     default_max_tokens: int = 2048
     
+    # Ingredient lists in prompts: most urgent ingredients first, the rest
+    # summarized by category once the (estimated) token budget is used up
+    prompt_ingredient_token_budget: int = 1500
+    prompt_max_ingredients: int = 120
+    
     # Agent-specific settings
+    # Model routing: an agent with a fast model tries it first and escalates
+    # to its main model when the output fails schema validation or the
+    # agent's quality check (set <AGENT>_FAST_MODEL empty to always use the main model)
+    model_routing: bool = True
+    # A rejected fast-model output is not escalated when less of the stage
+    # budget is left than a main-model call takes (its median latency, or
+    # this many seconds until enough calls have been seen)
+    escalation_expected_latency: float = 4.0
     ingredient_analysis_model: str = "gemini-1.5-pro"
+    ingredient_analysis_fast_model: Optional[str] = "gemini-1.5-flash"
     ingredient_analysis_temperature: float = 0.3
     ingredient_analysis_max_tokens: int = 2000
+    ingredient_analysis_timeout: float = 6.0
     
     nutrition_balance_model: str = "gemini-1.5-pro"
+    nutrition_balance_fast_model: Optional[str] = "gemini-1.5-flash"
     nutrition_balance_temperature: float = 0.2
     nutrition_balance_max_tokens: int = 1500
+    nutrition_balance_timeout: float = 6.0
+    
+    # Fused ingredient + nutrition analysis in one call (replaces the two stages above)
+    fused_analysis: bool = False
+    fridge_analysis_model: str = "gemini-1.5-pro"
+    fridge_analysis_fast_model: Optional[str] = "gemini-1.5-flash"
+    fridge_analysis_temperature: float = 0.2
+    fridge_analysis_max_tokens: int = 2500
+    fridge_analysis_timeout: float = 8.0
     
     recipe_suggestion_model: str = "gemini-1.5-pro"
+    recipe_suggestion_fast_model: Optional[str] = None
     recipe_suggestion_temperature: float = 0.7
     recipe_suggestion_max_tokens: int = 3000
+    recipe_suggestion_timeout: float = 15.0
     
     cooking_optimization_model: str = "gemini-1.5-pro"
+    cooking_optimization_fast_model: Optional[str] = "gemini-1.5-flash"
     cooking_optimization_temperature: float = 0.4
     cooking_optimization_max_tokens: int = 2000
+    cooking_optimization_timeout: float = 8.0
     
     meal_theme_model: str = "gemini-1.5-pro"
+    meal_theme_fast_model: Optional[str] = "gemini-1.5-flash"
     meal_theme_temperature: float = 0.8
     meal_theme_max_tokens: int = 1000
+    meal_theme_timeout: float = 8.0
     
     image_generation_model: str = "imagen-3"
     image_generation_temperature: float = 0.9
     image_generation_max_tokens: int = 500
+    image_generation_timeout: float = 12.0
     
     user_preference_model: str = "gemini-1.5-pro"
+    user_preference_fast_model: Optional[str] = None
     user_preference_temperature: float = 0.6
     user_preference_max_tokens: int = 2000
     
     # Redis Configuration (for caching)
-    redis_url: str = "redis://localhost:6379"
+    redis_url: str = "redis://localhost:6379"  # empty to use the in-process cache only
     cache_ttl: int = 3600  # 1 hour
+    cache_enabled: bool = True
+    cache_max_entries: int = 1024
+    # Recipe suggestions reused across refrigerators whose fridge signature
+    # (urgent ingredients, category histogram, preferences) is this similar
+    recipe_cache_enabled: bool = True
+    recipe_cache_similarity: float = 0.85
+    recipe_cache_bucket_size: int = 32
+    
+    # Image generation jobs ("background" returns the meal plan before images, "inline" waits for them)
+    image_generation_mode: str = "background"
+    image_job_backend: str = "local"  # local | celery
+    image_job_workers: int = 4
+    image_job_retention: int = 10000
+    image_job_max_queued: int = 1000  # local backend; jobs beyond it fail immediately
+    celery_broker_url: Optional[str] = None  # defaults to redis_url
+    celery_result_backend: Optional[str] = None  # defaults to redis_url
+    
+    # Batch meal planning
+    batch_max_items: int = 5000
+    batch_max_concurrency: int = 8
     
-    # Rate limiting
+    # Rate limiting of outbound Gemini calls, per model: requests per window,
+    # concurrent calls, and how long a call may queue before it is rejected
     rate_limit_requests: int = 100
     rate_limit_window: int = 60  # seconds
-    
+    gemini_max_concurrency: int = 16
+    rate_limit_max_wait: float = 10.0  # seconds
+    # Retries of calls throttled by Gemini (429)
+    gemini_max_retries: int = 2
+    gemini_retry_base_delay: float = 1.0  # seconds
+    gemini_retry_max_delay: float = 20.0  # seconds
+
+    # Request tracing: spans per stage and Gemini call, appended as OTLP/JSON
+    # to trace_export_path when set; slower requests log their span breakdown
+    tracing_enabled: bool = True
+    trace_export_path: Optional[str] = None
+    trace_slow_request_threshold: float = 15.0  # seconds
+    trace_max_spans: int = 2000
+
+    # On-demand profiling: a /meal-planning/suggest request whose
+    # X-Profile-Token header matches profiling_token runs under a sampling
+    # profiler, saved in profiling_dir (disabled while the token is unset)
+    profiling_token: Optional[str] = None
+    profiling_interval: float = 0.002  # seconds between samples
+    profiling_max_duration: float = 120.0  # seconds
+    profiling_dir: str = "profiles"
+    profiling_max_profiles: int = 100
+
+    # Startup: agents and the Gemini SDK load in the background once the
+    # server is up (when false, on first use); startup_import_report also
+    # logs the slowest imports, as measured by python -X importtime
+    startup_warmup: bool = True
+    startup_import_report: bool = False
+
+    # Event loop watchdog (opt-in): heartbeat every interval seconds, exporting
+    # the loop lag, and logs the blocking stack when the loop stalls past the threshold
+    loop_watchdog_enabled: bool = False
+    loop_watchdog_interval: float = 0.1  # seconds
+    loop_watchdog_threshold: float = 0.5  # seconds
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": False,
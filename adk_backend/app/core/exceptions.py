@@ -111,6 +111,18 @@ class ImageGenerationError(AgentException):
             details=details
         )
 
+class FridgeAnalysisError(AgentException):
+    """Exception for fridge analysis agent"""
+    
+    def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(
+            message=message,
+            agent_name="fridge_analysis",
+            error_code="FRIDGE_ANALYSIS_ERROR",
+            status_code=400,
+            details=details
+        )
+
 class UserPreferenceError(AgentException):
     """Exception for user preference conversation agent"""
     
@@ -134,6 +146,17 @@ class APIValidationError(MealPlanningException):
             details={"field": field, **(details or {})}
         )
 
+class RateLimitExceededError(MealPlanningException):
+    """Exception raised when an outbound call waits too long for the rate limiter"""
+    
+    def __init__(self, message: str, model: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(
+            message=f"Rate limit for model '{model}' exceeded: {message}",
+            error_code="RATE_LIMIT_EXCEEDED",
+            status_code=429,
+            details={"model": model, **(details or {})}
+        )
+
 class ExternalAPIError(MealPlanningException):
     """Exception for external API errors"""
     
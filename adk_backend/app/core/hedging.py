@@ -0,0 +1,90 @@
+"""
+Hedged requests for tail latency
+A call slower than usual gets a duplicate, and the first to finish wins
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, TypeVar
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar('T')
+
+class LatencyTracker:
+    """Recent call latencies and their percentiles"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        """Add the latency of a completed call"""
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency below which the given fraction of recent calls finished
+
+        None until enough calls have been seen to make the estimate useful.
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+        return ordered[index]
+
+async def hedged(
+    make_call: Callable[[], Awaitable[T]],
+    delay: Optional[float],
+    on_hedge: Optional[Callable[[str], None]] = None,
+    can_hedge: Optional[Callable[[], bool]] = None
+) -> T:
+    """Run make_call, starting a duplicate if it has not finished after delay
+
+    Returns the first successful result and cancels the other call. If one
+    call fails the other is still awaited; the error is raised only if both
+    fail. When can_hedge returns False at the delay (for example because
+    the rate limiter has no capacity left) no duplicate is started. on_hedge
+    is called with "primary", "hedge" or "failed" once a hedge has been
+    fired and the outcome is known, or with "skipped".
+    """
+    primary = asyncio.ensure_future(make_call())
+    tasks = [primary]
+    try:
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return primary.result()
+
+        if can_hedge is not None and not can_hedge():
+            # A duplicate would only queue behind the calls already waiting
+            if on_hedge:
+                on_hedge("skipped")
+            return await primary
+
+        hedge = asyncio.ensure_future(make_call())
+        tasks.append(hedge)
+        logger.debug("Fired hedged request", delay=round(delay, 3))
+
+        pending = set(tasks)
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if on_hedge:
+                        on_hedge("primary" if task is primary else "hedge")
+                    return task.result()
+                first_error = first_error or task.exception()
+
+        if on_hedge:
+            on_hedge("failed")
+        raise first_error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
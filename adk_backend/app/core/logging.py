@@ -13,6 +13,7 @@ def setup_logging() -> None:
     # Configure structlog
     structlog.configure(
         processors=[
+            structlog.contextvars.merge_contextvars,  # trace_id of the current request
             structlog.stdlib.filter_by_level,
             structlog.stdlib.add_logger_name,
             structlog.stdlib.add_log_level,
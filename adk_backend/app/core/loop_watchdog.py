@@ -0,0 +1,114 @@
+"""
+Event loop stall watchdog
+Measures event loop lag with a heartbeat and, when the loop is blocked for
+longer than a threshold, logs the stack of the code blocking it
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+import structlog
+
+from app.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+logger = structlog.get_logger(__name__)
+
+# Innermost frames of a blocking stack included in the log
+STACK_LIMIT = 40
+
+# Bottom of every task's stack: the event loop callback that steps the task
+_HANDLE_RUN = asyncio.events.Handle._run.__code__
+
+class LoopWatchdog:
+    """Heartbeat on the event loop plus a thread that watches it
+
+    A coroutine on the loop sleeps for interval and records how late it
+    woke up as the loop lag. A separate thread checks the heartbeat; when
+    none has arrived for longer than threshold, the loop is blocked by a
+    synchronous call, and the thread logs the loop thread's current stack
+    (once per stall) while the call is still running.
+    """
+
+    def __init__(self, server: str, interval: float = 0.1, threshold: float = 0.5):
+        self.server = server
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._reported_beat: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start watching the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Event loop watchdog started",
+            server=self.server,
+            interval=self.interval,
+            threshold=self.threshold
+        )
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the watching thread"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+
+    async def _heartbeat(self) -> None:
+        lag_metric = EVENT_LOOP_LAG.labels(server=self.server)
+        while True:
+            scheduled = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            lag = max(0.0, now - scheduled)
+            lag_metric.observe(lag)
+            if lag >= self.threshold:
+                EVENT_LOOP_STALLS.labels(server=self.server).inc()
+                logger.warning("Event loop stalled", server=self.server, lag=round(lag, 3))
+
+    def _watch(self) -> None:
+        # Check often enough to catch the stall while it is still running
+        while not self._stop.wait(min(self.interval, self.threshold / 2)):
+            beat = self._last_beat
+            blocked_for = time.monotonic() - beat - self.interval
+            if blocked_for >= self.threshold and self._reported_beat != beat:
+                self._reported_beat = beat
+                self._report_blocked(blocked_for)
+
+    def _report_blocked(self, blocked_for: float) -> None:
+        """Log what the loop thread is running right now"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        task = asyncio.current_task(self._loop)
+        # Drop the event loop's own frames below the blocking callback
+        frames = []
+        while frame is not None and frame.f_code is not _HANDLE_RUN:
+            frames.append((frame, frame.f_lineno))
+            frame = frame.f_back
+        frames.reverse()
+        stack = traceback.StackSummary.extract(frames[-STACK_LIMIT:]).format()
+        logger.warning(
+            "Event loop blocked",
+            server=self.server,
+            blocked_for=round(blocked_for, 3),
+            task=task.get_name() if task is not None else None,
+            coroutine=getattr(task.get_coro(), "__qualname__", None) if task is not None else None,
+            stack="".join(stack)
+        )
@@ -0,0 +1,149 @@
+"""
+Prometheus metrics for ADK Meal Planning API
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Agent seconds range from cached hits to multi-call image generation
+AGENT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+# Agents
+AGENT_LATENCY = Histogram(
+    "adk_agent_process_seconds",
+    "Time spent in an agent's process call",
+    ["agent", "outcome"],
+    buckets=AGENT_BUCKETS
+)
+AGENT_IN_FLIGHT = Gauge(
+    "adk_agent_in_flight",
+    "Agent process calls currently running",
+    ["agent"]
+)
+COALESCED_REQUESTS = Counter(
+    "adk_agent_coalesced_requests_total",
+    "Agent requests served by an identical call already in flight",
+    ["agent"]
+)
+MOCK_FALLBACKS = Counter(
+    "adk_agent_mock_fallbacks_total",
+    "Agent results built from the local mock instead of Gemini",
+    ["agent", "reason"]
+)
+JSON_PARSE_FAILURES = Counter(
+    "adk_agent_json_parse_failures_total",
+    "Gemini responses that could not be parsed as JSON or did not match the response schema",
+    ["agent", "reason"]
+)
+JSON_REPAIRS = Counter(
+    "adk_agent_json_repairs_total",
+    "Gemini responses whose JSON was truncated or malformed and had to be repaired",
+    ["agent"]
+)
+
+# Prompt assembly
+PROMPT_INGREDIENTS = Counter(
+    "adk_prompt_ingredients_total",
+    "Ingredients listed in, summarized out of, or merged into prompts",
+    ["agent", "kind"]
+)
+PROMPT_SECTION_TOKENS = Histogram(
+    "adk_prompt_ingredient_section_tokens",
+    "Estimated tokens of the ingredient list in a prompt",
+    ["agent"],
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000)
+)
+
+# Gemini
+MODEL_ROUTING = Counter(
+    "adk_model_routing_total",
+    "Agent JSON outputs per model: accepted, or rejected for schema, quality or error (fast-model rejections escalate), or skipped when the stage budget is too short",
+    ["agent", "model", "decision"]
+)
+GEMINI_CALLS = Counter(
+    "adk_gemini_calls_total",
+    "Gemini generate_content calls",
+    ["agent", "model", "outcome"]
+)
+GEMINI_HEDGES = Counter(
+    "adk_gemini_hedges_total",
+    "Duplicate Gemini calls fired for slow calls, by which call finished first (skipped: not fired, the rate limiter had no capacity)",
+    ["agent", "winner"]
+)
+GEMINI_TOKENS = Counter(
+    "adk_gemini_tokens_total",
+    "Tokens reported in Gemini usage metadata",
+    ["agent", "model", "kind"]
+)
+GEMINI_QUEUE_DEPTH = Gauge(
+    "adk_gemini_queue_depth",
+    "Gemini calls waiting for the rate limiter",
+    ["model"]
+)
+GEMINI_LIMITER_WAIT = Histogram(
+    "adk_gemini_limiter_wait_seconds",
+    "Time Gemini calls spent waiting for the rate limiter",
+    ["model"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+)
+GEMINI_THROTTLED = Counter(
+    "adk_gemini_throttled_total",
+    "Gemini calls throttled by the server (429) or rejected after waiting for the limiter",
+    ["model", "reason"]
+)
+LLM_CACHE_REQUESTS = Counter(
+    "adk_llm_cache_requests_total",
+    "LLM response cache lookups",
+    ["agent", "result"]
+)
+
+RECIPE_CACHE_REQUESTS = Counter(
+    "adk_recipe_cache_requests_total",
+    "Recipe suggestion cache lookups by fridge signature (exact, near or miss)",
+    ["result"]
+)
+RECIPE_CACHE_SIMILARITY = Histogram(
+    "adk_recipe_cache_hit_similarity",
+    "Fridge signature similarity of recipe suggestion cache hits",
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0)
+)
+
+# Meal planning pipeline
+MEAL_PLANS_IN_FLIGHT = Gauge(
+    "adk_meal_plans_in_flight",
+    "Meal planning pipelines currently running"
+)
+MEAL_PLAN_LATENCY = Histogram(
+    "adk_meal_plan_seconds",
+    "End-to-end meal planning pipeline time",
+    ["outcome"],
+    buckets=AGENT_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "adk_meal_plan_stage_seconds",
+    "Time spent in each meal planning stage",
+    ["stage"],
+    buckets=AGENT_BUCKETS
+)
+STAGE_DEGRADED = Counter(
+    "adk_meal_plan_stage_degraded_total",
+    "Stages replaced by their local fallback after running out of time",
+    ["stage"]
+)
+STAGE_FAILURES = Counter(
+    "adk_meal_plan_stage_failures_total",
+    "Optional stages that failed or were skipped",
+    ["stage"]
+)
+
+# Event loop watchdog
+EVENT_LOOP_LAG = Histogram(
+    "adk_event_loop_lag_seconds",
+    "How late the event loop ran the watchdog's heartbeat, i.e. how long callbacks blocked it",
+    ["server"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+EVENT_LOOP_STALLS = Counter(
+    "adk_event_loop_stalls_total",
+    "Event loop stalls longer than the watchdog threshold",
+    ["server"]
+)
@@ -0,0 +1,268 @@
+"""
+Shared non-blocking Gemini client for ADK agents
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Optional, Tuple
+import structlog
+
+from app.core.config import settings
+from app.core.metrics import GEMINI_THROTTLED
+from app.core.rate_limiter import ModelRateLimiter, rate_limit_errors, retry_delay
+from app.core.tracing import span
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+logger = structlog.get_logger(__name__)
+
+class GeminiClient:
+    """Async facade over google.generativeai shared by all agents
+
+    Model instances are cached per (model, temperature, max_tokens) so
+    agents with the same configuration share one GenerativeModel. Calls go
+    through the SDK's async API, or through a bounded thread pool when
+    gemini_client_mode is "executor", so the event loop is never blocked
+    for the duration of an LLM round trip.
+
+    Every call first goes through the model's rate limiter, and calls
+    throttled by Gemini (429) are retried after the requested delay.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        mode: str = "async",
+        api_endpoint: Optional[str] = None,
+        transport: Optional[str] = None,
+        executor_workers: int = 16,
+        requests_per_window: int = 100,
+        window: float = 60.0,
+        max_concurrency: int = 16,
+        max_wait: float = 10.0,
+        max_retries: int = 2,
+        retry_base_delay: float = 1.0,
+        retry_max_delay: float = 20.0
+    ):
+        if mode not in ("async", "executor"):
+            raise ValueError(f"Unknown Gemini client mode: {mode}")
+
+        self.api_key = api_key
+        self.api_endpoint = api_endpoint or None
+        # A custom endpoint such as the local stand-in server speaks REST
+        self.transport = transport or ("rest" if self.api_endpoint else None)
+        # The SDK has no async client over REST, so REST calls use the executor
+        self.mode = "executor" if self.transport == "rest" else mode
+        self.executor_workers = executor_workers
+        self.requests_per_window = requests_per_window
+        self.window = window
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._limiters: Dict[str, ModelRateLimiter] = {}
+        self._models: Dict[Tuple[str, float, int], "genai.GenerativeModel"] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._configured = False
+        self._lock = threading.Lock()
+        # Held while importing the SDK and creating models, which can take seconds
+        self._model_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether real Gemini calls can be made"""
+        return bool(self.api_key)
+
+    def _configure(self) -> None:
+        """Configure the SDK once per process"""
+        if self._configured:
+            return
+        with self._model_lock:
+            if not self._configured:
+                import google.generativeai as genai
+                options: Dict[str, Any] = {"api_key": self.api_key}
+                if self.transport:
+                    options["transport"] = self.transport
+                if self.api_endpoint:
+                    options["client_options"] = {"api_endpoint": self.api_endpoint}
+                    logger.info(
+                        "Using custom Gemini endpoint",
+                        api_endpoint=self.api_endpoint,
+                        transport=self.transport,
+                        mode=self.mode
+                    )
+                genai.configure(**options)
+                self._configured = True
+
+    def get_model(self, model: str, temperature: float, max_tokens: int) -> "genai.GenerativeModel":
+        """Get the shared model instance for a model configuration"""
+        key = (model, temperature, max_tokens)
+        cached = self._models.get(key)
+        if cached is not None:
+            return cached
+
+        self._configure()
+        import google.generativeai as genai
+        with self._model_lock:
+            if key not in self._models:
+                self._models[key] = genai.GenerativeModel(
+                    model,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature,
+                        max_output_tokens=max_tokens,
+                    )
+                )
+                logger.info(
+                    "Created Gemini model instance",
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            return self._models[key]
+
+    def warm_up(self, configurations: Iterable[Tuple[str, float, int]]) -> None:
+        """Import the SDK and create the model instances ahead of the first call
+
+        The SDK is imported on first use so that startup does not wait for
+        it; this lets startup pay that cost in the background instead of the
+        first request. Does nothing while Gemini is not configured.
+        """
+        if not self.enabled:
+            return
+        for model, temperature, max_tokens in configurations:
+            self.get_model(model, temperature, max_tokens)
+
+    async def generate_content(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        request_options: Optional[Dict[str, Any]] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+        on_call_time: Optional[Callable[[float], None]] = None
+    ) -> Any:
+        """Generate content without blocking the event loop
+
+        generation_config is merged over the shared model's configuration for
+        this call only (for example a JSON response MIME type and schema).
+        A model not created yet (at startup warm-up) is created in a worker
+        thread, since that may import the SDK. on_call_time gets the seconds
+        a successful call took once the rate limiter let it through.
+        """
+        generative_model = self._models.get((model, temperature, max_tokens))
+        if generative_model is None:
+            # The first call imports and configures the SDK, which takes seconds
+            generative_model = await asyncio.to_thread(self.get_model, model, temperature, max_tokens)
+        limiter = self.get_limiter(model)
+
+        for attempt in range(self.max_retries + 1):
+            with span("gemini.request", model=model, attempt=attempt + 1) as request_span:
+                async with limiter.slot():
+                    if request_span is not None:
+                        # Time spent waiting for the rate limiter
+                        request_span.set_attribute("queue_ms", round(request_span.duration * 1000, 3))
+                    try:
+                        call_start = time.perf_counter()
+                        response = await self._call_model(
+                            generative_model,
+                            prompt,
+                            generation_config,
+                            request_options
+                        )
+                        if on_call_time is not None:
+                            on_call_time(time.perf_counter() - call_start)
+                        return response
+                    except rate_limit_errors() as e:
+                        GEMINI_THROTTLED.labels(model=model, reason="rate_limited").inc()
+                        delay = retry_delay(e, attempt, self.retry_base_delay, self.retry_max_delay)
+                        # Give up now rather than queue past the limiter's bounded wait
+                        if attempt == self.max_retries or delay > self.max_wait:
+                            raise
+                        logger.warning(
+                            "Gemini call throttled, retrying",
+                            model=model,
+                            attempt=attempt + 1,
+                            delay=round(delay, 2)
+                        )
+                        # Hold back every caller of this model, not just this one
+                        limiter.pause(delay)
+
+    def has_capacity(self, model: str) -> bool:
+        """Whether a call to the model could start now without queueing"""
+        return self.get_limiter(model).has_capacity()
+
+    def get_limiter(self, model: str) -> ModelRateLimiter:
+        """Get the rate limiter shared by all calls to a model"""
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limiter = self._limiters.setdefault(model, ModelRateLimiter(
+                model,
+                requests_per_window=self.requests_per_window,
+                window=self.window,
+                max_concurrency=self.max_concurrency,
+                max_wait=self.max_wait
+            ))
+        return limiter
+
+    async def _call_model(
+        self,
+        generative_model: "genai.GenerativeModel",
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]],
+        request_options: Optional[Dict[str, Any]]
+    ) -> Any:
+        """Make one generate_content call through the configured mode"""
+        if self.mode == "async":
+            return await generative_model.generate_content_async(
+                prompt,
+                generation_config=generation_config,
+                request_options=request_options
+            )
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(),
+            lambda: generative_model.generate_content(
+                prompt,
+                generation_config=generation_config,
+                request_options=request_options
+            )
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the bounded executor used in executor mode"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.executor_workers,
+                        thread_name_prefix="gemini"
+                    )
+        return self._executor
+
+    def close(self) -> None:
+        """Release the executor threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+# Global client instance shared by all agents
+gemini_client = GeminiClient(
+    api_key=settings.gemini_api_key,
+    mode=settings.gemini_client_mode,
+    api_endpoint=settings.gemini_api_endpoint,
+    transport=settings.gemini_transport,
+    executor_workers=settings.gemini_executor_workers,
+    requests_per_window=settings.rate_limit_requests,
+    window=settings.rate_limit_window,
+    max_concurrency=settings.gemini_max_concurrency,
+    max_wait=settings.rate_limit_max_wait,
+    max_retries=settings.gemini_max_retries,
+    retry_base_delay=settings.gemini_retry_base_delay,
+    retry_max_delay=settings.gemini_retry_max_delay
+)
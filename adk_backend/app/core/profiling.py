@@ -0,0 +1,260 @@
+"""
+On-demand sampling profiler for single requests
+Samples the event loop thread only while it runs one of the profiled
+request's tasks, so concurrent requests do not show up in its profile
+"""
+
+import asyncio
+import json
+import marshal
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# (filename, first line, qualified name), the function key used by pstats
+FrameKey = Tuple[str, int, str]
+
+# Bottom of every task's stack: the event loop callback that steps the task
+_HANDLE_RUN = asyncio.events.Handle._run.__code__
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{16}$")
+
+# Functions listed in a profile summary
+SUMMARY_TOP_FUNCTIONS = 30
+
+class RequestProfiler:
+    """Sampling profiler following the tasks of one request
+
+    The task that starts the profiler is followed, and so is every task
+    that calls attach(), which request tracing does for each span opened
+    in the request. A background thread samples the event loop thread's
+    stack every interval seconds and keeps the sample only when the task
+    running at that moment is one of them.
+    """
+
+    def __init__(self, interval: float = 0.002, max_duration: float = 120.0, label: str = ""):
+        self.profile_id = secrets.token_hex(8)
+        self.interval = interval
+        self.max_duration = max_duration
+        self.label = label
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        # Samples taken while the loop ran other requests' tasks or waited for I/O
+        self.other_samples = 0
+        self.idle_samples = 0
+        self.truncated = False
+        self.started_at: Optional[datetime] = None
+        self.duration = 0.0
+        # Average time between samples. Longer than interval while the loop
+        # holds the GIL, since the sampler thread only runs at thread switches
+        self.period = interval
+        self._tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._start_time = 0.0
+
+    def start(self) -> None:
+        """Start sampling; must be called from the request's task"""
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self.attach()
+        self.started_at = datetime.now(timezone.utc)
+        self._start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.profile_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._start_time
+        taken = self.samples + self.other_samples + self.idle_samples
+        if taken:
+            self.period = self.duration / taken
+
+    def attach(self) -> None:
+        """Follow the current task as part of the profiled request"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            return
+        if task is not None:
+            self._tasks.add(task)
+
+    def _run(self) -> None:
+        deadline = time.perf_counter() + self.max_duration
+        while not self._stop.wait(self.interval):
+            if time.perf_counter() > deadline:
+                self.truncated = True
+                return
+            self._sample()
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self._thread_id)
+        task = asyncio.current_task(self._loop)
+        if frame is None:
+            return
+        if task is None:
+            self.idle_samples += 1
+            return
+        if task not in self._tasks:
+            self.other_samples += 1
+            return
+
+        stack: List[FrameKey] = []
+        while frame is not None and frame.f_code is not _HANDLE_RUN:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_qualname))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        lines = [
+            ";".join(_frame_label(key) for key in stack) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def pstats(self) -> Dict[FrameKey, Any]:
+        """Samples as a pstats table, so pstats and snakeviz can read them
+
+        Times are samples multiplied by the sampling period; call counts are
+        the number of samples a function appeared in, not real calls.
+        """
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        edges: Dict[FrameKey, Counter] = defaultdict(Counter)
+        edge_self: Dict[FrameKey, Counter] = defaultdict(Counter)
+
+        for stack, count in self.stacks.items():
+            if not stack:
+                continue
+            self_samples[stack[-1]] += count
+            for key in set(stack):
+                total_samples[key] += count
+            seen = set()
+            for caller, callee in zip(stack, stack[1:]):
+                if (caller, callee) not in seen:
+                    seen.add((caller, callee))
+                    edges[callee][caller] += count
+            if len(stack) > 1:
+                edge_self[stack[-1]][stack[-2]] += count
+
+        stats: Dict[FrameKey, Any] = {}
+        for key, total in total_samples.items():
+            callers = {
+                caller: (count, count, edge_self[key][caller] * self.period, count * self.period)
+                for caller, count in edges[key].items()
+            }
+            stats[key] = (total, total, self_samples[key] * self.period, total * self.period, callers)
+        return stats
+
+    def summary(self) -> Dict[str, Any]:
+        """Profile metadata and the functions with the most samples"""
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                self_samples[stack[-1]] += count
+            for key in set(stack):
+                total_samples[key] += count
+
+        def top(counter: Counter) -> List[Dict[str, Any]]:
+            return [
+                {
+                    "function": _frame_label(key),
+                    "samples": count,
+                    "ms": round(count * self.period * 1000, 1)
+                }
+                for key, count in counter.most_common(SUMMARY_TOP_FUNCTIONS)
+            ]
+
+        return {
+            "profile_id": self.profile_id,
+            "label": self.label,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "duration": round(self.duration, 4),
+            "interval": self.interval,
+            "period": round(self.period, 6),
+            "samples": self.samples,
+            "other_samples": self.other_samples,
+            "idle_samples": self.idle_samples,
+            "truncated": self.truncated,
+            "top_self": top(self_samples),
+            "top_total": top(total_samples),
+        }
+
+class ProfileStore:
+    """Profiles saved on disk by ID, keeping the most recent max_profiles
+
+    Each profile is a summary (<id>.json), collapsed stacks for flame graphs
+    (<id>.collapsed) and a pstats file (<id>.pstats).
+    """
+
+    EXTENSIONS = (".json", ".collapsed", ".pstats")
+
+    def __init__(self, directory: str, max_profiles: int = 100):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, profiler: RequestProfiler) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profiler.profile_id)
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(profiler.collapsed())
+        with open(base + ".pstats", "wb") as f:
+            marshal.dump(profiler.pstats(), f)
+        # The summary is written last: a profile exists once it is there
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(profiler.summary(), f, ensure_ascii=False, indent=2)
+        self._prune()
+
+    def path(self, profile_id: str, extension: str) -> Optional[str]:
+        """Path of a saved profile file, or None if there is no such profile"""
+        if not _PROFILE_ID.match(profile_id) or extension not in self.EXTENSIONS:
+            return None
+        path = os.path.join(self.directory, profile_id + extension)
+        if not os.path.exists(os.path.join(self.directory, profile_id + ".json")) or not os.path.exists(path):
+            return None
+        return path
+
+    def _prune(self) -> None:
+        summaries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in summaries[:max(0, len(summaries) - self.max_profiles)]:
+            profile_id = entry.name[:-len(".json")]
+            for extension in self.EXTENSIONS:
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + extension))
+                except FileNotFoundError:
+                    pass
+
+def _frame_label(key: FrameKey) -> str:
+    filename, line, name = key
+    return f"{name} ({_short_path(filename)}:{line})"
+
+def _short_path(filename: str) -> str:
+    """File path relative to site-packages or the working directory"""
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    if index >= 0:
+        return filename[index + len(marker):]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd):]
+    return filename
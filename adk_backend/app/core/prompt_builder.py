@@ -0,0 +1,196 @@
+"""
+Token-budgeted prompt assembly for ADK agents
+Keeps ingredient lists of large refrigerators within a prompt token budget
+"""
+
+import math
+import unicodedata
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import structlog
+
+from app.core.config import settings
+from app.core.metrics import PROMPT_INGREDIENTS, PROMPT_SECTION_TOKENS
+from app.models.schemas import ExpiryPriority, Ingredient
+
+logger = structlog.get_logger(__name__)
+
+# Categories listed by name in the summary of omitted ingredients
+SUMMARY_MAX_CATEGORIES = 8
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_NO_EXPIRY = float("inf")
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the Gemini token count of a text
+
+    About four ASCII characters make one token, while Japanese text is
+    close to one token per character.
+    """
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+class IngredientPromptSection:
+    """Ingredient lines selected for a prompt and what was left out"""
+
+    def __init__(
+        self,
+        lines: List[str],
+        included: int,
+        total: int,
+        duplicates_merged: int,
+        estimated_tokens: int
+    ):
+        self.lines = lines
+        self.included = included
+        # Distinct ingredients after merging duplicates
+        self.total = total
+        self.duplicates_merged = duplicates_merged
+        self.estimated_tokens = estimated_tokens
+
+    @property
+    def omitted(self) -> int:
+        """Ingredients only counted in the category summary"""
+        return self.total - self.included
+
+    @property
+    def text(self) -> str:
+        """The section as it goes into the prompt"""
+        return "\n".join(self.lines)
+
+def merge_duplicates(ingredients: Sequence[Ingredient]) -> List[Ingredient]:
+    """Merge ingredients with the same name into one entry
+
+    The merged entry keeps the most urgent priority and earliest expiry of
+    its duplicates; quantities in the same unit are added up.
+    """
+    groups: Dict[str, List[Ingredient]] = {}
+    for ingredient in ingredients:
+        groups.setdefault(_name_key(ingredient.name), []).append(ingredient)
+
+    merged: List[Ingredient] = []
+    for group in groups.values():
+        if len(group) == 1:
+            merged.append(group[0])
+            continue
+
+        # Urgency (priority, expiry, notes) comes from the most urgent entry
+        urgent = min(group, key=_rank_key)
+        quantity, unit = _merge_quantities(group)
+        merged.append(urgent.model_copy(update={
+            "quantity": quantity,
+            "unit": unit,
+            "available": any(ingredient.available for ingredient in group),
+            "category": next(
+                (ingredient.category for ingredient in group if ingredient.category != "その他"),
+                urgent.category
+            ),
+        }))
+    return merged
+
+def rank_ingredients(ingredients: Sequence[Ingredient]) -> List[Ingredient]:
+    """Order ingredients by priority score, then by expiry date"""
+    return sorted(ingredients, key=_rank_key)
+
+def build_ingredient_section(
+    ingredients: Sequence[Ingredient],
+    format_line: Callable[[Ingredient], str],
+    agent: str,
+    token_budget: Optional[int] = None,
+    max_items: Optional[int] = None
+) -> IngredientPromptSection:
+    """Build the ingredient list of a prompt within a token budget
+
+    Duplicates are merged and the most urgent ingredients are listed one
+    line each until the budget or max_items is reached; the rest are
+    summarized by category in a final line.
+    """
+    token_budget = settings.prompt_ingredient_token_budget if token_budget is None else token_budget
+    max_items = settings.prompt_max_ingredients if max_items is None else max_items
+
+    distinct = merge_duplicates(ingredients)
+    ranked = rank_ingredients(distinct)
+
+    lines: List[str] = []
+    used_tokens = 0
+    # Room for the summary line whenever something is left out (the summary
+    # of every ingredient is about as long as that of any remainder)
+    reserve = estimate_tokens(_summarize(ranked)) + 1 if ranked else 0
+    for index, ingredient in enumerate(ranked):
+        if len(lines) >= max_items:
+            break
+        line = format_line(ingredient)
+        line_tokens = estimate_tokens(line) + 1
+        needed = line_tokens + (reserve if index + 1 < len(ranked) else 0)
+        if used_tokens + needed > token_budget and lines:
+            break
+        lines.append(line)
+        used_tokens += line_tokens
+
+    included = len(lines)
+    if included < len(ranked):
+        lines.append(_summarize(ranked[included:]))
+
+    section = IngredientPromptSection(
+        lines=lines,
+        included=included,
+        total=len(ranked),
+        duplicates_merged=len(ingredients) - len(distinct),
+        estimated_tokens=estimate_tokens("\n".join(lines))
+    )
+
+    PROMPT_INGREDIENTS.labels(agent=agent, kind="listed").inc(section.included)
+    PROMPT_INGREDIENTS.labels(agent=agent, kind="summarized").inc(section.omitted)
+    PROMPT_INGREDIENTS.labels(agent=agent, kind="merged").inc(section.duplicates_merged)
+    PROMPT_SECTION_TOKENS.labels(agent=agent).observe(section.estimated_tokens)
+    if section.omitted or section.duplicates_merged:
+        logger.info(
+            "Fitted ingredient list to prompt budget",
+            agent_name=agent,
+            listed=section.included,
+            summarized=section.omitted,
+            duplicates_merged=section.duplicates_merged,
+            estimated_tokens=section.estimated_tokens,
+            token_budget=token_budget
+        )
+    return section
+
+def _name_key(name: str) -> str:
+    """Normalize an ingredient name for duplicate detection"""
+    return unicodedata.normalize("NFKC", name).strip().lower()
+
+def _rank_key(ingredient: Ingredient) -> Tuple[int, float, str]:
+    """Sort key: most urgent first, then soonest expiry"""
+    expiry = ingredient.expiry_date
+    if expiry is None:
+        expiry_ts = _NO_EXPIRY
+    else:
+        # Naive dates are taken as UTC so they sort alongside aware ones
+        expiry_ts = (expiry - (_EPOCH if expiry.tzinfo is None else _EPOCH_UTC)).total_seconds()
+    return ingredient.priority_score, expiry_ts, ingredient.name
+
+def _merge_quantities(group: Sequence[Ingredient]) -> Tuple[str, str]:
+    """Add up quantities in one unit, or list them when they cannot be added"""
+    units = {ingredient.unit for ingredient in group}
+    if len(units) > 1:
+        return "+".join(f"{ingredient.quantity}{ingredient.unit}" for ingredient in group), ""
+
+    unit = group[0].unit
+    try:
+        total = sum(float(ingredient.quantity) for ingredient in group)
+    except ValueError:
+        return "+".join(ingredient.quantity for ingredient in group), unit
+    return f"{total:g}", unit
+
+def _summarize(ingredients: Sequence[Ingredient]) -> str:
+    """Summarize omitted ingredients by category"""
+    categories = Counter(ingredient.category for ingredient in ingredients)
+    listed = [f"{category} {count}品" for category, count in categories.most_common(SUMMARY_MAX_CATEGORIES)]
+    if len(categories) > SUMMARY_MAX_CATEGORIES:
+        listed.append(f"ほか{len(categories) - SUMMARY_MAX_CATEGORIES}カテゴリ")
+
+    urgent = sum(1 for ingredient in ingredients if ingredient.priority in (ExpiryPriority.URGENT, ExpiryPriority.SOON))
+    urgent_text = f"、うち期限間近 {urgent}品" if urgent else ""
+    return f"※ほか{len(ingredients)}品（{'、'.join(listed)}{urgent_text}）"
@@ -0,0 +1,198 @@
+"""
+Outbound rate limiting for Gemini calls
+Per-model token bucket, concurrency cap and 429 backoff shared by all agents
+"""
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Tuple, Type
+import structlog
+
+from app.core.exceptions import RateLimitExceededError
+from app.core.metrics import GEMINI_LIMITER_WAIT, GEMINI_QUEUE_DEPTH, GEMINI_THROTTLED
+
+logger = structlog.get_logger(__name__)
+
+@lru_cache(maxsize=None)
+def rate_limit_errors() -> Tuple[Type[Exception], ...]:
+    """Errors that mean Gemini is throttling us (ResourceExhausted is a subclass)
+
+    Imported on first use rather than with this module: google.api_core
+    pulls in grpc, which startup does not need.
+    """
+    from google.api_core.exceptions import TooManyRequests
+    return (TooManyRequests,)
+
+class ModelRateLimiter:
+    """Token bucket and concurrency limit for calls to one model
+
+    The bucket holds up to requests_per_window tokens and refills evenly
+    over the window. Callers queue in arrival order for a token and then
+    for one of max_concurrency slots, for at most max_wait seconds. After a
+    429 the whole model is paused, so queued callers wait out the
+    retry-after instead of hitting the quota again.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        requests_per_window: int,
+        window: float,
+        max_concurrency: int,
+        max_wait: float
+    ):
+        self.model = model
+        self.capacity = max(1, requests_per_window)
+        self.refill_rate = self.capacity / max(window, 1e-3)  # tokens per second
+        self.max_wait = max_wait
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        # Held while waiting for a token, so callers get tokens in FIFO order
+        self._queue = asyncio.Lock()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a token and a concurrency slot for one call"""
+        GEMINI_QUEUE_DEPTH.labels(model=self.model).inc()
+        start_time = time.perf_counter()
+        try:
+            acquired = await self._acquire(time.monotonic() + self.max_wait)
+        finally:
+            GEMINI_QUEUE_DEPTH.labels(model=self.model).dec()
+            GEMINI_LIMITER_WAIT.labels(model=self.model).observe(time.perf_counter() - start_time)
+        if not acquired:
+            GEMINI_THROTTLED.labels(model=self.model, reason="queue_timeout").inc()
+            raise RateLimitExceededError(
+                f"Waited more than {self.max_wait}s for a call slot",
+                model=self.model
+            )
+
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def has_capacity(self) -> bool:
+        """Whether a call could start now without queueing"""
+        now = time.monotonic()
+        self._refill(now)
+        return (
+            now >= self._paused_until
+            and self._tokens >= 1
+            and not self._queue.locked()
+            and not self._slots.locked()
+        )
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given time (after a 429)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def _acquire(self, deadline: float) -> bool:
+        """Take a token, then a concurrency slot, giving up at the deadline
+
+        Returns False when either was not available in time; nothing is
+        held then. The deadline is checked here rather than by wrapping
+        the whole acquire in wait_for, which can time out just after the
+        semaphore was taken and leak the slot.
+        """
+        if not await _acquire_by(self._queue.acquire, self._queue.release, deadline):
+            return False
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    wait = (1 - self._tokens) / self.refill_rate
+                if now + wait > deadline:
+                    return False
+                await asyncio.sleep(wait)
+        finally:
+            self._queue.release()
+
+        if await _acquire_by(self._slots.acquire, self._slots.release, deadline):
+            return True
+        # The call is never made, so give its token back
+        self._tokens = min(self.capacity, self._tokens + 1)
+        return False
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens accumulated since the last refill"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+async def _acquire_by(
+    acquire: Callable[[], Awaitable[Any]],
+    release: Callable[[], None],
+    deadline: float
+) -> bool:
+    """Wait for a lock or semaphore until the deadline
+
+    Returns True when it was acquired. On timeout or cancellation the
+    pending acquire is cancelled, and released again if it won the race.
+    """
+    task = asyncio.ensure_future(acquire())
+    try:
+        done, _ = await asyncio.wait((task,), timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.CancelledError:
+        _abandon(task, release)
+        raise
+    if done:
+        task.result()
+        return True
+    _abandon(task, release)
+    return False
+
+def _abandon(task: "asyncio.Future[Any]", release: Callable[[], None]) -> None:
+    """Drop an acquire we no longer wait for without leaking what it takes"""
+    def release_if_acquired(task: "asyncio.Future[Any]") -> None:
+        if not task.cancelled() and task.exception() is None:
+            release()
+
+    if task.done():
+        release_if_acquired(task)
+    else:
+        task.cancel()
+        task.add_done_callback(release_if_acquired)
+
+def retry_delay(error: Exception, attempt: int, base_delay: float, max_delay: float) -> float:
+    """Seconds to wait before retrying a throttled call
+
+    Honours the server's retry-after when there is one, adding jitter so
+    callers throttled together do not retry in lockstep; otherwise uses
+    exponential backoff with jitter.
+    """
+    backoff = min(max_delay, base_delay * 2 ** attempt)
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        return retry_after + random.uniform(0, backoff)
+    return random.uniform(backoff / 2, backoff)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The retry delay requested by the server, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    header = headers.get("retry-after") or headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+
+    # gRPC errors carry a google.rpc.RetryInfo detail
+    for detail in getattr(error, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if isinstance(delay, timedelta):
+            return delay.total_seconds()
+        if delay is not None and hasattr(delay, "seconds"):
+            return delay.seconds + delay.nanos / 1e9
+    return None
@@ -0,0 +1,220 @@
+"""
+Semantic cache for recipe suggestions
+Reuses suggestions for refrigerators with the same urgent ingredients and preferences
+"""
+
+import hashlib
+import json
+import math
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import structlog
+
+from app.core.cache import ResponseCache
+from app.core.config import settings
+from app.core.metrics import RECIPE_CACHE_REQUESTS, RECIPE_CACHE_SIMILARITY
+from app.models.schemas import ExpiryPriority, RecipeSuggestionRequest
+
+logger = structlog.get_logger(__name__)
+
+# Share of the similarity that comes from the priority ingredients; the
+# rest comes from the category histogram
+PRIORITY_WEIGHT = 0.7
+
+_PRIORITY_LEVELS = (ExpiryPriority.URGENT, ExpiryPriority.SOON)
+
+class FridgeSignature:
+    """What a recipe suggestion depends on, without exact quantities
+
+    The set of urgent and soon-to-expire ingredients (with their priority),
+    the category histogram of the whole refrigerator, and a hash of the
+    preferences and variation instructions, which must match exactly.
+    """
+
+    def __init__(
+        self,
+        priority_items: FrozenSet[str],
+        categories: Dict[str, int],
+        preferences_hash: str
+    ):
+        self.priority_items = priority_items
+        self.categories = categories
+        self.preferences_hash = preferences_hash
+
+    @classmethod
+    def from_request(cls, request: RecipeSuggestionRequest) -> "FridgeSignature":
+        """Build the signature of a recipe suggestion request"""
+        ingredients = request.ingredient_analysis.analyzed_ingredients
+        priority_items = frozenset(
+            f"{ingredient.priority.value}:{_normalize_name(ingredient.name)}"
+            for ingredient in ingredients
+            if ingredient.priority in _PRIORITY_LEVELS
+        )
+        categories = Counter(ingredient.category for ingredient in ingredients)
+
+        preferences = {
+            "preferences": request.user_preferences.model_dump(mode="json"),
+            "variation_hint": request.variation_hint,
+            "avoid_dishes": sorted(request.avoid_dishes),
+        }
+        canonical = json.dumps(preferences, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        preferences_hash = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+        return cls(priority_items, dict(categories), preferences_hash)
+
+    def similarity(self, other: "FridgeSignature") -> float:
+        """Similarity in [0, 1]: Jaccard of the priority ingredients and
+        cosine of the category histograms"""
+        union = self.priority_items | other.priority_items
+        priority_similarity = len(self.priority_items & other.priority_items) / len(union) if union else 1.0
+
+        dot = sum(count * other.categories.get(category, 0) for category, count in self.categories.items())
+        norms = _norm(self.categories) * _norm(other.categories)
+        category_similarity = dot / norms if norms else float(not self.categories and not other.categories)
+
+        return PRIORITY_WEIGHT * priority_similarity + (1 - PRIORITY_WEIGHT) * category_similarity
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for storage next to the cached suggestion"""
+        return {"priority_items": sorted(self.priority_items), "categories": self.categories}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], preferences_hash: str) -> "FridgeSignature":
+        """Restore a stored signature"""
+        return cls(frozenset(data["priority_items"]), data["categories"], preferences_hash)
+
+class RecipeSuggestionCache(ResponseCache):
+    """Recipe suggestions keyed on fridge signatures, matched by similarity
+
+    Entries are grouped in buckets per day and preference hash, so that
+    they expire when ingredient priorities move on at the day boundary and
+    are only compared with requests for the same preferences. Each bucket
+    keeps the most recent bucket_size entries in the local tier and Redis.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.85,
+        bucket_size: int = 32,
+        key_prefix: str = "adk:recipes:",
+        **kwargs: Any
+    ):
+        super().__init__(key_prefix=key_prefix, **kwargs)
+        self.similarity_threshold = similarity_threshold
+        self.bucket_size = bucket_size
+
+    async def lookup(self, signature: FridgeSignature) -> Optional[Dict[str, Any]]:
+        """Get the suggestion of the most similar fridge above the threshold"""
+        if not self.enabled:
+            return None
+
+        key = self._bucket_key(signature)
+        match = self._best_match(signature, self._local_entries(key))
+        if match is not None:
+            self._stats["memory_hits"] += 1
+        else:
+            client = self._get_redis()
+            if client is not None:
+                try:
+                    raw_entries = await client.lrange(key, 0, self.bucket_size - 1)
+                except Exception as e:
+                    self._on_redis_error(e)
+                else:
+                    entries = [json.loads(raw) for raw in raw_entries]
+                    match = self._best_match(signature, entries)
+                    if match is not None:
+                        self._stats["redis_hits"] += 1
+                        self._set_local(key, entries, ttl=self._bucket_ttl())
+
+        if match is None:
+            self._stats["misses"] += 1
+            RECIPE_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+
+        similarity, suggestion = match
+        RECIPE_CACHE_SIMILARITY.observe(similarity)
+        RECIPE_CACHE_REQUESTS.labels(result="exact" if similarity >= 1.0 - 1e-9 else "near").inc()
+        logger.info("Recipe suggestion cache hit", similarity=round(similarity, 3))
+        return suggestion
+
+    async def store(self, signature: FridgeSignature, suggestion: Dict[str, Any]) -> None:
+        """Add a suggestion to its bucket"""
+        if not self.enabled:
+            return
+
+        key = self._bucket_key(signature)
+        entry = {"signature": signature.to_dict(), "suggestion": suggestion}
+        self._stats["stores"] += 1
+        self._set_local(
+            key,
+            [entry] + self._local_entries(key)[:self.bucket_size - 1],
+            ttl=self._bucket_ttl()
+        )
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    pipe.lpush(key, json.dumps(entry, ensure_ascii=False))
+                    pipe.ltrim(key, 0, self.bucket_size - 1)
+                    pipe.expire(key, self._bucket_ttl())
+                    await pipe.execute()
+            except Exception as e:
+                self._on_redis_error(e)
+
+    def _best_match(
+        self,
+        signature: FridgeSignature,
+        entries: List[Dict[str, Any]]
+    ) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """The most similar entry at or above the threshold"""
+        best: Optional[Tuple[float, Dict[str, Any]]] = None
+        for entry in entries:
+            stored = FridgeSignature.from_dict(entry["signature"], signature.preferences_hash)
+            similarity = signature.similarity(stored)
+            if similarity >= self.similarity_threshold and (best is None or similarity > best[0]):
+                best = (similarity, entry["suggestion"])
+        return best
+
+    def _local_entries(self, key: str) -> List[Dict[str, Any]]:
+        """Entries of a bucket in the local tier"""
+        cached = self._local.get(key)
+        if cached is None:
+            return []
+        expires_at, entries = cached
+        if expires_at <= time.monotonic():
+            del self._local[key]
+            return []
+        self._local.move_to_end(key)
+        return entries
+
+    def _bucket_key(self, signature: FridgeSignature) -> str:
+        """Bucket of the current day and the signature's preferences"""
+        return f"{self.key_prefix}{datetime.now().date().isoformat()}:{signature.preferences_hash}"
+
+    def _bucket_ttl(self) -> int:
+        """Seconds until the bucket expires: the TTL, cut off at midnight"""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return max(1, min(self.ttl, math.ceil((midnight - now).total_seconds())))
+
+def _normalize_name(name: str) -> str:
+    """Normalize an ingredient name so spelling variants match"""
+    return unicodedata.normalize("NFKC", name).strip().lower()
+
+def _norm(histogram: Dict[str, int]) -> float:
+    """Euclidean norm of a histogram"""
+    return math.sqrt(sum(count * count for count in histogram.values()))
+
+# Global recipe suggestion cache
+recipe_cache = RecipeSuggestionCache(
+    similarity_threshold=settings.recipe_cache_similarity,
+    bucket_size=settings.recipe_cache_bucket_size,
+    max_entries=settings.cache_max_entries,
+    ttl=settings.cache_ttl,
+    redis_url=settings.redis_url,
+    enabled=settings.cache_enabled and settings.recipe_cache_enabled
+)
@@ -0,0 +1,123 @@
+"""
+Startup diagnostics for the API server
+How long the process took to become ready, which heavy SDKs it loaded on
+the way, and an import-time report in the style of python -X importtime
+"""
+
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# SDKs that are only needed once a request calls them, so should not be
+# loaded while the server starts
+HEAVY_MODULES = (
+    "google.generativeai",
+    "google.genai",
+    "google.cloud.aiplatform",
+    "google.api_core",
+    "grpc",
+    "celery",
+)
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux only, else None)"""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces; fields after it are fixed
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        start_ticks = int(fields[19])
+        return round(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 3)
+    except (OSError, IndexError, ValueError):
+        return None
+
+def loaded_heavy_modules() -> List[str]:
+    """Heavy SDKs already imported by this process"""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+def log_startup_diagnostics() -> None:
+    """Log how long startup took and which heavy SDKs it imported"""
+    logger.info(
+        "Startup diagnostics",
+        ready_after=process_age(),
+        heavy_modules_loaded=loaded_heavy_modules(),
+        modules_loaded=len(sys.modules)
+    )
+
+def import_time_report(target: str = "main", top: int = 20) -> Dict[str, Any]:
+    """Import target in a fresh interpreter under -X importtime and rank the modules
+
+    Returns the total import time, the modules with the largest cumulative
+    (including their own imports) and self times in seconds, and the heavy
+    SDKs among the imported modules.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONWARNINGS": "ignore"}
+    )
+    rows = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed: {result.stderr.strip().splitlines()[-1:]}")
+
+    total = next((row["cumulative"] for row in rows if row["module"] == target), sum(
+        row["cumulative"] for row in rows if row["depth"] == 0
+    ))
+    imported = {row["module"] for row in rows}
+    by_cumulative = sorted(rows, key=lambda row: row["cumulative"], reverse=True)
+    by_self = sorted(rows, key=lambda row: row["self"], reverse=True)
+    return {
+        "target": target,
+        "total": round(total, 4),
+        "modules": len(rows),
+        # Modules imported by the target itself, and everything below them
+        "top_level": [row for row in by_cumulative if row["depth"] == 1][:top],
+        "cumulative": [row for row in by_cumulative if row["module"] != target][:top],
+        "self": by_self[:top],
+        "heavy_modules": [name for name in HEAVY_MODULES if name in imported],
+    }
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Rows of -X importtime output: module, self and cumulative seconds, nesting depth"""
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        rows.append({
+            "module": module,
+            "self": int(self_us) / 1e6,
+            "cumulative": int(cumulative_us) / 1e6,
+            "depth": (len(indent) - 1) // 2,
+        })
+    return rows
+
+def log_import_report(target: str = "main", top: int = 15) -> None:
+    """Log the slowest imports of target (run in a worker thread: it takes a few seconds)"""
+    try:
+        report = import_time_report(target, top)
+    except (OSError, RuntimeError) as e:
+        logger.warning("Import time report failed", error=str(e))
+        return
+    logger.info(
+        "Import time report",
+        target=report["target"],
+        total=report["total"],
+        modules=report["modules"],
+        heavy_modules=report["heavy_modules"],
+        top_level={row["module"]: round(row["cumulative"], 4) for row in report["top_level"]},
+        slowest_self={row["module"]: round(row["self"], 4) for row in report["self"]}
+    )
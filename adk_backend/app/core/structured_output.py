@@ -0,0 +1,182 @@
+"""
+Structured JSON output helpers
+Gemini response schemas derived from pydantic models, and a tolerant JSON parser
+"""
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+# Schema keys understood by Gemini's response_schema (an OpenAPI subset)
+GEMINI_SCHEMA_KEYS = ("type", "description", "nullable", "enum", "properties", "required", "items")
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+@lru_cache(maxsize=None)
+def gemini_response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Convert a pydantic model into a Gemini response schema
+
+    References are inlined, Optional[X] becomes a nullable X, enums become
+    string enums, and keywords Gemini rejects (title, default, ...) are dropped.
+    """
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
+    return _convert_schema(schema, definitions)
+
+@lru_cache(maxsize=None)
+def response_schema_hash(model: Type[BaseModel]) -> str:
+    """Short hash of a model's Gemini response schema, for cache keys"""
+    encoded = json.dumps(gemini_response_schema(model), sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+def _convert_schema(node: Dict[str, Any], definitions: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert one JSON schema node"""
+    if "$ref" in node:
+        converted = _convert_schema(definitions[node["$ref"].split("/")[-1]], definitions)
+        if "description" in node:
+            converted["description"] = node["description"]
+        return converted
+
+    if "anyOf" in node or "allOf" in node:
+        options = node.get("anyOf") or node.get("allOf")
+        non_null = [option for option in options if option.get("type") != "null"]
+        converted = _convert_schema(non_null[0], definitions) if non_null else {"type": "string"}
+        if len(non_null) < len(options):
+            converted["nullable"] = True
+        if "description" in node:
+            converted["description"] = node["description"]
+        return converted
+
+    converted: Dict[str, Any] = {}
+    if "enum" in node:
+        converted["type"] = "string"
+        converted["enum"] = [str(value) for value in node["enum"]]
+    else:
+        converted["type"] = node.get("type", "string")
+
+    if converted["type"] == "object":
+        properties = node.get("properties", {})
+        converted["properties"] = {
+            name: _convert_schema(value, definitions) for name, value in properties.items()
+        }
+        if node.get("required"):
+            converted["required"] = list(node["required"])
+    elif converted["type"] == "array":
+        converted["items"] = _convert_schema(node.get("items", {"type": "string"}), definitions)
+
+    if "description" in node:
+        converted["description"] = node["description"]
+
+    return {key: converted[key] for key in GEMINI_SCHEMA_KEYS if key in converted}
+
+def parse_json_object(text: Optional[str]) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Parse the JSON object in a model response
+
+    Returns the object (or None) and whether it had to be repaired. Handles
+    prose or code fences around the object, trailing commas, and objects
+    truncated mid-way (for example by the output token limit), keeping every
+    complete value before the cut.
+    """
+    if not text:
+        return None, False
+
+    start = text.find("{")
+    if start == -1:
+        return None, False
+
+    # Fast path: a well-formed object, possibly surrounded by prose
+    end = text.rfind("}")
+    if end > start:
+        try:
+            value = json.loads(text[start:end + 1])
+            if isinstance(value, dict):
+                return value, False
+        except json.JSONDecodeError:
+            pass
+
+    repaired = _repair_json(text[start:])
+    if repaired is None:
+        return None, False
+
+    try:
+        value = json.loads(repaired)
+    except json.JSONDecodeError:
+        return None, False
+    return (value, True) if isinstance(value, dict) else (None, False)
+
+def _repair_json(fragment: str) -> Optional[str]:
+    """Cut a JSON object at its first complete end, or close a truncated one
+
+    Scans once, remembering the last position where everything before it is
+    a complete value together with the brackets still open there.
+    """
+    stack: List[str] = []
+    # One entry per open object: True while a key is expected
+    expecting_key: List[bool] = []
+    in_string = False
+    escaped = False
+    string_is_key = False
+    last_safe: Optional[Tuple[int, Tuple[str, ...]]] = None
+    index = 0
+
+    while index < len(fragment):
+        char = fragment[index]
+
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if not string_is_key:
+                    last_safe = (index + 1, tuple(stack))
+            index += 1
+            continue
+
+        if char == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == "{" and expecting_key[-1]
+        elif char in "{[":
+            stack.append(char)
+            if char == "{":
+                expecting_key.append(True)
+            last_safe = (index + 1, tuple(stack))
+        elif char in "}]":
+            if not stack or _CLOSERS[stack[-1]] != char:
+                break
+            if stack.pop() == "{":
+                expecting_key.pop()
+            if not stack:
+                return _TRAILING_COMMA.sub(r"\1", fragment[:index + 1])
+            last_safe = (index + 1, tuple(stack))
+        elif char == ":":
+            if stack and stack[-1] == "{":
+                expecting_key[-1] = False
+        elif char == ",":
+            if stack and stack[-1] == "{":
+                expecting_key[-1] = True
+        elif not char.isspace():
+            # Number or literal: complete once a delimiter follows it
+            token_end = index
+            while token_end < len(fragment) and fragment[token_end] not in ',}] \t\r\n':
+                token_end += 1
+            if token_end == len(fragment):
+                break
+            last_safe = (token_end, tuple(stack))
+            index = token_end
+            continue
+
+        index += 1
+
+    if last_safe is None:
+        return None
+
+    position, open_brackets = last_safe
+    closing = "".join(_CLOSERS[bracket] for bracket in reversed(open_brackets))
+    return _TRAILING_COMMA.sub(r"\1", fragment[:position] + closing)
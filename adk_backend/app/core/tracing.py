@@ -0,0 +1,330 @@
+"""
+Request tracing for the meal planning pipeline
+Lightweight spans with OpenTelemetry-compatible IDs, W3C trace context and
+an OTLP/JSON file exporter, so slow requests can be explained after the fact
+"""
+
+import json
+import queue
+import secrets
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import structlog
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+SERVICE_NAME = "adk-meal-planning-api"
+
+# Spans listed by name in the log line of a slow request
+SLOW_REQUEST_TOP_SPANS = 10
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        """Seconds the span took (so far, while it is still open)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+class Trace:
+    """The spans recorded for one request
+
+    Spans are appended as they finish, so concurrent stages of one request
+    can share the trace. At most max_spans are kept; the rest are counted.
+    """
+
+    def __init__(self, trace_id: str, parent_span_id: Optional[str] = None, max_spans: int = 2000):
+        self.trace_id = trace_id
+        # Span of the caller when the trace was continued from a traceparent
+        self.parent_span_id = parent_span_id
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.root: Optional[Span] = None
+        # Profiler of the request (see app.core.profiling), told about every
+        # task that opens a span so it can follow the request across tasks
+        self.profiler: Optional[Any] = None
+
+    def add(self, span: Span) -> None:
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def timings(self) -> Dict[str, Any]:
+        """Span breakdown relative to the start of the request"""
+        origin = self.root.start_ns if self.root else min((span.start_ns for span in self.spans), default=0)
+        spans = sorted(self.spans, key=lambda span: span.start_ns)
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.root.duration * 1000, 3) if self.root else 0.0,
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_span_id": span.parent_span_id,
+                    "start_ms": round((span.start_ns - origin) / 1e6, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+                for span in spans
+            ],
+            "dropped_spans": self.dropped,
+        }
+
+    def summary(self, limit: int = SLOW_REQUEST_TOP_SPANS) -> Dict[str, float]:
+        """Total seconds per span name, longest first"""
+        totals: Dict[str, float] = defaultdict(float)
+        for span in self.spans:
+            if span is not self.root:
+                totals[span.name] += span.duration
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return {name: round(seconds, 4) for name, seconds in ranked}
+
+class OTLPFileExporter:
+    """Appends finished traces to a file as OTLP/JSON, one request per line
+
+    The format is the one read by the OpenTelemetry Collector's
+    otlpjsonfile receiver, so traces can be loaded into any OTel backend.
+    Traces are encoded and written by a background thread, so the event
+    loop never waits on the file; when max_queued traces are waiting,
+    new ones are dropped.
+    """
+
+    def __init__(self, path: str, max_queued: int = 1000):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+
+    def export(self, trace: Trace) -> None:
+        """Queue a finished trace for writing"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_queued, name="trace-exporter", daemon=True)
+                self._writer.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            logger.warning("Trace export queue is full, dropping trace", trace_id=trace.trace_id)
+
+    def close(self) -> None:
+        """Write the traces still queued and stop the writer thread"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def _write_queued(self) -> None:
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            try:
+                line = json.dumps(self._encode(trace), ensure_ascii=False, default=str)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except Exception as e:
+                logger.warning("Failed to export trace", trace_id=trace.trace_id, error=str(e))
+
+    def _encode(self, trace: Trace) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [
+                        {
+                            "traceId": span.trace_id,
+                            "spanId": span.span_id,
+                            "parentSpanId": span.parent_span_id or "",
+                            "name": span.name,
+                            "kind": 2 if span is trace.root else 1,  # SERVER / INTERNAL
+                            "startTimeUnixNano": str(span.start_ns),
+                            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                            "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                        }
+                        for span in trace.spans
+                    ],
+                }],
+            }]
+        }
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+_exporter: Optional[OTLPFileExporter] = (
+    OTLPFileExporter(settings.trace_export_path) if settings.trace_export_path else None
+)
+
+def close_exporter() -> None:
+    """Write out the traces still waiting to be exported (at shutdown)"""
+    if _exporter is not None:
+        _exporter.close()
+
+def current_trace() -> Optional[Trace]:
+    """The trace of the request being handled, if any"""
+    return _current_trace.get()
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Record a span around a block, as a child of the current span
+
+    Outside a traced request this does nothing and yields None.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    if trace.profiler is not None:
+        trace.profiler.attach()
+
+    parent = _current_span.get()
+    current = Span(name, trace.trace_id, parent.span_id if parent else trace.parent_span_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace.add(current)
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Trace]:
+    """Trace one request, continuing the caller's trace if traceparent is given
+
+    The trace ID is bound to the structlog context for every log line of
+    the request. When the request ends the trace is exported, and logged
+    with its slowest spans if it took longer than the slow request threshold.
+    """
+    if not settings.tracing_enabled:
+        trace = Trace(_new_trace_id())
+        yield trace
+        return
+
+    trace_id, parent_span_id = parse_traceparent(traceparent) or (_new_trace_id(), None)
+    trace = Trace(trace_id, parent_span_id, settings.trace_max_spans)
+    trace_token = _current_trace.set(trace)
+    try:
+        with structlog.contextvars.bound_contextvars(trace_id=trace_id):
+            try:
+                with span(name, **attributes) as root:
+                    trace.root = root
+                    yield trace
+            finally:
+                _finish(trace)
+    finally:
+        _current_trace.reset(trace_token)
+
+class TracingMiddleware:
+    """ASGI middleware tracing each HTTP request
+
+    Unlike an @app.middleware("http") function, which returns as soon as
+    the response headers are ready, this keeps the root span open until the
+    whole body has been sent, so the stages of streamed responses are part
+    of the request's trace. The trace ID is returned in X-Trace-Id.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        with start_trace(
+            f"{method} {path}",
+            traceparent=Headers(scope=scope).get("traceparent"),
+            http_method=method,
+            http_target=path
+        ) as trace:
+            async def send_with_trace_id(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    if trace.root is not None:
+                        trace.root.set_attribute("http_status_code", message["status"])
+                    MutableHeaders(scope=message).append("X-Trace-Id", trace.trace_id)
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Trace ID and parent span ID of a W3C traceparent header"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    trace_id, span_id = parts[1].lower(), parts[2].lower()
+    try:
+        int(trace_id, 16), int(span_id, 16)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id
+
+def traceparent(trace: Trace) -> str:
+    """W3C traceparent header pointing at the trace's root span"""
+    span_id = trace.root.span_id if trace.root else "0" * 16
+    return f"00-{trace.trace_id}-{span_id}-01"
+
+def _finish(trace: Trace) -> None:
+    """Export a finished trace and report it if it was slow"""
+    if _exporter is not None:
+        _exporter.export(trace)
+
+    duration = trace.root.duration if trace.root else 0.0
+    if duration >= settings.trace_slow_request_threshold:
+        logger.warning(
+            "Slow request",
+            request=trace.root.name if trace.root else None,
+            duration=round(duration, 3),
+            slowest_spans=trace.summary()
+        )
+
+def _new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """An attribute in OTLP/JSON's typed value encoding"""
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
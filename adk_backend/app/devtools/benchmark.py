@@ -0,0 +1,410 @@
+"""
+Benchmark suite for the meal planning pipeline
+Runs each agent and the full pipeline on synthetic fridges against an
+in-process stub model, and compares the results with earlier runs
+
+    python -m app.devtools.benchmark --sizes 10,100,1000,10000
+    python -m app.devtools.benchmark --baseline benchmarks/results/<file>.json --fail-on-regression
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.logging import setup_logging
+from app.devtools.fake_gemini import LatencyModel, sample_from_schema
+from app.models.schemas import (
+    MealPlanningRequest, Product, UserPreferences,
+    IngredientAnalysisRequest, NutritionAnalysisRequest, FridgeAnalysisRequest,
+    RecipeSuggestionRequest, CookingOptimizationRequest, MealThemeRequest
+)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+STAGES = (
+    "request_parse",
+    "ingredient_analysis",
+    "nutrition_balance",
+    "fridge_analysis",
+    "recipe_suggestion",
+    "cooking_optimization",
+    "meal_theme",
+    "pipeline",
+)
+
+# Metrics compared against the baseline, with the smallest change that
+# counts as a regression regardless of the relative threshold
+COMPARED_METRICS = {
+    "wall_ms": 0.5,
+    "cpu_ms": 0.5,
+    "alloc_peak_kb": 64.0,
+    "serialize_ms": 0.2,
+}
+
+# Fridge contents in the style of scripts/bulk_insert_fridge_products.py
+FOOD_CATEGORIES = {
+    "野菜": ["トマト", "きゅうり", "にんじん", "じゃがいも", "たまねぎ", "キャベツ", "ほうれん草", "ブロッコリー", "なす", "大根", "白菜", "しめじ"],
+    "肉類": ["牛もも肉", "牛ひき肉", "豚ロース", "豚バラ肉", "豚ひき肉", "鶏もも肉", "鶏むね肉", "ささみ", "ベーコン", "ハム"],
+    "魚介類": ["鮭", "まぐろ", "さば", "あじ", "ぶり", "えび", "いか", "ほたて", "あさり", "ちくわ"],
+    "乳製品": ["牛乳", "ヨーグルト", "チーズ", "バター", "生クリーム", "クリームチーズ"],
+    "卵・大豆製品": ["卵", "豆腐", "厚揚げ", "油揚げ", "納豆", "味噌"],
+    "穀物・パン": ["米", "食パン", "パスタ", "うどん", "そば", "小麦粉"],
+    "果物": ["りんご", "みかん", "バナナ", "いちご", "キウイ", "アボカド", "レモン"],
+    "調味料": ["醤油", "みりん", "料理酒", "ごま油", "マヨネーズ", "ケチャップ", "しょうが", "にんにく"],
+    "冷凍食品": ["冷凍餃子", "冷凍うどん", "冷凍野菜ミックス", "冷凍ブロッコリー", "冷凍唐揚げ"],
+}
+UNITS = ["個", "本", "袋", "パック", "kg", "g", "L", "ml", "束", "枚", "切れ", "尾"]
+
+def synthetic_fridge(size: int, seed: int = 0) -> List[Product]:
+    """A fridge of random products, most of them duplicates by name"""
+    rng = random.Random(seed * 1_000_003 + size)
+    now = datetime.now()
+    categories = list(FOOD_CATEGORIES)
+    products = []
+    for index in range(size):
+        category = rng.choice(categories)
+        days = rng.randint(-1, 30)
+        products.append(Product(
+            id=f"bench-{index}",
+            name=rng.choice(FOOD_CATEGORIES[category]),
+            category=category,
+            quantity=rng.randint(1, 5),
+            unit=rng.choice(UNITS),
+            expiry_date=now + timedelta(days=days),
+            days_until_expiry=days
+        ))
+    return products
+
+class StubResponse:
+    """The parts of a Gemini response the agents read"""
+
+    class Usage:
+        def __init__(self, prompt_tokens: int, output_tokens: int):
+            self.prompt_token_count = prompt_tokens
+            self.candidates_token_count = output_tokens
+            self.total_token_count = prompt_tokens + output_tokens
+
+    def __init__(self, text: str, prompt_tokens: int):
+        self.text = text
+        self.usage_metadata = self.Usage(prompt_tokens, len(text))
+
+class StubModel:
+    """Answers Gemini calls in-process with schema-valid JSON
+
+    Installed in place of the shared client's network call, so agents still
+    go through the limiter, hedging, routing and parsing code.
+    """
+
+    def __init__(self, seed: int = 0, array_items: int = 3, latency: Optional[LatencyModel] = None):
+        self.rng = random.Random(seed)
+        self.array_items = array_items
+        # Simulated model latency, for load tests (benchmarks answer instantly)
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(
+        self,
+        generative_model: Any,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]],
+        request_options: Optional[Dict[str, Any]]
+    ) -> StubResponse:
+        self.calls += 1
+        schema = (generation_config or {}).get("response_schema")
+        if schema:
+            text = json.dumps(sample_from_schema(schema, self.rng, self.array_items), ensure_ascii=False)
+        else:
+            text = "ベンチマーク用の応答です。"
+        if self.latency is not None:
+            await asyncio.sleep(self.latency.sample(self.rng, len(text)))
+        return StubResponse(text, len(prompt))
+
+@contextmanager
+def stubbed_model(stub: StubModel, isolated: bool = True) -> Iterator[StubModel]:
+    """Route the shared Gemini client to the stub
+
+    When isolated, caches are disabled so every iteration does the full
+    work, and the rate limiter gets an unreachable budget so it never adds
+    waiting time. Load tests keep both as configured.
+    """
+    from app.core.cache import response_cache
+    from app.core.model_client import gemini_client
+    from app.core.recipe_cache import recipe_cache
+
+    saved = {
+        "api_key": gemini_client.api_key,
+        "requests_per_window": gemini_client.requests_per_window,
+        "max_concurrency": gemini_client.max_concurrency,
+        "_limiters": gemini_client._limiters,
+    }
+    saved_caches = (response_cache.enabled, recipe_cache.enabled)
+
+    gemini_client.api_key = "stub"
+    gemini_client._call_model = stub
+    if isolated:
+        gemini_client.requests_per_window = 10 ** 9
+        gemini_client.max_concurrency = 10 ** 6
+        gemini_client._limiters = {}
+        response_cache.enabled = recipe_cache.enabled = False
+    try:
+        yield stub
+    finally:
+        del gemini_client._call_model
+        for name, value in saved.items():
+            setattr(gemini_client, name, value)
+        response_cache.enabled, recipe_cache.enabled = saved_caches
+
+async def measure(run: Callable[[], Awaitable[Any]], repeat: int) -> Dict[str, float]:
+    """Wall time, CPU time, allocations and serialization cost of one stage
+
+    Times are medians over repeat runs after a warm-up run. Allocations are
+    measured in a separate run under tracemalloc, which slows code down too
+    much to time it at the same time.
+    """
+    result = await run()
+
+    wall_times, cpu_times, serialize_times = [], [], []
+    payload = b""
+    for _ in range(repeat):
+        gc.collect()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = await run()
+        wall_times.append(time.perf_counter() - wall_start)
+        cpu_times.append(time.process_time() - cpu_start)
+
+        serialize_start = time.perf_counter()
+        payload = _serialize(result)
+        serialize_times.append(time.perf_counter() - serialize_start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = await run()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_ms": round(statistics.median(wall_times) * 1000, 3),
+        "cpu_ms": round(statistics.median(cpu_times) * 1000, 3),
+        "alloc_peak_kb": round(peak / 1024, 1),
+        "alloc_retained_kb": round(retained / 1024, 1),
+        "serialize_ms": round(statistics.median(serialize_times) * 1000, 3),
+        "payload_kb": round(len(payload) / 1024, 1),
+    }
+
+def _serialize(result: Any) -> bytes:
+    """Serialize a stage result the way the API would send it"""
+    if isinstance(result, BaseModel):
+        return result.model_dump_json().encode("utf-8")
+    return json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
+
+async def benchmark_size(size: int, stages: Tuple[str, ...], repeat: int, seed: int) -> List[Dict[str, Any]]:
+    """Run the selected stages on a fridge of the given size"""
+    from app.agents.cooking_optimization_agent import CookingOptimizationAgent
+    from app.agents.fridge_analysis_agent import FridgeAnalysisAgent
+    from app.agents.image_generation_agent import ImageGenerationAgent
+    from app.agents.ingredient_analysis_agent import IngredientAnalysisAgent
+    from app.agents.meal_theme_agent import MealThemeAgent
+    from app.agents.nutrition_balance_agent import NutritionBalanceAgent
+    from app.agents.recipe_suggestion_agent import RecipeSuggestionAgent
+    from app.services.meal_planning_service import MealPlanningService
+
+    products = synthetic_fridge(size, seed)
+    preferences = UserPreferences()
+    request = MealPlanningRequest(refrigerator_items=products, household_id="benchmark", user_preferences=preferences)
+    request_json = request.model_dump_json()
+
+    ingredient_agent = IngredientAnalysisAgent()
+    nutrition_agent = NutritionBalanceAgent()
+    service = MealPlanningService(
+        ingredient_agent=ingredient_agent,
+        nutrition_agent=nutrition_agent,
+        fridge_agent=FridgeAnalysisAgent(),
+        recipe_agent=RecipeSuggestionAgent(),
+        cooking_agent=CookingOptimizationAgent(),
+        theme_agent=MealThemeAgent(),
+        image_agent=ImageGenerationAgent()
+    )
+
+    # Inputs of the later stages, computed once and not measured
+    ingredient_analysis = await ingredient_agent.process(IngredientAnalysisRequest(products=products))
+    nutrition_analysis = await nutrition_agent.process(NutritionAnalysisRequest(
+        ingredients=ingredient_analysis.analyzed_ingredients,
+        user_preferences=preferences
+    ))
+    recipe_suggestion = await service.recipe_agent.process(RecipeSuggestionRequest(
+        ingredient_analysis=ingredient_analysis,
+        nutrition_analysis=nutrition_analysis,
+        user_preferences=preferences
+    ))
+    meal_items = service._meal_items(recipe_suggestion)
+
+    async def request_parse() -> MealPlanningRequest:
+        return MealPlanningRequest.model_validate_json(request_json)
+
+    cases: Dict[str, Callable[[], Awaitable[Any]]] = {
+        "request_parse": request_parse,
+        "ingredient_analysis": lambda: ingredient_agent.process(IngredientAnalysisRequest(products=products)),
+        "nutrition_balance": lambda: nutrition_agent.process(NutritionAnalysisRequest(
+            ingredients=ingredient_analysis.analyzed_ingredients,
+            user_preferences=preferences
+        )),
+        "fridge_analysis": lambda: service.fridge_agent.process(FridgeAnalysisRequest(
+            products=products,
+            user_preferences=preferences
+        )),
+        "recipe_suggestion": lambda: service.recipe_agent.process(RecipeSuggestionRequest(
+            ingredient_analysis=ingredient_analysis,
+            nutrition_analysis=nutrition_analysis,
+            user_preferences=preferences
+        )),
+        "cooking_optimization": lambda: service.cooking_agent.process(CookingOptimizationRequest(
+            recipes=meal_items,
+            constraints={"max_cooking_time": preferences.max_cooking_time}
+        )),
+        "meal_theme": lambda: service.theme_agent.process(MealThemeRequest(
+            recipes=meal_items,
+            user_preferences=preferences,
+            current_date=datetime.now()
+        )),
+        "pipeline": lambda: service.suggest_meal_plan(request),
+    }
+
+    results = []
+    for stage in stages:
+        metrics = await measure(cases[stage], repeat)
+        results.append({"size": size, "stage": stage, **metrics})
+        print(_format_row(results[-1]), flush=True)
+    return results
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than threshold"""
+    previous = {(entry["size"], entry["stage"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["size"], entry["stage"]))
+        if before is None:
+            continue
+        for metric, floor in COMPARED_METRICS.items():
+            old, new = before.get(metric), entry.get(metric)
+            if old is None or new is None:
+                continue
+            if new - old > max(floor, old * threshold):
+                change = f"+{(new - old) / old:.0%}" if old else "new"
+                regressions.append(f"{entry['stage']} ({entry['size']}): {metric} {old} -> {new} ({change})")
+    return regressions
+
+def git_revision() -> str:
+    """Short commit hash of the working tree, marked when it has changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--", "."],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}+dirty" if dirty else commit
+
+def latest_result(results_dir: Path) -> Optional[Path]:
+    """The most recent stored result file, if any"""
+    files = sorted(results_dir.glob("*.json"))
+    return files[-1] if files else None
+
+def _format_row(entry: Dict[str, Any]) -> str:
+    return (
+        f"{entry['size']:>6} {entry['stage']:<22}"
+        f"{entry['wall_ms']:>10.2f} ms wall {entry['cpu_ms']:>10.2f} ms cpu"
+        f"{entry['alloc_peak_kb']:>11.1f} KB peak {entry['serialize_ms']:>8.2f} ms json"
+        f"{entry['payload_kb']:>9.1f} KB"
+    )
+
+async def run_benchmarks(sizes: List[int], stages: Tuple[str, ...], repeat: int, seed: int) -> List[Dict[str, Any]]:
+    """Run the suite for every fridge size with the stub model installed"""
+    results = []
+    with stubbed_model(StubModel(seed)):
+        for size in sizes:
+            results += await benchmark_size(size, stages, repeat, seed)
+    return results
+
+def main() -> None:
+    """Run the suite from the command line"""
+    parser = argparse.ArgumentParser(description="Meal planning pipeline benchmarks")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated fridge sizes")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stages")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results-dir", default=str(DEFAULT_RESULTS_DIR))
+    parser.add_argument("--baseline", help="result file to compare with (default: the latest stored)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    stages = tuple(stage.strip() for stage in args.stages.split(",") if stage.strip())
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    setup_logging()
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    results_dir = Path(args.results_dir)
+    baseline_path = Path(args.baseline) if args.baseline else latest_result(results_dir)
+
+    revision = git_revision()
+    print(f"Benchmarking {revision}: sizes={sizes} repeat={args.repeat}", flush=True)
+    results = asyncio.run(run_benchmarks(sizes, stages, args.repeat, args.seed))
+
+    report = {
+        "revision": revision,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    if not args.no_save:
+        results_dir.mkdir(parents=True, exist_ok=True)
+        path = results_dir / f"{datetime.now():%Y%m%dT%H%M%S}-{revision}.json"
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Saved results to {path}")
+
+    if baseline_path is None or not baseline_path.exists():
+        return
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline["results"], args.threshold)
+    print(f"Compared with {baseline_path.name} ({baseline.get('revision', 'unknown')}): "
+          f"{len(regressions)} regression(s)")
+    for regression in regressions:
+        print(f"  {regression}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
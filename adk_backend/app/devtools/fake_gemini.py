@@ -0,0 +1,434 @@
+"""
+Local Gemini stand-in server for offline load and performance testing
+Serves generateContent with replayed or schema-generated responses, injected
+latency, errors and 429s
+
+Run it and point the backend at it:
+
+    python -m app.devtools.fake_gemini --port 8090 --latency lognormal:1.2,0.4
+    GEMINI_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:8090 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+import structlog
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic_settings import BaseSettings
+
+logger = structlog.get_logger(__name__)
+
+UPSTREAM_URL = "https://generativelanguage.googleapis.com"
+
+# Schema types as sent by the SDK (REST uses the integer enum encoding)
+_SCHEMA_TYPES = {1: "string", 2: "number", 3: "integer", 4: "boolean", 5: "array", 6: "object"}
+
+class FakeGeminiSettings(BaseSettings):
+    """Behaviour of the stand-in server (environment prefix FAKE_GEMINI_)"""
+
+    host: str = "127.0.0.1"
+    port: int = 8090
+    # generate: schema-valid responses; replay: recordings first, then
+    # generate (or fail when replay_strict); record: forward to Gemini and save
+    mode: str = "generate"
+    recordings_dir: Optional[str] = None
+    replay_strict: bool = False
+    upstream_api_key: Optional[str] = None
+    # fixed:S, uniform:MIN,MAX, lognormal:MEDIAN,SIGMA or recorded
+    latency: str = "lognormal:1.2,0.4"
+    latency_per_token: float = 0.0  # extra seconds per output token
+    latency_max: float = 30.0
+    error_rate: float = 0.0  # share of calls failing with a 500 or 503
+    rate_limit_rate: float = 0.0  # share of calls rejected with a 429
+    # Per-model quota in requests per minute; calls over it get a 429
+    requests_per_minute: Optional[int] = None
+    retry_after: float = 1.0  # seconds, sent with every 429
+    array_items: int = 3  # items in generated arrays
+    seed: Optional[int] = None
+
+    model_config = {
+        "env_prefix": "FAKE_GEMINI_",
+        "case_sensitive": False,
+        "extra": "ignore"
+    }
+
+class LatencyModel:
+    """Response latency drawn from a configured distribution"""
+
+    def __init__(self, spec: str, per_token: float = 0.0, maximum: float = 30.0):
+        kind, _, params = spec.partition(":")
+        values = [float(value) for value in params.split(",") if value.strip()]
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "recorded": 0}
+        if kind not in expected or len(values) != expected[kind]:
+            raise ValueError(f"Invalid latency distribution: {spec}")
+        self.kind = kind
+        self.params = values
+        self.per_token = per_token
+        self.maximum = maximum
+
+    def sample(self, rng: random.Random, output_tokens: int, recorded: Optional[float] = None) -> float:
+        """Seconds to wait before answering a call"""
+        if self.kind == "fixed":
+            base = self.params[0]
+        elif self.kind == "uniform":
+            base = rng.uniform(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            base = median * math.exp(rng.gauss(0.0, sigma))
+        else:
+            # Recorded latency already includes generating the output
+            return min(self.maximum, recorded or 0.0)
+        return min(self.maximum, base + self.per_token * output_tokens)
+
+class Recording:
+    """A saved generateContent exchange"""
+
+    def __init__(self, model: str, request: Dict[str, Any], response: Dict[str, Any], latency: float):
+        self.model = model
+        self.request = request
+        self.response = response
+        self.latency = latency
+
+class RecordingStore:
+    """Recordings on disk, matched exactly or by response schema
+
+    A request replays the recording of the identical request if there is
+    one, otherwise a recording for the same model and response schema, and
+    finally one for the same schema on any model. Prompts change with every
+    fridge and date, so schema matches are what makes replay useful.
+    """
+
+    def __init__(self, directory: Optional[str]):
+        self.directory = Path(directory) if directory else None
+        self._exact: Dict[str, Recording] = {}
+        self._by_schema: Dict[Tuple[str, str], List[Recording]] = defaultdict(list)
+        self._any_model: Dict[str, List[Recording]] = defaultdict(list)
+        self._cursor: Counter = Counter()
+        if self.directory and self.directory.is_dir():
+            for path in sorted(self.directory.glob("*/*.json")):
+                data = json.loads(path.read_text(encoding="utf-8"))
+                self._add(Recording(data["model"], data["request"], data["response"], data.get("latency", 0.0)))
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def find(self, model: str, body: Dict[str, Any]) -> Tuple[Optional[Recording], str]:
+        """The best recording for a request and how it matched"""
+        exact = self._exact.get(request_key(model, body))
+        if exact is not None:
+            return exact, "exact"
+
+        schema = schema_key(body)
+        for match, candidates in (("schema", self._by_schema.get((model, schema))), ("any_model", self._any_model.get(schema))):
+            if candidates:
+                # Rotate through the candidates so replays are not all identical
+                cursor = (match, model, schema)
+                recording = candidates[self._cursor[cursor] % len(candidates)]
+                self._cursor[cursor] += 1
+                return recording, match
+        return None, "miss"
+
+    def save(self, model: str, body: Dict[str, Any], response: Dict[str, Any], latency: float) -> None:
+        """Store a new recording on disk and in the index"""
+        recording = Recording(model, body, response, latency)
+        self._add(recording)
+        if self.directory is None:
+            return
+        path = self.directory / _safe_name(model) / f"{request_key(model, body)}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "model": model,
+            "request": body,
+            "response": response,
+            "latency": round(latency, 4),
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def _add(self, recording: Recording) -> None:
+        key = request_key(recording.model, recording.request)
+        if key in self._exact:
+            return
+        self._exact[key] = recording
+        schema = schema_key(recording.request)
+        self._by_schema[(recording.model, schema)].append(recording)
+        self._any_model[schema].append(recording)
+
+class FakeGemini:
+    """State of the stand-in server: recordings, quotas and statistics"""
+
+    def __init__(self, config: FakeGeminiSettings):
+        if config.mode not in ("generate", "replay", "record"):
+            raise ValueError(f"Unknown fake Gemini mode: {config.mode}")
+        if config.mode == "record" and not config.upstream_api_key:
+            raise ValueError("Record mode needs FAKE_GEMINI_UPSTREAM_API_KEY")
+
+        self.config = config
+        self.latency = LatencyModel(config.latency, config.latency_per_token, config.latency_max)
+        self.recordings = RecordingStore(config.recordings_dir)
+        self.rng = random.Random(config.seed)
+        self.stats: Counter = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._quota: Dict[str, Deque[float]] = defaultdict(deque)
+        self._upstream: Optional[httpx.AsyncClient] = None
+
+    async def generate_content(self, model: str, body: Dict[str, Any], query: Dict[str, str]) -> JSONResponse:
+        """Answer one generateContent call"""
+        self.stats["requests"] += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            throttled = self._throttle(model)
+            if throttled is not None:
+                return throttled
+
+            if self.config.mode == "record":
+                return await self._forward(model, body, query)
+
+            recording, match = (None, "miss")
+            if self.config.mode == "replay":
+                recording, match = self.recordings.find(model, body)
+                self.stats[f"replay_{match}"] += 1
+                if recording is None and self.config.replay_strict:
+                    return _error(404, "NOT_FOUND", f"No recording for {model}")
+
+            if recording is not None:
+                response = recording.response
+            else:
+                response = self._generated_response(model, body)
+            output_tokens = response.get("usageMetadata", {}).get("candidatesTokenCount", 0)
+            await asyncio.sleep(self.latency.sample(
+                self.rng,
+                output_tokens,
+                recording.latency if recording is not None else None
+            ))
+
+            # Failures are decided after the latency, like a real backend error
+            if self.rng.random() < self.config.error_rate:
+                self.stats["errors"] += 1
+                if self.rng.random() < 0.5:
+                    return _error(500, "INTERNAL", "Injected internal error")
+                return _error(503, "UNAVAILABLE", "Injected unavailability")
+
+            self.stats["ok"] += 1
+            return JSONResponse(response)
+        finally:
+            self.in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters for load test reports"""
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "recordings": len(self.recordings),
+        }
+
+    def reset(self) -> None:
+        """Clear counters and quotas between test runs"""
+        self.stats.clear()
+        self.peak_in_flight = self.in_flight
+        self._quota.clear()
+
+    async def close(self) -> None:
+        if self._upstream is not None:
+            await self._upstream.aclose()
+
+    def _throttle(self, model: str) -> Optional[JSONResponse]:
+        """A 429 response when the call is over quota or randomly throttled"""
+        if self.config.requests_per_minute:
+            now = time.monotonic()
+            calls = self._quota[model]
+            while calls and calls[0] <= now - 60:
+                calls.popleft()
+            if len(calls) >= self.config.requests_per_minute:
+                self.stats["quota_exceeded"] += 1
+                return _rate_limited(max(self.config.retry_after, calls[0] + 60 - now))
+            calls.append(now)
+
+        if self.rng.random() < self.config.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return _rate_limited(self.config.retry_after)
+        return None
+
+    async def _forward(self, model: str, body: Dict[str, Any], query: Dict[str, str]) -> JSONResponse:
+        """Call the real Gemini API and record a successful response"""
+        if self._upstream is None:
+            self._upstream = httpx.AsyncClient(base_url=UPSTREAM_URL, timeout=120.0)
+        start_time = time.perf_counter()
+        upstream = await self._upstream.post(
+            f"/v1beta/models/{model}:generateContent",
+            params=query,
+            json=body,
+            headers={"x-goog-api-key": self.config.upstream_api_key}
+        )
+        latency = time.perf_counter() - start_time
+        payload = upstream.json()
+        if upstream.status_code == 200:
+            self.recordings.save(model, body, payload, latency)
+            self.stats["recorded"] += 1
+        else:
+            self.stats["upstream_errors"] += 1
+        return JSONResponse(payload, status_code=upstream.status_code, headers=_passthrough_headers(upstream))
+
+    def _generated_response(self, model: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """A response valid against the request's response schema"""
+        generation_config = body.get("generationConfig") or {}
+        schema = generation_config.get("responseSchema")
+        if schema:
+            text = json.dumps(sample_from_schema(schema, self.rng, self.config.array_items), ensure_ascii=False)
+        elif generation_config.get("responseMimeType") == "application/json":
+            text = "{}"
+        else:
+            text = f"（{model} のテスト応答）"
+        self.stats["generated"] += 1
+
+        prompt_tokens = sum(len(part.get("text", "")) for content in body.get("contents", []) for part in content.get("parts", []))
+        output_tokens = len(text)
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": model,
+        }
+
+def sample_from_schema(schema: Dict[str, Any], rng: random.Random, array_items: int = 3, name: str = "value") -> Any:
+    """A value valid against a Gemini response schema
+
+    Every property is filled in, including optional ones, so responses are
+    as large as a complete model answer.
+    """
+    schema_type = schema.get("type", "string")
+    schema_type = _SCHEMA_TYPES.get(schema_type, schema_type) if isinstance(schema_type, int) else str(schema_type).lower()
+
+    if schema.get("enum"):
+        return rng.choice(schema["enum"])
+    if schema_type == "object":
+        return {
+            key: sample_from_schema(value, rng, array_items, key)
+            for key, value in (schema.get("properties") or {}).items()
+        }
+    if schema_type == "array":
+        items = schema.get("items") or {"type": "string"}
+        return [sample_from_schema(items, rng, array_items, name) for _ in range(array_items)]
+    if schema_type == "integer":
+        return rng.randint(1, 100)
+    if schema_type == "number":
+        return round(rng.uniform(0.1, 100.0), 1)
+    if schema_type == "boolean":
+        return rng.random() < 0.5
+    return f"{name}{rng.randint(1, 999)}"
+
+def request_key(model: str, body: Dict[str, Any]) -> str:
+    """Identity of a request for exact replay"""
+    canonical = json.dumps({"model": model, "body": body}, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+def schema_key(body: Dict[str, Any]) -> str:
+    """Identity of a request's response schema (empty without one)"""
+    schema = (body.get("generationConfig") or {}).get("responseSchema")
+    if not schema:
+        return ""
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+def create_app(config: Optional[FakeGeminiSettings] = None) -> FastAPI:
+    """The stand-in server as an ASGI app (also usable in-process)"""
+    fake = FakeGemini(config or FakeGeminiSettings())
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await fake.close()
+
+    app = FastAPI(title="Fake Gemini", lifespan=lifespan)
+    app.state.fake = fake
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        return await fake.generate_content(model, await request.json(), dict(request.query_params))
+
+    @app.get("/stats")
+    async def stats():
+        return fake.snapshot()
+
+    @app.post("/reset")
+    async def reset():
+        fake.reset()
+        return {"status": "reset"}
+
+    return app
+
+def _error(status_code: int, status: str, message: str, headers: Optional[Dict[str, str]] = None,
+           details: Optional[List[Dict[str, Any]]] = None) -> JSONResponse:
+    """An error in the Google API error format"""
+    return JSONResponse(
+        {"error": {"code": status_code, "message": message, "status": status, "details": details or []}},
+        status_code=status_code,
+        headers=headers
+    )
+
+def _rate_limited(retry_after: float) -> JSONResponse:
+    """A 429 carrying the retry delay as a header and a RetryInfo detail"""
+    return _error(
+        429,
+        "RESOURCE_EXHAUSTED",
+        "Injected rate limit",
+        headers={"Retry-After": f"{retry_after:g}"},
+        details=[{
+            "@type": "type.googleapis.com/google.rpc.RetryInfo",
+            "retryDelay": f"{retry_after:g}s",
+        }]
+    )
+
+def _passthrough_headers(response: httpx.Response) -> Dict[str, str]:
+    """Upstream headers worth returning to the client"""
+    return {name: value for name, value in response.headers.items() if name.lower() == "retry-after"}
+
+def _safe_name(model: str) -> str:
+    """A model name usable as a directory name"""
+    return "".join(char if char.isalnum() or char in "-._" else "_" for char in model)
+
+def main() -> None:
+    """Run the stand-in server from the command line"""
+    defaults = FakeGeminiSettings()
+    parser = argparse.ArgumentParser(description="Local Gemini stand-in server")
+    parser.add_argument("--host", default=defaults.host)
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument("--mode", choices=("generate", "replay", "record"), default=defaults.mode)
+    parser.add_argument("--recordings-dir", default=defaults.recordings_dir)
+    parser.add_argument("--replay-strict", action="store_true", default=defaults.replay_strict)
+    parser.add_argument("--latency", default=defaults.latency,
+                        help="fixed:S, uniform:MIN,MAX, lognormal:MEDIAN,SIGMA or recorded")
+    parser.add_argument("--latency-per-token", type=float, default=defaults.latency_per_token)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--requests-per-minute", type=int, default=defaults.requests_per_minute)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = defaults.model_copy(update={key: value for key, value in vars(args).items()})
+
+    import uvicorn
+    uvicorn.run(create_app(config), host=config.host, port=config.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Import-time report for the API server's cold start
+Imports a module in a fresh interpreter under python -X importtime and
+lists where the time goes, and checks no heavy SDK is loaded on the way
+
+    python -m app.devtools.import_report
+    python -m app.devtools.import_report --target simple_image_api --top 30
+"""
+
+import argparse
+import json
+import sys
+
+from app.core.startup import import_time_report
+
+def main() -> None:
+    """Print the report from the command line"""
+    parser = argparse.ArgumentParser(description="Import time report (python -X importtime)")
+    parser.add_argument("--target", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--fail-on-heavy", action="store_true",
+                        help="exit with an error when the target imports a heavy SDK")
+    args = parser.parse_args()
+
+    try:
+        report = import_time_report(args.target, args.top)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    heavy = report["heavy_modules"]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {report['target']}: {report['total'] * 1000:.0f} ms, {report['modules']} modules")
+        for title, key, field in (
+            ("Imported by the target (cumulative)", "top_level", "cumulative"),
+            ("Slowest modules (cumulative)", "cumulative", "cumulative"),
+            ("Slowest modules (self)", "self", "self"),
+        ):
+            print(f"\n{title}:")
+            for row in report[key]:
+                print(f"  {row[field] * 1000:8.1f} ms  {row['module']}")
+        if heavy:
+            print(f"\nHeavy SDKs imported: {', '.join(heavy)}")
+
+    if heavy and args.fail_on_heavy:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
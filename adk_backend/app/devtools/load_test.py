@@ -0,0 +1,369 @@
+"""
+HTTP load-test harness for the meal planning API
+Replays a mix of API requests against create_app() in-process (or a running
+server) at fixed concurrency or arrival rates, and reports throughput,
+latency percentiles and error rates per load level
+
+    python -m app.devtools.load_test --concurrency 1,4,16,64 --duration 30
+    python -m app.devtools.load_test --rate 1,2,5 --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.core.logging import setup_logging
+from app.devtools.benchmark import StubModel, stubbed_model, synthetic_fridge
+from app.devtools.fake_gemini import LatencyModel
+from app.models.schemas import (
+    MealPlanningRequest, UserPreferences,
+    IngredientAnalysisRequest, NutritionAnalysisRequest, RecipeSuggestionRequest,
+    CookingOptimizationRequest, MealThemeRequest
+)
+
+# Scenario -> (target app, path)
+ENDPOINTS = {
+    "suggest": ("api", "/api/v1/meal-planning/suggest"),
+    "ingredient-analysis": ("api", "/api/v1/agents/ingredient-analysis"),
+    "nutrition-balance": ("api", "/api/v1/agents/nutrition-balance"),
+    "recipe-suggestion": ("api", "/api/v1/agents/recipe-suggestion"),
+    "cooking-optimization": ("api", "/api/v1/agents/cooking-optimization"),
+    "meal-theme": ("api", "/api/v1/agents/meal-theme"),
+    "generate-image": ("image", "/generate-image"),
+}
+
+DEFAULT_MIX = "suggest=5,ingredient-analysis=1,nutrition-balance=1,recipe-suggestion=1,cooking-optimization=1,meal-theme=1,generate-image=1"
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+class RequestResult:
+    """Outcome of one request"""
+
+    def __init__(self, scenario: str, status: Optional[int], latency: float, error: Optional[str] = None):
+        self.scenario = scenario
+        self.status = status
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400
+
+async def build_payloads(households: int, fridge_size: int, seed: int) -> Dict[str, List[bytes]]:
+    """Request bodies of every scenario, one per synthetic household
+
+    Agent inputs that depend on earlier stages are produced by the agents'
+    local fallbacks, so building them needs no model.
+    """
+    from app.agents.base_agent import local_fallback
+    from app.agents.ingredient_analysis_agent import IngredientAnalysisAgent
+    from app.agents.nutrition_balance_agent import NutritionBalanceAgent
+    from app.agents.recipe_suggestion_agent import RecipeSuggestionAgent
+
+    ingredient_agent = IngredientAnalysisAgent()
+    nutrition_agent = NutritionBalanceAgent()
+    recipe_agent = RecipeSuggestionAgent()
+    preferences = UserPreferences()
+
+    payloads: Dict[str, List[bytes]] = defaultdict(list)
+    for household in range(households):
+        products = synthetic_fridge(fridge_size, seed + household)
+        with local_fallback():
+            ingredient_analysis = await ingredient_agent.process(IngredientAnalysisRequest(products=products))
+            nutrition_analysis = await nutrition_agent.process(NutritionAnalysisRequest(
+                ingredients=ingredient_analysis.analyzed_ingredients,
+                user_preferences=preferences
+            ))
+            recipe_request = RecipeSuggestionRequest(
+                ingredient_analysis=ingredient_analysis,
+                nutrition_analysis=nutrition_analysis,
+                user_preferences=preferences
+            )
+            recipes = await recipe_agent.process(recipe_request)
+        meal_items = [recipes.main_dish, recipes.side_dish, recipes.soup, recipes.rice]
+
+        requests = {
+            "suggest": MealPlanningRequest(
+                refrigerator_items=products,
+                household_id=f"load-test-{household}",
+                user_preferences=preferences
+            ),
+            "ingredient-analysis": IngredientAnalysisRequest(products=products),
+            "nutrition-balance": NutritionAnalysisRequest(
+                ingredients=ingredient_analysis.analyzed_ingredients,
+                user_preferences=preferences
+            ),
+            "recipe-suggestion": recipe_request,
+            "cooking-optimization": CookingOptimizationRequest(
+                recipes=meal_items,
+                constraints={"max_cooking_time": preferences.max_cooking_time}
+            ),
+            "meal-theme": MealThemeRequest(
+                recipes=meal_items,
+                user_preferences=preferences,
+                current_date=datetime.now()
+            ),
+        }
+        for scenario, request in requests.items():
+            payloads[scenario].append(request.model_dump_json().encode("utf-8"))
+        for item in meal_items:
+            payloads["generate-image"].append(json.dumps(
+                {"prompt": f"{item.name}: {item.description}", "style": "photorealistic", "size": "1024x1024"},
+                ensure_ascii=False
+            ).encode("utf-8"))
+    return payloads
+
+class LoadGenerator:
+    """Sends the request mix and collects results"""
+
+    def __init__(
+        self,
+        clients: Dict[str, httpx.AsyncClient],
+        payloads: Dict[str, List[bytes]],
+        mix: Dict[str, float],
+        seed: int = 0
+    ):
+        self.clients = clients
+        self.payloads = payloads
+        self.scenarios = list(mix)
+        self.weights = [mix[scenario] for scenario in self.scenarios]
+        self.rng = random.Random(seed)
+
+    async def send(self) -> RequestResult:
+        """Send one request picked from the mix"""
+        scenario = self.rng.choices(self.scenarios, self.weights)[0]
+        target, path = ENDPOINTS[scenario]
+        body = self.rng.choice(self.payloads[scenario])
+        start_time = time.perf_counter()
+        try:
+            response = await self.clients[target].post(path, content=body, headers={"content-type": "application/json"})
+        except Exception as e:
+            return RequestResult(scenario, None, time.perf_counter() - start_time, type(e).__name__)
+        return RequestResult(scenario, response.status_code, time.perf_counter() - start_time)
+
+    async def closed_loop(self, concurrency: int, duration: float) -> Tuple[List[RequestResult], float]:
+        """concurrency users sending back to back for duration seconds"""
+        results: List[RequestResult] = []
+        deadline = time.perf_counter() + duration
+
+        async def user() -> None:
+            while time.perf_counter() < deadline:
+                results.append(await self.send())
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        return results, time.perf_counter() - start_time
+
+    async def open_loop(self, rate: float, duration: float, max_in_flight: int) -> Tuple[List[RequestResult], float]:
+        """Poisson arrivals at rate per second for duration seconds
+
+        Arrivals do not wait for earlier requests, so queueing in the server
+        shows up as latency. An arrival finding max_in_flight requests still
+        open is counted as dropped instead of being sent.
+        """
+        results: List[RequestResult] = []
+        tasks = set()
+        start_time = time.perf_counter()
+        next_arrival = start_time
+
+        async def request() -> None:
+            results.append(await self.send())
+
+        while next_arrival < start_time + duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            if len(tasks) >= max_in_flight:
+                results.append(RequestResult("dropped", None, 0.0, "client_saturated"))
+            else:
+                task = asyncio.create_task(request())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_arrival += self.rng.expovariate(rate)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        return results, time.perf_counter() - start_time
+
+def summarize(results: Sequence[RequestResult], elapsed: float) -> Dict[str, Any]:
+    """Throughput, error rate and latency percentiles, overall and per scenario"""
+    by_scenario: Dict[str, List[RequestResult]] = defaultdict(list)
+    for result in results:
+        by_scenario[result.scenario].append(result)
+
+    def stats(group: Sequence[RequestResult]) -> Dict[str, Any]:
+        latencies = sorted(result.latency for result in group if result.ok)
+        errors = Counter(result.error or str(result.status) for result in group if not result.ok)
+        summary: Dict[str, Any] = {
+            "requests": len(group),
+            "ok": len(latencies),
+            "error_rate": round(sum(errors.values()) / len(group), 4) if group else 0.0,
+            "throughput": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+            "errors": dict(errors),
+        }
+        for fraction in PERCENTILES:
+            summary[f"p{int(fraction * 100)}"] = _percentile(latencies, fraction)
+        summary["max"] = round(latencies[-1], 4) if latencies else None
+        return summary
+
+    return {
+        "elapsed": round(elapsed, 3),
+        "overall": stats(results),
+        "scenarios": {scenario: stats(group) for scenario, group in sorted(by_scenario.items())},
+    }
+
+def _percentile(ordered: Sequence[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted values"""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(fraction * len(ordered) + 0.999999) - 1))
+    return round(ordered[index], 4)
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse scenario=weight pairs"""
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        scenario, _, weight = part.partition("=")
+        scenario = scenario.strip()
+        if scenario not in ENDPOINTS:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        mix[scenario] = float(weight or 1)
+    return {scenario: weight for scenario, weight in mix.items() if weight > 0}
+
+def _format_level(label: str, report: Dict[str, Any]) -> List[str]:
+    def row(name: str, stats: Dict[str, Any]) -> str:
+        def ms(value: Optional[float]) -> str:
+            return f"{value * 1000:>8.0f}" if value is not None else f"{'-':>8}"
+        return (
+            f"  {name:<22}{stats['requests']:>7}{stats['throughput']:>9.2f}/s{stats['error_rate']:>8.1%}"
+            f"{ms(stats['p50'])}{ms(stats['p90'])}{ms(stats['p95'])}{ms(stats['p99'])}{ms(stats['max'])}"
+        )
+
+    lines = [
+        f"{label} ({report['elapsed']:.1f}s)",
+        f"  {'scenario':<22}{'reqs':>7}{'ok/s':>11}{'errors':>8}{'p50':>8}{'p90':>8}{'p95':>8}{'p99':>8}{'max':>8} (ms)",
+    ]
+    for scenario, stats in report["scenarios"].items():
+        lines.append(row(scenario, stats))
+    lines.append(row("total", report["overall"]))
+    return lines
+
+async def run_load_test(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Set up the targets and run every load level"""
+    mix = parse_mix(args.mix)
+    payloads = await build_payloads(args.households, args.fridge_size, args.seed)
+
+    async with AsyncExitStack() as stack:
+        clients: Dict[str, httpx.AsyncClient] = {}
+        timeout = httpx.Timeout(args.timeout)
+
+        if args.url:
+            clients["api"] = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+        else:
+            from main import create_app
+
+            if args.model == "stub":
+                latency = LatencyModel(args.stub_latency)
+                stack.enter_context(stubbed_model(StubModel(args.seed, latency=latency), isolated=False))
+            api_app = create_app()
+            # ASGITransport does not run the lifespan, which sets up the agents
+            await stack.enter_async_context(api_app.router.lifespan_context(api_app))
+            clients["api"] = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app),
+                base_url="http://api",
+                timeout=timeout
+            )
+
+        if "generate-image" in mix:
+            if args.image_url:
+                clients["image"] = httpx.AsyncClient(base_url=args.image_url, timeout=timeout)
+            else:
+                from simple_image_api import app as image_app
+
+                clients["image"] = httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=image_app),
+                    base_url="http://image",
+                    timeout=timeout
+                )
+
+        for client in clients.values():
+            await stack.enter_async_context(client)
+
+        generator = LoadGenerator(clients, payloads, mix, args.seed)
+        levels = [("rate", float(value)) for value in args.rate.split(",")] if args.rate else \
+                 [("concurrency", int(value)) for value in args.concurrency.split(",")]
+
+        reports = []
+        for kind, value in levels:
+            if kind == "rate":
+                results, elapsed = await generator.open_loop(value, args.duration, args.max_in_flight)
+            else:
+                results, elapsed = await generator.closed_loop(value, args.duration)
+            report = {kind: value, **summarize(results, elapsed)}
+            reports.append(report)
+            print("\n".join(_format_level(f"{kind} {value:g}", report)), flush=True)
+        return reports
+
+def capacity(reports: Sequence[Dict[str, Any]], slo_p95: float, max_error_rate: float) -> Optional[Dict[str, Any]]:
+    """The highest load level that met the latency SLO and error budget"""
+    passing = [
+        report for report in reports
+        if report["overall"]["p95"] is not None
+        and report["overall"]["p95"] <= slo_p95
+        and report["overall"]["error_rate"] <= max_error_rate
+    ]
+    return passing[-1] if passing else None
+
+def main() -> None:
+    """Run the load test from the command line"""
+    parser = argparse.ArgumentParser(description="Meal planning API load test")
+    parser.add_argument("--url", help="base URL of a running API (default: create_app() in-process)")
+    parser.add_argument("--image-url", help="base URL of simple_image_api (default: in-process)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight pairs")
+    parser.add_argument("--concurrency", default="1,4,16", help="closed-loop users per level")
+    parser.add_argument("--rate", help="open-loop arrivals per second per level (instead of --concurrency)")
+    parser.add_argument("--max-in-flight", type=int, default=512)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per level")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--households", type=int, default=20)
+    parser.add_argument("--fridge-size", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", choices=("stub", "configured"), default="stub",
+                        help="in-process Gemini: a stub with --stub-latency, or the configured client")
+    parser.add_argument("--stub-latency", default="lognormal:1.2,0.4")
+    parser.add_argument("--slo-p95", type=float, default=10.0, help="seconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--json", help="write the reports to this file")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    setup_logging()
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    reports = asyncio.run(run_load_test(args))
+
+    best = capacity(reports, args.slo_p95, args.max_error_rate)
+    if best is None:
+        print(f"No level met p95 <= {args.slo_p95}s with error rate <= {args.max_error_rate:.1%}")
+    else:
+        level = "rate" if "rate" in best else "concurrency"
+        print(
+            f"Capacity: {level} {best[level]:g} "
+            f"({best['overall']['throughput']:.2f} req/s, p95 {best['overall']['p95']:.2f}s)"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,8 @@
 Pydantic models for ADK Meal Planning API
 """
 
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any, Union
+from pydantic import AfterValidator, BaseModel, BeforeValidator, Field, validator
+from typing import Annotated, List, Optional, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
 
@@ -26,6 +26,12 @@ class MealPlanStatus(str, Enum):
     REJECTED = "rejected"
     COMPLETED = "completed"
 
+class ImageJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class MealCategory(str, Enum):
     MAIN = "main"
     SIDE = "side"
@@ -116,6 +122,7 @@ class MealItem(BaseModel):
     cooking_time: int = Field(ge=1)
     difficulty: DifficultyLevel
     nutrition_info: NutritionInfo
+    image_url: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.now)
 
 # Meal plan models
@@ -160,12 +167,56 @@ class MealPlanningRequest(BaseModel):
             raise ValueError('Refrigerator items cannot be empty')
         return v
 
+class SpanTiming(BaseModel):
+    """One traced operation of a request, relative to the request start"""
+    name: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_ms: float
+    duration_ms: float
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+    error: Optional[str] = None
+
+class RequestTimings(BaseModel):
+    """Span breakdown of a request (spans still open are timed so far)"""
+    trace_id: str
+    total_ms: float
+    spans: List[SpanTiming] = Field(default_factory=list)
+    dropped_spans: int = 0
+
 class MealPlanningResponse(BaseModel):
     """Response model for meal planning"""
     meal_plan: MealPlan
     shopping_list: List[ShoppingItem]
     processing_time: float
     agents_used: List[str]
+    image_jobs: Dict[str, str] = Field(default_factory=dict)
+    # Stages replaced by their local fallback because they ran out of time
+    degraded_stages: List[str] = Field(default_factory=list)
+    # Per-stage spans of this request, when requested with include_timings
+    timings: Optional[RequestTimings] = None
+
+class MealPlanningBatchRequest(BaseModel):
+    """Request model for planning meals for many households in one call"""
+    requests: List[MealPlanningRequest]
+    # Defaults to settings.batch_max_concurrency, which also caps it
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    # Dish images are opt-in for batches; when requested, each result's
+    # image_jobs lists the job IDs to poll
+    generate_images: bool = False
+    
+    @validator('requests')
+    def validate_requests(cls, v):
+        if not v:
+            raise ValueError('At least one meal planning request is required')
+        return v
+
+class MealPlanExecution(BaseModel):
+    """Meal plan together with how the agent pipeline produced it"""
+    meal_plan: MealPlan
+    stage_timings: Dict[str, float] = Field(default_factory=dict)
+    image_jobs: Dict[str, str] = Field(default_factory=dict)
+    degraded_stages: List[str] = Field(default_factory=list)
 
 # Agent-specific models
 class IngredientAnalysisRequest(BaseModel):
@@ -192,11 +243,25 @@ class NutritionAnalysisResult(BaseModel):
     warnings: List[str]
     suggestions: List[str]
 
+class FridgeAnalysisRequest(BaseModel):
+    """Request for the fused ingredient and nutrition analysis agent"""
+    products: List[Product]
+    user_preferences: UserPreferences
+    current_date: datetime = Field(default_factory=datetime.now)
+
+class FridgeAnalysisResult(BaseModel):
+    """Result from the fused ingredient and nutrition analysis agent"""
+    ingredient_analysis: IngredientAnalysisResult
+    nutrition_analysis: NutritionAnalysisResult
+
 class RecipeSuggestionRequest(BaseModel):
     """Request for recipe suggestion agent"""
     ingredient_analysis: IngredientAnalysisResult
     nutrition_analysis: NutritionAnalysisResult
     user_preferences: UserPreferences
+    # Used when generating alternatives to steer away from earlier suggestions
+    avoid_dishes: List[str] = Field(default_factory=list)
+    variation_hint: Optional[str] = None
 
 class RecipeSuggestionResult(BaseModel):
     """Result from recipe suggestion agent"""
@@ -246,6 +311,18 @@ class ImageGenerationResult(BaseModel):
     image_metadata: List[Dict[str, Any]]
     generation_time: float
 
+class ImageJob(BaseModel):
+    """Background image generation job for one dish"""
+    job_id: str
+    # Unknown only when a Celery job is polled while its Redis record is unreachable
+    household_id: Optional[str] = None
+    dish: Optional[str] = None
+    status: ImageJobStatus = ImageJobStatus.PENDING
+    image_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    completed_at: Optional[datetime] = None
+
 class UserPreferenceRequest(BaseModel):
     """Request for user preference conversation agent"""
     user_input: str
@@ -258,3 +335,186 @@ class UserPreferenceResult(BaseModel):
     confidence_score: float
     next_questions: List[str]
     updated_profile: Dict[str, Any]
+
+# Structured output models
+# JSON shapes requested from Gemini. Optional fields keep each agent's own
+# defaults; they are converted to Gemini response schemas by
+# app.core.structured_output.gemini_response_schema.
+# Numbers and dates are normalized into the ranges the result models
+# (MealPlan, MealItem, NutritionInfo) accept, rather than rejected.
+def normalize_confidence(value: float) -> float:
+    """Confidence in 0-1; values over 1 are read as percentages"""
+    if value > 1:
+        value /= 100
+    return min(max(value, 0.0), 1.0)
+
+def normalize_score(value: float) -> float:
+    """Score in 0-100"""
+    return min(max(value, 0.0), 100.0)
+
+def normalize_minutes(value: int) -> int:
+    """A duration of at least one minute"""
+    return max(value, 1)
+
+def normalize_amount(value: float) -> float:
+    """A nutrient amount, never negative"""
+    return max(value, 0.0)
+
+def normalize_iso_date(value: Any) -> Optional[str]:
+    """An ISO 8601 date or datetime, or None when it cannot be parsed"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.strip()).isoformat()
+    except ValueError:
+        return None
+
+Confidence = Annotated[float, AfterValidator(normalize_confidence), Field(description="0-1")]
+Score = Annotated[float, AfterValidator(normalize_score), Field(description="0-100")]
+Minutes = Annotated[int, AfterValidator(normalize_minutes)]
+Amount = Annotated[float, AfterValidator(normalize_amount)]
+IsoDate = Annotated[Optional[str], BeforeValidator(normalize_iso_date), Field(description="YYYY-MM-DD")]
+
+class IngredientRecommendationsOutput(BaseModel):
+    """Gemini output of the ingredient analysis agent"""
+    recommendations: List[str]
+
+class RecommendedNutrientsOutput(BaseModel):
+    """Recommended nutrient amounts in grams"""
+    protein: Optional[Amount] = None
+    carbohydrates: Optional[Amount] = None
+    fat: Optional[Amount] = None
+    fiber: Optional[Amount] = None
+
+class NutritionRecommendationsOutput(BaseModel):
+    """Gemini output of the nutrition balance agent"""
+    nutrition_score: Score
+    recommended_nutrients: Optional[RecommendedNutrientsOutput] = None
+    warnings: Optional[List[str]] = None
+    suggestions: Optional[List[str]] = None
+
+class FridgeAnalysisOutput(BaseModel):
+    """Gemini output of the fridge analysis agent"""
+    ingredient_recommendations: List[str]
+    nutrition: NutritionRecommendationsOutput
+
+class RecipeIngredientOutput(BaseModel):
+    """Ingredient of a suggested dish"""
+    name: str
+    quantity: Optional[str] = None
+    unit: Optional[str] = None
+    available: Optional[bool] = None
+    priority: Optional[ExpiryPriority] = None
+
+class RecipeStepsOutput(BaseModel):
+    """Steps and tips of a suggested dish"""
+    steps: List[str]
+    tips: Optional[List[str]] = None
+
+class DishNutritionOutput(BaseModel):
+    """Nutrition of a suggested dish"""
+    calories: Optional[Amount] = None
+    protein: Optional[Amount] = None
+    carbohydrates: Optional[Amount] = None
+    fat: Optional[Amount] = None
+
+class DishOutput(BaseModel):
+    """One suggested dish"""
+    name: str
+    description: Optional[str] = None
+    cooking_time: Optional[Minutes] = None
+    difficulty: Optional[DifficultyLevel] = None
+    ingredients: Optional[List[RecipeIngredientOutput]] = None
+    recipe: Optional[RecipeStepsOutput] = None
+    nutrition_info: Optional[DishNutritionOutput] = None
+
+class RecipeSuggestionOutput(BaseModel):
+    """Gemini output of the recipe suggestion agent"""
+    main_dish: DishOutput
+    side_dish: DishOutput
+    soup: DishOutput
+    rice: DishOutput
+    total_cooking_time: Minutes
+    difficulty: DifficultyLevel
+    nutrition_score: Score
+    confidence: Confidence
+
+class OptimizedRecipeOutput(BaseModel):
+    """Optimization of one recipe"""
+    name: str
+    optimized_cooking_time: Optional[Minutes] = None
+    preparation_order: Optional[str] = None
+    cooking_tips: Optional[List[str]] = None
+
+class CookingStepOutput(BaseModel):
+    """One entry of the cooking schedule"""
+    time: str
+    action: str
+    duration: Optional[int] = None
+    parallel: Optional[bool] = None
+
+class CookingOptimizationOutput(BaseModel):
+    """Gemini output of the cooking optimization agent"""
+    optimized_recipes: List[OptimizedRecipeOutput]
+    cooking_schedule: Optional[List[CookingStepOutput]] = None
+    total_time: Optional[Minutes] = None
+    efficiency_score: Optional[Score] = None
+
+class ThemeDishOutput(BaseModel):
+    """Dish adjusted to the meal theme"""
+    name: str
+    description: Optional[str] = None
+    cooking_time: Optional[Minutes] = None
+    difficulty: Optional[DifficultyLevel] = None
+
+class UnifiedMealPlanOutput(BaseModel):
+    """Meal plan adjusted to the meal theme"""
+    household_id: Optional[str] = None
+    date: IsoDate = None
+    status: Optional[str] = None
+    main_dish: Optional[ThemeDishOutput] = None
+    side_dish: Optional[ThemeDishOutput] = None
+    soup: Optional[ThemeDishOutput] = None
+    rice: Optional[ThemeDishOutput] = None
+    total_cooking_time: Optional[Minutes] = None
+    difficulty: Optional[DifficultyLevel] = None
+    nutrition_score: Optional[Score] = None
+    confidence: Optional[Confidence] = None
+
+class VisualStyleOutput(BaseModel):
+    """Visual style of the meal theme"""
+    color_palette: Optional[List[str]] = None
+    mood: Optional[str] = None
+    presentation_style: Optional[str] = None
+
+class MealThemeOutput(BaseModel):
+    """Gemini output of the meal theme agent"""
+    theme_name: str
+    theme_description: Optional[str] = None
+    unified_meal_plan: Optional[UnifiedMealPlanOutput] = None
+    visual_style: Optional[VisualStyleOutput] = None
+
+class StructuredPreferencesOutput(BaseModel):
+    """User preferences extracted from a conversation"""
+    max_cooking_time: Optional[int] = None
+    preferred_difficulty: Optional[DifficultyLevel] = None
+    dietary_restrictions: Optional[List[str]] = None
+    allergies: Optional[List[str]] = None
+    disliked_ingredients: Optional[List[str]] = None
+    preferred_cuisines: Optional[List[str]] = None
+
+class UpdatedProfileOutput(BaseModel):
+    """User profile after a conversation"""
+    user_id: Optional[str] = None
+    preferences: Optional[StructuredPreferencesOutput] = None
+    conversation_history: Optional[List[str]] = None
+    last_updated: Optional[str] = None
+
+class PreferenceConversationOutput(BaseModel):
+    """Gemini output of the user preference conversation agent"""
+    structured_preferences: StructuredPreferencesOutput
+    confidence_score: Optional[Confidence] = None
+    next_questions: Optional[List[str]] = None
+    updated_profile: Optional[UpdatedProfileOutput] = None
@@ -0,0 +1,138 @@
+"""
+Application-scoped registry of ADK agents and services
+"""
+
+import asyncio
+import time
+import structlog
+from functools import cached_property
+from typing import List
+
+from app.agents.base_agent import BaseAgent
+from app.agents.ingredient_analysis_agent import IngredientAnalysisAgent
+from app.agents.nutrition_balance_agent import NutritionBalanceAgent
+from app.agents.fridge_analysis_agent import FridgeAnalysisAgent
+from app.agents.recipe_suggestion_agent import RecipeSuggestionAgent
+from app.agents.cooking_optimization_agent import CookingOptimizationAgent
+from app.agents.meal_theme_agent import MealThemeAgent
+from app.agents.image_generation_agent import ImageGenerationAgent
+from app.agents.user_preference_conversation_agent import UserPreferenceConversationAgent
+from app.services.meal_planning_service import MealPlanningService
+from app.services.image_jobs import ImageJobManager
+from app.core.config import settings
+from app.core.model_client import gemini_client
+
+logger = structlog.get_logger(__name__)
+
+class AgentRegistry:
+    """Holds one instance of every agent and of the services built on them
+
+    Created once in the application lifespan and shared by all requests
+    through dependency injection. Agents are constructed on first use, so
+    startup does not wait for them; warm_up() constructs them all and loads
+    the Gemini SDK ahead of the first request.
+    """
+
+    @cached_property
+    def ingredient_agent(self) -> IngredientAnalysisAgent:
+        return IngredientAnalysisAgent()
+
+    @cached_property
+    def nutrition_agent(self) -> NutritionBalanceAgent:
+        return NutritionBalanceAgent()
+
+    @cached_property
+    def fridge_agent(self) -> FridgeAnalysisAgent:
+        return FridgeAnalysisAgent()
+
+    @cached_property
+    def recipe_agent(self) -> RecipeSuggestionAgent:
+        return RecipeSuggestionAgent()
+
+    @cached_property
+    def cooking_agent(self) -> CookingOptimizationAgent:
+        return CookingOptimizationAgent()
+
+    @cached_property
+    def theme_agent(self) -> MealThemeAgent:
+        return MealThemeAgent()
+
+    @cached_property
+    def image_agent(self) -> ImageGenerationAgent:
+        return ImageGenerationAgent()
+
+    @cached_property
+    def preference_agent(self) -> UserPreferenceConversationAgent:
+        return UserPreferenceConversationAgent()
+
+    @cached_property
+    def image_jobs(self) -> ImageJobManager:
+        return ImageJobManager(
+            self.image_agent,
+            backend=settings.image_job_backend,
+            workers=settings.image_job_workers,
+            max_jobs=settings.image_job_retention,
+            max_queued=settings.image_job_max_queued,
+            # Job records live as long as the Celery results they describe
+            redis_url=settings.celery_result_backend or settings.redis_url,
+            job_ttl=settings.cache_ttl
+        )
+
+    @cached_property
+    def meal_planning_service(self) -> MealPlanningService:
+        return MealPlanningService(
+            ingredient_agent=self.ingredient_agent,
+            nutrition_agent=self.nutrition_agent,
+            fridge_agent=self.fridge_agent,
+            recipe_agent=self.recipe_agent,
+            cooking_agent=self.cooking_agent,
+            theme_agent=self.theme_agent,
+            image_agent=self.image_agent,
+            image_jobs=self.image_jobs
+        )
+
+    async def start(self) -> None:
+        """Start background workers"""
+        await self.image_jobs.start()
+
+    async def stop(self) -> None:
+        """Stop background workers"""
+        await self.image_jobs.stop()
+
+    async def warm_up(self) -> None:
+        """Construct every agent and load the Gemini SDK and model instances
+
+        Agent construction is cheap and runs on the event loop; the SDK
+        import runs in a worker thread so requests are served meanwhile.
+        """
+        start_time = time.perf_counter()
+        agents = self.agents()
+        configurations = {
+            (model, agent.temperature, agent.max_tokens)
+            for agent in agents
+            for model in (agent.model, agent.fast_model)
+            if model
+        }
+        await asyncio.to_thread(gemini_client.warm_up, sorted(configurations))
+        logger.info(
+            "Agent registry warmed up",
+            agents=[agent.name for agent in agents],
+            duration=round(time.perf_counter() - start_time, 4)
+        )
+
+    def agents(self) -> List[BaseAgent]:
+        """All registered agents, constructing any not used yet"""
+        return [
+            self.ingredient_agent,
+            self.nutrition_agent,
+            self.fridge_agent,
+            self.recipe_agent,
+            self.cooking_agent,
+            self.theme_agent,
+            self.image_agent,
+            self.preference_agent
+        ]
+
+    def agent_names(self) -> List[str]:
+        """Get the names of all registered agents"""
+        return [agent.name for agent in self.agents()]
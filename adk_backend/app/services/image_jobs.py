@@ -0,0 +1,207 @@
+"""
+Background image generation jobs
+Decouples dish images from the meal plan response
+"""
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+import redis.asyncio as redis
+import structlog
+
+from app.agents.image_generation_agent import ImageGenerationAgent
+from app.models.schemas import ImageGenerationRequest, ImageJob, ImageJobStatus
+
+logger = structlog.get_logger(__name__)
+
+# Celery task states -> job status
+CELERY_STATUS = {
+    "PENDING": ImageJobStatus.PENDING,
+    "RECEIVED": ImageJobStatus.PENDING,
+    "STARTED": ImageJobStatus.RUNNING,
+    "RETRY": ImageJobStatus.RUNNING,
+    "SUCCESS": ImageJobStatus.COMPLETED,
+    "FAILURE": ImageJobStatus.FAILED,
+    "REVOKED": ImageJobStatus.FAILED,
+}
+
+class ImageJobManager:
+    """Runs image generation jobs outside the request that created them
+
+    The "local" backend keeps jobs in memory and runs them on a pool of
+    asyncio workers in the API process. The "celery" backend hands them to
+    a Celery worker and reads their state from the Celery result backend,
+    so any API instance can answer a status poll.
+
+    The local queue holds at most max_queued jobs; a job submitted while it
+    is full fails straight away rather than growing the queue without bound.
+
+    Celery reports an unknown task ID as pending, so the celery backend
+    also records each submitted job in Redis (at redis_url, for job_ttl
+    seconds) and treats IDs missing there as unknown, like the local one.
+    """
+
+    def __init__(
+        self,
+        image_agent: ImageGenerationAgent,
+        backend: str = "local",
+        workers: int = 4,
+        max_jobs: int = 10000,
+        max_queued: int = 1000,
+        redis_url: Optional[str] = None,
+        job_ttl: int = 3600,
+        key_prefix: str = "adk:image-jobs:"
+    ):
+        if backend not in ("local", "celery"):
+            raise ValueError(f"Unknown image job backend: {backend}")
+
+        self.image_agent = image_agent
+        self.backend = backend
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.max_queued = max_queued
+        self.redis_url = redis_url
+        self.job_ttl = job_ttl
+        self.key_prefix = key_prefix
+
+        self._jobs: "OrderedDict[str, ImageJob]" = OrderedDict()
+        self._requests: Dict[str, ImageGenerationRequest] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._redis: Optional[redis.Redis] = None
+
+    async def start(self) -> None:
+        """Start the local worker pool"""
+        if self.backend != "local" or self._worker_tasks:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"image-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info("Image job workers started", workers=self.workers)
+
+    async def stop(self) -> None:
+        """Stop the local worker pool, abandoning queued jobs"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def submit(self, household_id: str, dish: str, request: ImageGenerationRequest) -> ImageJob:
+        """Queue an image generation job and return it immediately"""
+        job = ImageJob(job_id=uuid.uuid4().hex, household_id=household_id, dish=dish)
+        self._remember(job)
+
+        if self.backend == "celery":
+            from app.tasks.image_tasks import generate_menu_image
+
+            # Recorded first, so a poll right after submit finds the job
+            await self._get_redis().set(self.key_prefix + job.job_id, job.model_dump_json(), ex=self.job_ttl)
+            await asyncio.to_thread(
+                generate_menu_image.apply_async,
+                args=[household_id, dish, request.model_dump(mode="json")],
+                task_id=job.job_id
+            )
+        else:
+            await self.start()
+            try:
+                self._queue.put_nowait(job.job_id)
+            except asyncio.QueueFull:
+                logger.warning("Image job queue full, dropping job", job_id=job.job_id, dish=dish)
+                job.status = ImageJobStatus.FAILED
+                job.error = "Image job queue is full"
+                job.completed_at = datetime.now()
+                return job
+            self._requests[job.job_id] = request
+
+        logger.info("Image job submitted", job_id=job.job_id, household_id=household_id, dish=dish)
+        return job
+
+    async def get(self, job_id: str) -> Optional[ImageJob]:
+        """Get the current state of a job"""
+        if self.backend == "celery":
+            submitted = await self._submitted_job(job_id)
+            if submitted is None:
+                return None
+            return await asyncio.to_thread(self._get_celery_job, submitted)
+        return self._jobs.get(job_id)
+
+    async def _submitted_job(self, job_id: str) -> Optional[ImageJob]:
+        """The job as recorded at submission by any API instance, or None if unknown or expired"""
+        try:
+            recorded = await self._get_redis().get(self.key_prefix + job_id)
+        except Exception as e:
+            # Without the record a real job would look unknown; fall back to Celery's view
+            logger.warning("Image job registry unavailable", job_id=job_id, error=str(e))
+            return self._jobs.get(job_id) or ImageJob(job_id=job_id)
+        if recorded is None:
+            return None
+        return ImageJob.model_validate_json(recorded)
+
+    def _get_celery_job(self, job: ImageJob) -> ImageJob:
+        """Build the job state from the Celery result backend"""
+        from app.tasks.celery_app import celery_app
+
+        result = celery_app.AsyncResult(job.job_id)
+        job = job.model_copy(update={"status": CELERY_STATUS.get(result.state, ImageJobStatus.PENDING)})
+
+        if result.state == "SUCCESS":
+            payload = result.result or {}
+            job = job.model_copy(update={
+                "household_id": payload.get("household_id", job.household_id),
+                "dish": payload.get("dish", job.dish),
+                "image_url": payload.get("image_url"),
+                "completed_at": result.date_done,
+            })
+        elif result.state in ("FAILURE", "REVOKED"):
+            job = job.model_copy(update={"error": str(result.result), "completed_at": result.date_done})
+
+        return job
+
+    async def _worker(self) -> None:
+        """Process queued jobs one at a time"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        """Generate the image for one job and record the outcome"""
+        job = self._jobs.get(job_id)
+        request = self._requests.pop(job_id, None)
+        if job is None or request is None:
+            return
+
+        job.status = ImageJobStatus.RUNNING
+        try:
+            result = await self.image_agent.process(request)
+            job.image_url = result.image_urls[0] if result.image_urls else None
+            job.status = ImageJobStatus.COMPLETED
+        except Exception as e:
+            logger.warning("Image job failed", job_id=job_id, error=str(e))
+            job.error = str(e)
+            job.status = ImageJobStatus.FAILED
+        job.completed_at = datetime.now()
+
+    def _get_redis(self) -> redis.Redis:
+        """Get the client of the Redis instance recording celery jobs"""
+        if self._redis is None:
+            self._redis = redis.from_url(self.redis_url, decode_responses=True, socket_connect_timeout=0.5)
+        return self._redis
+
+    def _remember(self, job: ImageJob) -> None:
+        """Track a job, forgetting the oldest ones beyond max_jobs"""
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            old_job_id, _ = self._jobs.popitem(last=False)
+            self._requests.pop(old_job_id, None)
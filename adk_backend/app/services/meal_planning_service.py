@@ -2,39 +2,116 @@
 Meal planning service that coordinates ADK agents
 """
 
+import asyncio
+import time
 import structlog
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence, Union
 from datetime import datetime
 
 from app.models.schemas import (
-    MealPlanningRequest, MealPlan, ShoppingItem, Product,
-    IngredientAnalysisRequest, NutritionAnalysisRequest,
-    RecipeSuggestionRequest, CookingOptimizationRequest,
-    MealThemeRequest, ImageGenerationRequest
+    MealPlanningRequest, MealPlan, MealPlanExecution, MealItem, ShoppingItem, Product,
+    IngredientAnalysisRequest, IngredientAnalysisResult,
+    NutritionAnalysisRequest, NutritionAnalysisResult,
+    FridgeAnalysisRequest, FridgeAnalysisResult,
+    RecipeSuggestionRequest, RecipeSuggestionResult,
+    CookingOptimizationRequest, CookingOptimizationResult,
+    MealThemeRequest, MealThemeResult, ImageGenerationRequest
 )
 from app.agents.ingredient_analysis_agent import IngredientAnalysisAgent
 from app.agents.nutrition_balance_agent import NutritionBalanceAgent
+from app.agents.fridge_analysis_agent import FridgeAnalysisAgent
 from app.agents.recipe_suggestion_agent import RecipeSuggestionAgent
 from app.agents.cooking_optimization_agent import CookingOptimizationAgent
 from app.agents.meal_theme_agent import MealThemeAgent
 from app.agents.image_generation_agent import ImageGenerationAgent
+from app.agents.base_agent import local_fallback
+from app.services.stage_graph import Stage, StageGraph, StageGraphResult, StageCallback, StageFunc
+from app.services.image_jobs import ImageJobManager
+from app.core.config import settings
 from app.core.exceptions import MealPlanningException
+from app.core.tracing import span
+from app.core.metrics import (
+    MEAL_PLANS_IN_FLIGHT, MEAL_PLAN_LATENCY, STAGE_LATENCY, STAGE_DEGRADED, STAGE_FAILURES
+)
 
 logger = structlog.get_logger(__name__)
 
+# Image stage name -> MealItem field on RecipeSuggestionResult
+IMAGE_STAGES = {
+    "image_main_dish": "main_dish",
+    "image_side_dish": "side_dish",
+    "image_soup": "soup",
+    "image_rice": "rice",
+}
+
+# One alternative meal plan is generated per variation hint
+ALTERNATIVE_VARIATIONS = [
+    "Traditional Japanese home cooking (washoku)",
+    "Western or Chinese style dishes",
+    "Light and simple dishes",
+]
+
+DEFAULT_IMAGE_STYLE = {
+    "style": "appetizing",
+    "lighting": "natural",
+    "composition": "professional"
+}
+
 class MealPlanningService:
     """Service that coordinates multiple ADK agents for meal planning"""
     
-    def __init__(self):
-        self.ingredient_agent = IngredientAnalysisAgent()
-        self.nutrition_agent = NutritionBalanceAgent()
-        self.recipe_agent = RecipeSuggestionAgent()
-        self.cooking_agent = CookingOptimizationAgent()
-        self.theme_agent = MealThemeAgent()
-        self.image_agent = ImageGenerationAgent()
+    def __init__(
+        self,
+        ingredient_agent: Optional[IngredientAnalysisAgent] = None,
+        nutrition_agent: Optional[NutritionBalanceAgent] = None,
+        fridge_agent: Optional[FridgeAnalysisAgent] = None,
+        recipe_agent: Optional[RecipeSuggestionAgent] = None,
+        cooking_agent: Optional[CookingOptimizationAgent] = None,
+        theme_agent: Optional[MealThemeAgent] = None,
+        image_agent: Optional[ImageGenerationAgent] = None,
+        image_jobs: Optional[ImageJobManager] = None
+    ):
+        # Agents are normally injected from the application's AgentRegistry
+        self.ingredient_agent = ingredient_agent or IngredientAnalysisAgent()
+        self.nutrition_agent = nutrition_agent or NutritionBalanceAgent()
+        self.fridge_agent = fridge_agent or FridgeAnalysisAgent()
+        self.recipe_agent = recipe_agent or RecipeSuggestionAgent()
+        self.cooking_agent = cooking_agent or CookingOptimizationAgent()
+        self.theme_agent = theme_agent or MealThemeAgent()
+        self.image_agent = image_agent or ImageGenerationAgent()
+        # Without a job manager, images are always generated inline
+        self.image_jobs = image_jobs
     
     async def suggest_meal_plan(self, request: MealPlanningRequest) -> MealPlan:
         """Suggest a meal plan using coordinated ADK agents"""
+        execution = await self.execute_meal_plan(request)
+        return execution.meal_plan
+    
+    async def execute_meal_plan(
+        self,
+        request: MealPlanningRequest,
+        on_stage_complete: Optional[StageCallback] = None,
+        inline_images: Optional[bool] = None,
+        generate_images: bool = True
+    ) -> MealPlanExecution:
+        """Run the agent pipeline and return the meal plan with per-stage timings
+        
+        With inline_images (default: settings.image_generation_mode == "inline")
+        the dish images are part of the pipeline. Otherwise they are submitted
+        as background jobs and their job IDs are returned in image_jobs.
+        Without generate_images no dish images are made at all.
+        """
+        if inline_images is None:
+            inline_images = settings.image_generation_mode == "inline"
+        if not generate_images:
+            image_mode = "none"
+        elif inline_images or self.image_jobs is None:
+            image_mode = "inline"
+        else:
+            image_mode = "background"
+        
+        start_time = time.perf_counter()
+        MEAL_PLANS_IN_FLIGHT.inc()
         try:
             logger.info(
                 "Starting meal planning process",
@@ -42,90 +119,78 @@ class MealPlanningService:
                 product_count=len(request.refrigerator_items)
             )
             
-            # Step 1: Analyze ingredients
-            logger.info("Step 1: Analyzing ingredients")
-            ingredient_analysis_request = IngredientAnalysisRequest(
-                products=request.refrigerator_items,
-                current_date=datetime.now()
-            )
-            ingredient_analysis = await self.ingredient_agent.process(ingredient_analysis_request)
-            
-            # Step 2: Analyze nutrition balance
-            logger.info("Step 2: Analyzing nutrition balance")
-            nutrition_analysis_request = NutritionAnalysisRequest(
-                ingredients=ingredient_analysis.analyzed_ingredients,
-                user_preferences=request.user_preferences
+            execution = await self._run_meal_plan(
+                request,
+                image_mode=image_mode,
+                on_stage_complete=on_stage_complete
             )
-            nutrition_analysis = await self.nutrition_agent.process(nutrition_analysis_request)
+            MEAL_PLAN_LATENCY.labels(outcome="success").observe(time.perf_counter() - start_time)
+            return execution
             
-            # Step 3: Suggest recipes
-            logger.info("Step 3: Suggesting recipes")
-            recipe_suggestion_request = RecipeSuggestionRequest(
-                ingredient_analysis=ingredient_analysis,
-                nutrition_analysis=nutrition_analysis,
-                user_preferences=request.user_preferences
+        except Exception as e:
+            MEAL_PLAN_LATENCY.labels(outcome="error").observe(time.perf_counter() - start_time)
+            logger.error(
+                "Meal planning failed",
+                household_id=request.household_id,
+                error=str(e),
+                exc_info=True
             )
-            recipe_suggestion = await self.recipe_agent.process(recipe_suggestion_request)
-            
-            # Step 4: Optimize cooking
-            logger.info("Step 4: Optimizing cooking process")
-            cooking_optimization_request = CookingOptimizationRequest(
-                recipes=[
-                    recipe_suggestion.main_dish,
-                    recipe_suggestion.side_dish,
-                    recipe_suggestion.soup,
-                    recipe_suggestion.rice
-                ],
-                constraints={
-                    "max_cooking_time": request.user_preferences.max_cooking_time,
-                    "difficulty": request.user_preferences.preferred_difficulty
-                }
+            raise MealPlanningException(
+                f"Failed to generate meal plan: {str(e)}",
+                error_code="MEAL_PLANNING_FAILED",
+                status_code=500
             )
-            cooking_optimization = await self.cooking_agent.process(cooking_optimization_request)
-            
-            # Step 5: Determine meal theme
-            logger.info("Step 5: Determining meal theme")
-            meal_theme_request = MealThemeRequest(
-                recipes=[
-                    recipe_suggestion.main_dish,
-                    recipe_suggestion.side_dish,
-                    recipe_suggestion.soup,
-                    recipe_suggestion.rice
-                ],
-                user_preferences=request.user_preferences,
-                current_date=datetime.now()
+        finally:
+            MEAL_PLANS_IN_FLIGHT.dec()
+    
+    async def _run_meal_plan(
+        self,
+        request: MealPlanningRequest,
+        image_mode: str = "inline",
+        on_stage_complete: Optional[StageCallback] = None,
+        shared_results: Optional[Dict[str, Any]] = None,
+        recipe_variation: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
+    ) -> MealPlanExecution:
+        """Run the stage graph and assemble the meal plan
+        
+        image_mode is "inline", "background" or "none". shared_results holds
+        stage results computed once and reused across several runs. deadline
+        (default: settings.meal_plan_deadline) is the time left for this run.
+        """
+        graph = self._build_stage_graph(
+            request,
+            inline_images=image_mode == "inline",
+            shared_results=shared_results,
+            recipe_variation=recipe_variation
+        )
+        if deadline is None:
+            deadline = settings.meal_plan_deadline
+        run = await graph.run(on_stage_complete=on_stage_complete, deadline=deadline)
+        self._record_stage_metrics(run)
+        
+        recipe_suggestion = run.results["recipe_suggestion"]
+        nutrition_analysis = run.results["nutrition_balance"]
+        cooking_optimization = run.results["cooking_optimization"]
+        
+        image_jobs: Dict[str, str] = {}
+        if image_mode == "background":
+            image_jobs = await self._submit_image_jobs(
+                request.household_id,
+                recipe_suggestion,
+                run.results["meal_theme"]
             )
-            meal_theme = await self.theme_agent.process(meal_theme_request)
-            
-            # Step 6: Generate images (optional, can be done asynchronously)
-            logger.info("Step 6: Generating menu images")
-            try:
-                image_generation_request = ImageGenerationRequest(
-                    recipes=[
-                        recipe_suggestion.main_dish,
-                        recipe_suggestion.side_dish,
-                        recipe_suggestion.soup,
-                        recipe_suggestion.rice
-                    ],
-                    meal_theme=meal_theme,
-                    image_style={
-                        "style": "appetizing",
-                        "lighting": "natural",
-                        "composition": "professional"
-                    }
+        
+        for stage_name in IMAGE_STAGES:
+            if stage_name in run.errors:
+                logger.warning(
+                    "Image generation failed, continuing without image",
+                    stage=stage_name,
+                    error=run.errors[stage_name]
                 )
-                image_generation = await self.image_agent.process(image_generation_request)
-                
-                # Update meal items with generated images
-                recipe_suggestion.main_dish.image_url = image_generation.image_urls[0] if len(image_generation.image_urls) > 0 else None
-                recipe_suggestion.side_dish.image_url = image_generation.image_urls[1] if len(image_generation.image_urls) > 1 else None
-                recipe_suggestion.soup.image_url = image_generation.image_urls[2] if len(image_generation.image_urls) > 2 else None
-                recipe_suggestion.rice.image_url = image_generation.image_urls[3] if len(image_generation.image_urls) > 3 else None
-                
-            except Exception as e:
-                logger.warning(f"Image generation failed, continuing without images: {e}")
-            
-            # Create final meal plan
+        
+        # Create final meal plan
+        with span("pydantic.meal_plan"):
             meal_plan = MealPlan(
                 household_id=request.household_id,
                 date=datetime.now(),
@@ -141,28 +206,233 @@ class MealPlanningService:
                 created_at=datetime.now(),
                 created_by="adk_agent"
             )
-            
-            logger.info(
-                "Meal planning completed successfully",
-                household_id=request.household_id,
-                confidence=meal_plan.confidence,
-                nutrition_score=meal_plan.nutrition_score
-            )
-            
-            return meal_plan
-            
-        except Exception as e:
-            logger.error(
-                "Meal planning failed",
-                household_id=request.household_id,
-                error=str(e),
-                exc_info=True
+        
+        logger.info(
+            "Meal planning completed successfully",
+            household_id=request.household_id,
+            confidence=meal_plan.confidence,
+            nutrition_score=meal_plan.nutrition_score,
+            pipeline_time=round(run.total_time, 4),
+            degraded_stages=run.degraded
+        )
+        
+        return MealPlanExecution(
+            meal_plan=meal_plan,
+            stage_timings=run.timings,
+            image_jobs=image_jobs,
+            degraded_stages=list(run.degraded)
+        )
+    
+    def _record_stage_metrics(self, run: StageGraphResult) -> None:
+        """Export per-stage timings, degradations and failures of a graph run"""
+        for stage_name, elapsed in run.timings.items():
+            STAGE_LATENCY.labels(stage=stage_name).observe(elapsed)
+        for stage_name in run.degraded:
+            STAGE_DEGRADED.labels(stage=stage_name).inc()
+        for stage_name in run.errors:
+            STAGE_FAILURES.labels(stage=stage_name).inc()
+    
+    async def _submit_image_jobs(
+        self,
+        household_id: str,
+        recipe_suggestion: RecipeSuggestionResult,
+        meal_theme: MealThemeResult
+    ) -> Dict[str, str]:
+        """Queue one image job per dish and return dish -> job ID"""
+        image_jobs = {}
+        for dish_field in IMAGE_STAGES.values():
+            job = await self.image_jobs.submit(
+                household_id,
+                dish_field,
+                ImageGenerationRequest(
+                    recipes=[getattr(recipe_suggestion, dish_field)],
+                    meal_theme=meal_theme,
+                    image_style=DEFAULT_IMAGE_STYLE
+                )
             )
-            raise MealPlanningException(
-                f"Failed to generate meal plan: {str(e)}",
-                error_code="MEAL_PLANNING_FAILED",
-                status_code=500
+            image_jobs[dish_field] = job.job_id
+        return image_jobs
+    
+    async def _analyze_ingredients(self, request: MealPlanningRequest) -> IngredientAnalysisResult:
+        """Analyze the refrigerator contents"""
+        return await self.ingredient_agent.process(IngredientAnalysisRequest(
+            products=request.refrigerator_items,
+            current_date=datetime.now()
+        ))
+    
+    async def _analyze_nutrition(
+        self,
+        request: MealPlanningRequest,
+        ingredient_analysis: IngredientAnalysisResult
+    ) -> NutritionAnalysisResult:
+        """Analyze the nutrition balance of the analyzed ingredients"""
+        return await self.nutrition_agent.process(NutritionAnalysisRequest(
+            ingredients=ingredient_analysis.analyzed_ingredients,
+            user_preferences=request.user_preferences
+        ))
+    
+    async def _analyze_fridge(self, request: MealPlanningRequest) -> FridgeAnalysisResult:
+        """Analyze the refrigerator contents and nutrition balance in one call"""
+        return await self.fridge_agent.process(FridgeAnalysisRequest(
+            products=request.refrigerator_items,
+            user_preferences=request.user_preferences,
+            current_date=datetime.now()
+        ))
+    
+    def _build_stage_graph(
+        self,
+        request: MealPlanningRequest,
+        inline_images: bool = True,
+        shared_results: Optional[Dict[str, Any]] = None,
+        recipe_variation: Optional[Dict[str, Any]] = None,
+        analysis_only: bool = False
+    ) -> StageGraph:
+        """Build the agent dependency graph for a meal planning request
+        
+        Cooking optimization and the meal theme only need the recipe
+        suggestion, and each dish image only needs its own dish and the
+        theme, so those stages run concurrently. Stages found in
+        shared_results are not run again; their stored result is reused.
+        
+        Every agent stage has a time budget; when it runs out the stage is
+        re-run with the agent's local fallback instead of Gemini.
+        
+        With settings.fused_analysis, ingredient and nutrition analysis come
+        from a single fridge_analysis call and are split back into their
+        usual stages, so later stages are unaffected.
+        
+        With analysis_only, the graph stops after ingredient and nutrition
+        analysis, whose results can then be shared by several runs.
+        """
+        shared_results = shared_results or {}
+        
+        def locally(func: StageFunc) -> StageFunc:
+            async def run(inputs: Dict[str, Any]) -> Any:
+                with local_fallback():
+                    return await func(inputs)
+            return run
+        
+        async def analyze_ingredients(inputs: Dict[str, Any]) -> IngredientAnalysisResult:
+            return await self._analyze_ingredients(request)
+        
+        async def analyze_nutrition(inputs: Dict[str, Any]) -> NutritionAnalysisResult:
+            return await self._analyze_nutrition(request, inputs["ingredient_analysis"])
+        
+        async def analyze_fridge(inputs: Dict[str, Any]) -> FridgeAnalysisResult:
+            return await self._analyze_fridge(request)
+        
+        async def split_ingredient_analysis(inputs: Dict[str, Any]) -> IngredientAnalysisResult:
+            return inputs["fridge_analysis"].ingredient_analysis
+        
+        async def split_nutrition_analysis(inputs: Dict[str, Any]) -> NutritionAnalysisResult:
+            return inputs["fridge_analysis"].nutrition_analysis
+        
+        async def suggest_recipes(inputs: Dict[str, Any]) -> RecipeSuggestionResult:
+            return await self.recipe_agent.process(RecipeSuggestionRequest(
+                ingredient_analysis=inputs["ingredient_analysis"],
+                nutrition_analysis=inputs["nutrition_balance"],
+                user_preferences=request.user_preferences,
+                **(recipe_variation or {})
+            ))
+        
+        async def optimize_cooking(inputs: Dict[str, Any]) -> CookingOptimizationResult:
+            return await self.cooking_agent.process(CookingOptimizationRequest(
+                recipes=self._meal_items(inputs["recipe_suggestion"]),
+                constraints={
+                    "max_cooking_time": request.user_preferences.max_cooking_time,
+                    "difficulty": request.user_preferences.preferred_difficulty
+                }
+            ))
+        
+        async def determine_theme(inputs: Dict[str, Any]) -> MealThemeResult:
+            return await self.theme_agent.process(MealThemeRequest(
+                recipes=self._meal_items(inputs["recipe_suggestion"]),
+                user_preferences=request.user_preferences,
+                current_date=datetime.now()
+            ))
+        
+        def generate_image(dish_field: str):
+            async def run(inputs: Dict[str, Any]) -> Optional[str]:
+                meal_item = getattr(inputs["recipe_suggestion"], dish_field)
+                image_generation = await self.image_agent.process(ImageGenerationRequest(
+                    recipes=[meal_item],
+                    meal_theme=inputs["meal_theme"],
+                    image_style=DEFAULT_IMAGE_STYLE
+                ))
+                meal_item.image_url = image_generation.image_urls[0] if image_generation.image_urls else None
+                return meal_item.image_url
+            return run
+        
+        def agent_stage(
+            name: str,
+            func: StageFunc,
+            timeout: float,
+            depends_on: Sequence[str] = (),
+            optional: bool = False
+        ) -> Stage:
+            if name in shared_results:
+                # Already computed: no budget, so an exhausted deadline
+                # cannot replace the shared result with a fallback
+                async def reuse(inputs: Dict[str, Any]) -> Any:
+                    return shared_results[name]
+                return Stage(name, reuse, depends_on=depends_on, optional=optional)
+            return Stage(
+                name,
+                func,
+                depends_on=depends_on,
+                optional=optional,
+                timeout=timeout,
+                fallback=locally(func)
             )
+        
+        if settings.fused_analysis and not shared_results:
+            stages = [
+                agent_stage("fridge_analysis", analyze_fridge, settings.fridge_analysis_timeout),
+                Stage("ingredient_analysis", split_ingredient_analysis, depends_on=["fridge_analysis"]),
+                Stage("nutrition_balance", split_nutrition_analysis, depends_on=["fridge_analysis"]),
+            ]
+        else:
+            stages = [
+                agent_stage("ingredient_analysis", analyze_ingredients, settings.ingredient_analysis_timeout),
+                agent_stage("nutrition_balance", analyze_nutrition, settings.nutrition_balance_timeout,
+                            depends_on=["ingredient_analysis"]),
+            ]
+        
+        if analysis_only:
+            return StageGraph(stages)
+        
+        stages += [
+            agent_stage("recipe_suggestion", suggest_recipes, settings.recipe_suggestion_timeout,
+                        depends_on=["ingredient_analysis", "nutrition_balance"]),
+            agent_stage("cooking_optimization", optimize_cooking, settings.cooking_optimization_timeout,
+                        depends_on=["recipe_suggestion"]),
+            agent_stage("meal_theme", determine_theme, settings.meal_theme_timeout,
+                        depends_on=["recipe_suggestion"]),
+        ]
+        
+        if not inline_images:
+            return StageGraph(stages)
+        
+        # Images are optional: a failed image must not fail the meal plan
+        for stage_name, dish_field in IMAGE_STAGES.items():
+            stages.append(agent_stage(
+                stage_name,
+                generate_image(dish_field),
+                settings.image_generation_timeout,
+                depends_on=["recipe_suggestion", "meal_theme"],
+                optional=True
+            ))
+        
+        return StageGraph(stages)
+    
+    def _meal_items(self, recipe_suggestion: Union[RecipeSuggestionResult, MealPlan]) -> List[MealItem]:
+        """Get the four dishes of a recipe suggestion or meal plan in menu order"""
+        return [
+            recipe_suggestion.main_dish,
+            recipe_suggestion.side_dish,
+            recipe_suggestion.soup,
+            recipe_suggestion.rice
+        ]
     
     async def suggest_alternatives(
         self, 
@@ -183,18 +453,38 @@ class MealPlanningService:
                 request.user_preferences, 
                 reason
             )
+            alternative_request = request.model_copy(update={"user_preferences": modified_preferences})
+            
+            # The fridge and preferences are the same for every alternative,
+            # so analyze them once and only fan out the recipe-dependent stages.
+            # The analysis has the usual stage budgets and fallbacks, and the
+            # alternatives only get what is left of the deadline.
+            start_time = time.perf_counter()
+            analysis = await self._build_stage_graph(alternative_request, analysis_only=True).run(
+                deadline=settings.meal_plan_deadline
+            )
+            self._record_stage_metrics(analysis)
+            shared_results = {
+                "ingredient_analysis": analysis.results["ingredient_analysis"],
+                "nutrition_balance": analysis.results["nutrition_balance"]
+            }
+            remaining = settings.meal_plan_deadline - (time.perf_counter() - start_time)
+            
+            # Background image job IDs cannot be returned with the alternatives
+            image_mode = "inline" if settings.image_generation_mode == "inline" else "none"
+            avoid_dishes = [item.name for item in self._meal_items(original_meal_plan)]
             
-            # Generate alternatives with modified preferences
-            alternatives = []
-            for i in range(3):  # Generate 3 alternatives
-                alternative_request = MealPlanningRequest(
-                    refrigerator_items=request.refrigerator_items,
-                    household_id=request.household_id,
-                    user_preferences=modified_preferences
+            executions = await asyncio.gather(*[
+                self._run_meal_plan(
+                    alternative_request,
+                    image_mode=image_mode,
+                    shared_results=shared_results,
+                    recipe_variation={"avoid_dishes": avoid_dishes, "variation_hint": hint},
+                    deadline=remaining
                 )
-                
-                alternative_meal_plan = await self.suggest_meal_plan(alternative_request)
-                alternatives.append(alternative_meal_plan)
+                for hint in ALTERNATIVE_VARIATIONS
+            ])
+            alternatives = [execution.meal_plan for execution in executions]
             
             logger.info(
                 "Alternative meal plans generated",
@@ -223,6 +513,18 @@ class MealPlanningService:
         available_products: List[Product]
     ) -> List[ShoppingItem]:
         """Generate shopping list for missing ingredients"""
+        with span("shopping_list", available_products=len(available_products)) as list_span:
+            shopping_items = self._build_shopping_list(meal_plan, available_products)
+            if list_span is not None:
+                list_span.set_attribute("items", len(shopping_items))
+            return shopping_items
+    
+    def _build_shopping_list(
+        self,
+        meal_plan: MealPlan,
+        available_products: List[Product]
+    ) -> List[ShoppingItem]:
+        """Collect the meal plan's ingredients missing from the refrigerator"""
         try:
             shopping_items = []
             available_product_names = {product.name.lower() for product in available_products}
@@ -279,7 +581,7 @@ class MealPlanningService:
         # In a real system, you might use NLP to parse the reason
         # and make more sophisticated modifications
         
-        modified_preferences = preferences.copy()
+        modified_preferences = preferences.model_copy(deep=True)
         
         if "辛い" in reason or "辛すぎ" in reason:
             modified_preferences.dietary_restrictions.append("spicy_food")
@@ -0,0 +1,222 @@
+"""
+Dependency-graph executor for multi-agent pipelines
+Starts every stage as soon as the stages it depends on have finished
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+import structlog
+
+from app.core.tracing import span
+
+logger = structlog.get_logger(__name__)
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+StageCallback = Callable[[str, Any], Awaitable[None]]
+
+# perf_counter time at which the running stage's budget runs out
+_stage_deadline: ContextVar[Optional[float]] = ContextVar("stage_deadline", default=None)
+
+def stage_time_left() -> Optional[float]:
+    """Seconds left in the budget of the stage running in this context, if it has one"""
+    deadline_at = _stage_deadline.get()
+    if deadline_at is None:
+        return None
+    return deadline_at - time.perf_counter()
+
+class Stage:
+    """A named unit of work and the stages whose results it consumes"""
+
+    def __init__(
+        self,
+        name: str,
+        func: StageFunc,
+        depends_on: Sequence[str] = (),
+        optional: bool = False,
+        timeout: Optional[float] = None,
+        fallback: Optional[StageFunc] = None
+    ):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        # Optional stages record their error and yield None instead of
+        # failing the whole graph. Required stages must not depend on them.
+        self.optional = optional
+        # A stage that runs past its timeout (or the graph deadline) is
+        # cancelled and, if it has one, replaced by its fallback's result.
+        # Stages without a timeout are local steps the deadline does not cut off.
+        self.timeout = timeout
+        self.fallback = fallback
+
+class StageGraphResult:
+    """Results, per-stage wall times, errors and degraded stages of a graph run"""
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        # Stage name -> why its fallback result was used
+        self.degraded: Dict[str, str] = {}
+        self.total_time: float = 0.0
+
+class StageGraph:
+    """Runs a set of stages concurrently, respecting their dependencies"""
+
+    def __init__(self, stages: Iterable[Stage]):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+
+        self._order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Validate dependencies and return the stages in dependency order"""
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: List[str]) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle in stage graph: {' -> '.join(path + [name])}")
+
+            state[name] = "visiting"
+            stage = self.stages[name]
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+                if self.stages[dependency].optional and not stage.optional:
+                    raise ValueError(f"Required stage '{name}' depends on optional stage '{dependency}'")
+                visit(dependency, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+
+        return order
+
+    async def run(
+        self,
+        on_stage_complete: Optional[StageCallback] = None,
+        deadline: Optional[float] = None
+    ) -> StageGraphResult:
+        """Run all stages and return their results and timings
+
+        deadline is the time budget in seconds for the whole run. No stage
+        with a timeout may run past it, whatever the timeout.
+        """
+        result = StageGraphResult()
+        tasks: Dict[str, asyncio.Task] = {}
+        start_time = time.perf_counter()
+        deadline_at = start_time + deadline if deadline is not None else None
+
+        # Dependencies come first in _order, so every task can look up the
+        # tasks it waits for when it is created.
+        for name in self._order:
+            tasks[name] = asyncio.create_task(
+                self._run_stage(self.stages[name], tasks, result, on_stage_complete, deadline_at),
+                name=f"stage:{name}"
+            )
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        result.total_time = time.perf_counter() - start_time
+
+        logger.info(
+            "Stage graph completed",
+            total_time=round(result.total_time, 4),
+            stage_timings={name: round(elapsed, 4) for name, elapsed in result.timings.items()},
+            failed_stages=list(result.errors),
+            degraded_stages=result.degraded
+        )
+
+        return result
+
+    async def _run_stage(
+        self,
+        stage: Stage,
+        tasks: Dict[str, asyncio.Task],
+        result: StageGraphResult,
+        on_stage_complete: Optional[StageCallback],
+        deadline_at: Optional[float] = None
+    ) -> Any:
+        """Wait for the stage's dependencies, then run it"""
+        if stage.depends_on:
+            await asyncio.gather(*(tasks[dependency] for dependency in stage.depends_on))
+
+        failed_dependencies = [d for d in stage.depends_on if d in result.errors]
+        inputs = {dependency: result.results[dependency] for dependency in stage.depends_on}
+
+        start_time = time.perf_counter()
+        value = None
+
+        with span(f"stage.{stage.name}", stage=stage.name) as stage_span:
+            if failed_dependencies:
+                result.errors[stage.name] = f"Skipped: dependency failed ({', '.join(failed_dependencies)})"
+            else:
+                try:
+                    value = await self._run_with_budget(stage, inputs, result, deadline_at)
+                except Exception as e:
+                    if not stage.optional:
+                        raise
+                    logger.warning("Optional stage failed", stage=stage.name, error=str(e))
+                    result.errors[stage.name] = str(e)
+
+            if stage_span is not None:
+                if stage.name in result.errors:
+                    stage_span.set_attribute("failed", result.errors[stage.name])
+                if stage.name in result.degraded:
+                    stage_span.set_attribute("degraded", result.degraded[stage.name])
+
+        result.timings[stage.name] = time.perf_counter() - start_time
+        result.results[stage.name] = value
+
+        if on_stage_complete and stage.name not in result.errors:
+            await on_stage_complete(stage.name, value)
+
+        return value
+
+    async def _run_with_budget(
+        self,
+        stage: Stage,
+        inputs: Dict[str, Any],
+        result: StageGraphResult,
+        deadline_at: Optional[float]
+    ) -> Any:
+        """Run the stage within its time budget, falling back when it runs out"""
+        budget = stage.timeout
+        if budget is not None and deadline_at is not None:
+            remaining = deadline_at - time.perf_counter()
+            budget = min(budget, remaining)
+
+        if budget is None:
+            return await stage.func(inputs)
+
+        if budget > 0:
+            token = _stage_deadline.set(time.perf_counter() + budget)
+            try:
+                return await asyncio.wait_for(stage.func(inputs), timeout=budget)
+            except asyncio.TimeoutError:
+                reason = f"timed out after {budget:.2f}s"
+            finally:
+                _stage_deadline.reset(token)
+        else:
+            reason = "deadline exceeded before start"
+
+        if stage.fallback is None:
+            raise asyncio.TimeoutError(f"Stage '{stage.name}' {reason}")
+
+        logger.warning("Stage over budget, using fallback", stage=stage.name, reason=reason)
+        result.degraded[stage.name] = reason
+        return await stage.fallback(inputs)
@@ -0,0 +1,25 @@
+"""
+Celery application for ADK background jobs
+
+Run a worker with:
+    celery -A app.tasks.celery_app worker --loglevel=info
+"""
+
+from celery import Celery
+
+from app.core.config import settings
+
+celery_app = Celery(
+    "adk_meal_planning",
+    broker=settings.celery_broker_url or settings.redis_url,
+    backend=settings.celery_result_backend or settings.redis_url,
+    include=["app.tasks.image_tasks"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_track_started=True,
+    result_expires=settings.cache_ttl
+)
@@ -0,0 +1,41 @@
+"""
+Celery tasks for menu image generation
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+import structlog
+
+from app.agents.image_generation_agent import ImageGenerationAgent
+from app.models.schemas import ImageGenerationRequest
+from app.tasks.celery_app import celery_app
+
+logger = structlog.get_logger(__name__)
+
+# One agent and one event loop per worker process, so the shared Gemini
+# client is always used from the loop it was created on
+_image_agent: Optional[ImageGenerationAgent] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_runtime():
+    """Get the worker's image agent and event loop"""
+    global _image_agent, _loop
+    if _image_agent is None:
+        _image_agent = ImageGenerationAgent()
+        _loop = asyncio.new_event_loop()
+    return _image_agent, _loop
+
+@celery_app.task(name="image_generation.generate_menu_image")
+def generate_menu_image(household_id: str, dish: str, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate the image for one dish"""
+    agent, loop = _get_runtime()
+    request = ImageGenerationRequest.model_validate(request_data)
+
+    result = loop.run_until_complete(agent.process(request))
+
+    logger.info("Celery image job completed", household_id=household_id, dish=dish)
+    return {
+        "household_id": household_id,
+        "dish": dish,
+        "image_url": result.image_urls[0] if result.image_urls else None
+    }
@@ -3,19 +3,29 @@ ADK-based Meal Planning API Server
 FastAPI implementation with Google ADK agents
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
+import asyncio
 import os
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 import structlog
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from app.core.config import Settings
+from app.core.config import settings
 from app.core.logging import setup_logging
 from app.api.v1.router import api_router
+from app.api.v1.dependencies import ProfileSavingMiddleware
 from app.core.exceptions import MealPlanningException
+from app.core.model_client import gemini_client
+from app.core.cache import response_cache
+from app.core.recipe_cache import recipe_cache
+from app.core.tracing import TracingMiddleware, close_exporter
+from app.core.startup import log_import_report, log_startup_diagnostics
+from app.core.loop_watchdog import LoopWatchdog
+from app.services.agent_registry import AgentRegistry
 
 # Load environment variables
 load_dotenv()
@@ -29,9 +39,36 @@ async def lifespan(app: FastAPI):
     """Application lifespan management"""
     # Startup
     logger.info("Starting ADK Meal Planning API Server")
+    watchdog = None
+    if settings.loop_watchdog_enabled:
+        watchdog = LoopWatchdog(
+            "api",
+            interval=settings.loop_watchdog_interval,
+            threshold=settings.loop_watchdog_threshold
+        )
+        watchdog.start()
+    app.state.agents = AgentRegistry()
+    await app.state.agents.start()
+    # Agents and the Gemini SDK load after startup, while requests are served
+    background = []
+    if settings.startup_warmup:
+        background.append(asyncio.create_task(app.state.agents.warm_up()))
+    if settings.startup_import_report:
+        background.append(asyncio.create_task(asyncio.to_thread(log_import_report)))
+    log_startup_diagnostics()
     yield
     # Shutdown
     logger.info("Shutting down ADK Meal Planning API Server")
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    if watchdog is not None:
+        await watchdog.stop()
+    await app.state.agents.stop()
+    gemini_client.close()
+    await response_cache.close()
+    await recipe_cache.close()
+    await asyncio.to_thread(close_exporter)
 
 def create_app() -> FastAPI:
     """Create and configure FastAPI application"""
@@ -54,6 +91,12 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Save profiles of profiled requests before their responses complete
+    app.add_middleware(ProfileSavingMiddleware)
+    
+    # Trace each request, continuing the caller's W3C trace context
+    app.add_middleware(TracingMiddleware)
+    
     # Include API router
     app.include_router(api_router, prefix="/api/v1")
     
@@ -62,6 +105,11 @@ def create_app() -> FastAPI:
         """Health check endpoint"""
         return {"status": "healthy", "service": "adk-meal-planning-api"}
     
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics endpoint"""
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    
     @app.exception_handler(MealPlanningException)
     async def meal_planning_exception_handler(request, exc: MealPlanningException):
         """Handle meal planning specific exceptions"""
@@ -94,7 +142,6 @@ def create_app() -> FastAPI:
 app = create_app()
 
 if __name__ == "__main__":
-    settings = Settings()
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
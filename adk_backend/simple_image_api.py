@@ -6,7 +6,7 @@
 
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import Optional
 import os
@@ -14,18 +14,18 @@ import uvicorn
 import structlog
 import time
 import asyncio
-import os
-import base64
-import requests
-import json
 import mimetypes
 import uuid
-from google.cloud import aiplatform
-from google.oauth2 import service_account
-from google.auth import default
-from google.auth.transport.requests import Request
-from google import genai
-from google.genai import types
+from contextlib import asynccontextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, GCCollector, PlatformCollector, ProcessCollector, generate_latest
+)
+
+from app.core.config import settings
+from app.core.loop_watchdog import LoopWatchdog
+from app.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+# google.genai is imported on first use in generate_actual_image, so the
+# server starts (and the fallback path runs) without loading the SDK
 
 # ログ設定
 structlog.configure(
@@ -48,7 +48,31 @@ structlog.configure(
 
 logger = structlog.get_logger(__name__)
 
-app = FastAPI(title="Simple Image Generation API", version="1.0.0")
+# /metrics で公開するのはこのサーバーのメトリクスだけ（app.core.metrics には
+# API サーバーの全メトリクスも定義されており、既定のレジストリでは空の系列が出力される）
+metrics_registry = CollectorRegistry()
+metrics_registry.register(EVENT_LOOP_LAG)
+metrics_registry.register(EVENT_LOOP_STALLS)
+ProcessCollector(registry=metrics_registry)
+PlatformCollector(registry=metrics_registry)
+GCCollector(registry=metrics_registry)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """イベントループ監視（LOOP_WATCHDOG_ENABLED=true のとき）の開始と停止"""
+    watchdog = None
+    if settings.loop_watchdog_enabled:
+        watchdog = LoopWatchdog(
+            "image_api",
+            interval=settings.loop_watchdog_interval,
+            threshold=settings.loop_watchdog_threshold
+        )
+        watchdog.start()
+    yield
+    if watchdog is not None:
+        await watchdog.stop()
+
+app = FastAPI(title="Simple Image Generation API", version="1.0.0", lifespan=lifespan)
 
 # 静的ファイル配信の設定
 import tempfile
@@ -114,6 +138,9 @@ Style: natural home cooking photography
         
         # Gemini 2.5 Flash Image Previewの呼び出し
         try:
+            from google import genai
+            from google.genai import types
+            
             client = genai.Client(api_key=api_key)
             model = "gemini-2.5-flash-image-preview"
             
@@ -282,6 +309,11 @@ async def health_check():
     """ヘルスチェック"""
     return {"status": "healthy", "service": "simple-image-api"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus メトリクス（イベントループの遅延など）"""
+    return Response(generate_latest(metrics_registry), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/generate-image", response_model=SimpleImageResponse)
 async def generate_image(request: SimpleImageRequest):
     """シンプルな画像生成"""
@@ -0,0 +1,34 @@
+"""
+pytest configuration: make the app package importable from tests/
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def scripted_gemini(monkeypatch):
+    """Make Gemini return the given texts in order, with an empty local-only response cache
+
+    script(responses) returns the list of models called, filled in as calls are made.
+    """
+    import app.agents.base_agent as base_agent
+    from app.core.cache import ResponseCache
+
+    def script(responses):
+        calls = []
+
+        async def generate_content(prompt, model, temperature, max_tokens, request_options=None, generation_config=None,
+                                   on_call_time=None):
+            calls.append(model)
+            return SimpleNamespace(text=responses[len(calls) - 1])
+
+        monkeypatch.setattr(base_agent.gemini_client, "generate_content", generate_content)
+        monkeypatch.setattr(base_agent, "response_cache", ResponseCache(redis_url=None))
+        return calls
+
+    return script
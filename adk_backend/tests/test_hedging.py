@@ -0,0 +1,116 @@
+"""
+Hedged Gemini calls and the latencies that trigger them
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from app.core.hedging import LatencyTracker, hedged
+from app.core.model_client import GeminiClient
+
+class Calls:
+    """make_call whose n-th call takes durations[n] seconds (None fails)"""
+
+    def __init__(self, *durations):
+        self.durations = durations
+        self.started = 0
+        self.cancelled = []
+
+    async def __call__(self):
+        index = self.started
+        self.started += 1
+        duration = self.durations[index]
+        try:
+            await asyncio.sleep(duration or 0.01)
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        if duration is None:
+            raise RuntimeError(f"call {index} failed")
+        return index
+
+def run_hedged(calls: Calls, delay, can_hedge=None):
+    outcomes = []
+
+    async def run():
+        result = await hedged(calls, delay, outcomes.append, can_hedge=can_hedge)
+        # Let cancelled calls finish unwinding
+        await asyncio.sleep(0)
+        return result
+
+    return asyncio.run(run()), outcomes
+
+def test_fast_call_is_not_hedged():
+    calls = Calls(0.01, 0.01)
+    assert run_hedged(calls, delay=0.2) == (0, [])
+    assert calls.started == 1
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    calls = Calls(1.0, 0.01)
+    assert run_hedged(calls, delay=0.05) == (1, ["hedge"])
+    assert calls.cancelled == [0]
+
+def test_primary_can_still_win_after_the_hedge_fired():
+    calls = Calls(0.1, 1.0)
+    assert run_hedged(calls, delay=0.05) == (0, ["primary"])
+    assert calls.cancelled == [1]
+
+def test_failed_primary_is_covered_by_the_hedge():
+    calls = Calls(None, 0.01)
+    assert run_hedged(calls, delay=0.005) == (1, ["hedge"])
+
+def test_no_hedge_without_capacity():
+    calls = Calls(0.1, 0.01)
+    assert run_hedged(calls, delay=0.02, can_hedge=lambda: False) == (0, ["skipped"])
+    assert calls.started == 1
+
+def test_latency_tracker_percentile_needs_enough_samples():
+    tracker = LatencyTracker(window=10, min_samples=3)
+    tracker.record(1.0)
+    tracker.record(3.0)
+    assert tracker.percentile(0.5) is None
+    tracker.record(2.0)
+    assert tracker.percentile(0.5) == 2.0
+    assert tracker.percentile(1.0) == 3.0
+
+class SleepingClient(GeminiClient):
+    """Client whose model calls take a fixed time, with one call slot"""
+
+    def __init__(self, seconds: float):
+        super().__init__(api_key="test-key", max_concurrency=1)
+        self.seconds = seconds
+
+    def get_model(self, model, temperature, max_tokens):
+        return self._models.setdefault((model, temperature, max_tokens), SimpleNamespace())
+
+    async def _call_model(self, generative_model, prompt, generation_config, request_options):
+        await asyncio.sleep(self.seconds)
+        return prompt
+
+def test_recorded_call_time_excludes_rate_limiter_queueing():
+    client = SleepingClient(0.1)
+    recorded = []
+
+    async def run():
+        # The second call waits for the first one's slot
+        await asyncio.gather(*(
+            client.generate_content(str(index), "test-model", 0.5, 100, on_call_time=recorded.append)
+            for index in range(2)
+        ))
+
+    asyncio.run(run())
+    assert len(recorded) == 2
+    assert all(0.1 <= seconds < 0.15 for seconds in recorded)
+
+def test_no_capacity_while_every_slot_is_taken():
+    client = SleepingClient(0.1)
+
+    async def run():
+        assert client.has_capacity("test-model")
+        call = asyncio.create_task(client.generate_content("x", "test-model", 0.5, 100))
+        await asyncio.sleep(0.02)
+        busy = client.has_capacity("test-model")
+        await call
+        return busy, client.has_capacity("test-model")
+
+    assert asyncio.run(run()) == (False, True)
@@ -0,0 +1,74 @@
+"""
+Background image job status lookups
+"""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+
+from app.models.schemas import ImageGenerationRequest, ImageJob, ImageJobStatus
+from app.services.image_jobs import ImageJobManager
+
+class FakeRedis:
+    """The get/set subset of redis.asyncio.Redis the job registry uses"""
+
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.expiry[key] = ex
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def aclose(self):
+        pass
+
+def celery_manager(monkeypatch) -> ImageJobManager:
+    manager = ImageJobManager(image_agent=None, backend="celery", job_ttl=600)
+    manager._redis = FakeRedis()
+    # Celery itself is not needed: every known job reports as started
+    monkeypatch.setattr(
+        manager, "_get_celery_job",
+        lambda job: job.model_copy(update={"status": ImageJobStatus.RUNNING})
+    )
+    return manager
+
+def test_celery_backend_does_not_report_unknown_jobs_as_pending(monkeypatch):
+    manager = celery_manager(monkeypatch)
+    assert asyncio.run(manager.get("0" * 32)) is None
+
+def test_celery_backend_finds_jobs_submitted_by_any_instance(monkeypatch):
+    queued = []
+    fake_tasks = SimpleNamespace(generate_menu_image=SimpleNamespace(
+        apply_async=lambda args, task_id: queued.append(task_id)
+    ))
+    monkeypatch.setitem(sys.modules, "app.tasks.image_tasks", fake_tasks)
+
+    submitting = celery_manager(monkeypatch)
+    polling = celery_manager(monkeypatch)
+    polling._redis = submitting._redis
+
+    async def run():
+        job = await submitting.submit("h1", "main_dish", ImageGenerationRequest.model_construct())
+        return job, await polling.get(job.job_id)
+
+    job, found = asyncio.run(run())
+    assert queued == [job.job_id]
+    assert submitting._redis.expiry[submitting.key_prefix + job.job_id] == 600
+    assert (found.household_id, found.dish, found.status) == ("h1", "main_dish", ImageJobStatus.RUNNING)
+
+def test_local_backend_does_not_know_other_ids():
+    async def run():
+        manager = ImageJobManager(image_agent=None, max_queued=1)
+        job = await manager.submit("h1", "main_dish", ImageGenerationRequest.model_construct())
+        found = await manager.get(job.job_id)
+        unknown = await manager.get("0" * 32)
+        await manager.stop()
+        return job, found, unknown
+
+    job, found, unknown = asyncio.run(run())
+    assert found is not None and found.job_id == job.job_id
+    assert unknown is None
@@ -0,0 +1,112 @@
+"""
+Streaming and batch meal planning endpoints, run against the mock agents
+"""
+
+import json
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.exceptions import MealPlanningException
+from app.core.model_client import gemini_client
+from main import create_app
+
+DISHES = ["main_dish", "side_dish", "soup", "rice"]
+
+def meal_planning_request(household_id: str = "h1") -> Dict[str, Any]:
+    return {
+        "household_id": household_id,
+        "user_preferences": {},
+        "refrigerator_items": [
+            {"id": "p1", "name": "玉ねぎ", "category": "vegetables", "quantity": 2, "unit": "個",
+             "expiry_date": "2024-01-15T00:00:00Z", "days_until_expiry": 1},
+            {"id": "p2", "name": "豚肉", "category": "meat", "quantity": 200, "unit": "g",
+             "expiry_date": "2024-01-15T00:00:00Z", "days_until_expiry": 3},
+        ],
+    }
+
+def ndjson(text: str) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in text.splitlines()]
+
+@pytest.fixture
+def client(monkeypatch):
+    # Agents fall back to their mocks without an API key
+    monkeypatch.setattr(gemini_client, "api_key", None)
+    with TestClient(create_app()) as client:
+        yield client
+
+def test_stream_sends_stages_in_dependency_order_and_the_meal_plan_last(client):
+    response = client.post("/api/v1/meal-planning/suggest/stream", json=meal_planning_request())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = ndjson(response.text)
+    names = [event["event"] for event in events]
+    position = {name: names.index(name) for name in names}
+    dishes = [event["dish"] for event in events if event["event"] == "meal_item"]
+    first_dish = names.index("meal_item")
+    last_dish = len(names) - 1 - names[::-1].index("meal_item")
+
+    assert sorted(dishes) == sorted(DISHES)
+    assert max(position["ingredient_analysis"], position["nutrition_balance"]) < first_dish
+    assert last_dish < min(position["cooking_optimization"], position["meal_theme"], position["image"])
+    assert sorted(event["dish"] for event in events if event["event"] == "image") == sorted(DISHES)
+    assert names.count("meal_plan") == 1 and names[-1] == "meal_plan"
+    assert events[-1]["data"]["meal_plan"]["main_dish"]["name"]
+
+def test_stream_ends_with_an_error_event_when_the_pipeline_fails(client, monkeypatch):
+    service = client.app.state.agents.meal_planning_service
+
+    async def fail(request, **kwargs):
+        raise MealPlanningException("no ingredients", error_code="INGREDIENT_ERROR")
+
+    monkeypatch.setattr(service, "execute_meal_plan", fail)
+    events = ndjson(client.post("/api/v1/meal-planning/suggest/stream", json=meal_planning_request()).text)
+    assert events == [{"event": "error", "error": "INGREDIENT_ERROR", "message": "no ingredients"}]
+
+def test_batch_isolates_failed_items_and_ends_with_a_summary(client, monkeypatch):
+    service = client.app.state.agents.meal_planning_service
+    execute = service.execute_meal_plan
+
+    async def fail_one(request, **kwargs):
+        if request.household_id == "broken":
+            raise RuntimeError("boom")
+        return await execute(request, **kwargs)
+
+    monkeypatch.setattr(service, "execute_meal_plan", fail_one)
+    households = ["h0", "broken", "h2"]
+    response = client.post(
+        "/api/v1/meal-planning/suggest-batch",
+        json={"requests": [meal_planning_request(household) for household in households], "max_concurrency": 2}
+    )
+    assert response.status_code == 200
+
+    events = ndjson(response.text)
+    results = {event["index"]: event for event in events[:-1]}
+    assert sorted(results) == [0, 1, 2]
+    assert results[1] == {
+        "event": "error",
+        "index": 1,
+        "household_id": "broken",
+        "error": "INTERNAL_SERVER_ERROR",
+        "message": "Internal server error",
+    }
+    for index in (0, 2):
+        assert results[index]["event"] == "result"
+        assert results[index]["household_id"] == households[index]
+        # Images are opt-in for batches
+        assert results[index]["data"]["image_jobs"] == {}
+
+    summary = events[-1]
+    assert summary["event"] == "summary"
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (3, 2, 1)
+
+def test_batch_over_the_size_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "batch_max_items", 2)
+    response = client.post(
+        "/api/v1/meal-planning/suggest-batch",
+        json={"requests": [meal_planning_request(f"h{index}") for index in range(3)]}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,34 @@
+"""
+Model resolution in the shared Gemini client
+"""
+
+import asyncio
+import threading
+
+from app.core.model_client import GeminiClient
+
+class StubModel:
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None):
+        return prompt
+
+class RecordingClient(GeminiClient):
+    """Client whose models are stubs, recording the thread that created them"""
+
+    def __init__(self):
+        super().__init__(api_key="test-key")
+        self.created_on = []
+
+    def get_model(self, model, temperature, max_tokens):
+        self.created_on.append(threading.get_ident())
+        return self._models.setdefault((model, temperature, max_tokens), StubModel())
+
+def test_first_call_creates_the_model_off_the_event_loop():
+    async def run():
+        client = RecordingClient()
+        for _ in range(2):
+            assert await client.generate_content("hello", "test-model", 0.5, 100) == "hello"
+        return client.created_on
+
+    created_on = asyncio.run(run())
+    assert len(created_on) == 1
+    assert created_on[0] != threading.get_ident()
@@ -0,0 +1,76 @@
+"""
+Fast-model routing and escalation to the main model
+"""
+
+import asyncio
+
+from pydantic import BaseModel
+
+from app.agents.base_agent import BaseAgent
+from app.core.config import settings
+from app.services.stage_graph import Stage, StageGraph
+
+class Answer(BaseModel):
+    value: int
+
+class RoutedAgent(BaseAgent):
+    """Agent whose fast model always fails the quality check"""
+
+    def __init__(self):
+        super().__init__("routed", model="main-model", fast_model="fast-model")
+        self.models = []
+
+    def get_system_prompt(self) -> str:
+        return ""
+
+    async def process_request(self, request):
+        return await self.generate_json("prompt", Answer)
+
+    async def generate_text(self, prompt, model=None, response_model=None, accept=None):
+        self.models.append(model)
+        return '{"value": 1}'
+
+    def check_output_quality(self, data):
+        return False
+
+def run_in_stage(agent: RoutedAgent, timeout: float):
+    async def run():
+        graph = StageGraph([Stage("answer", lambda inputs: agent.process_request({}), timeout=timeout)])
+        return (await graph.run()).results["answer"]
+    return asyncio.run(run())
+
+def test_escalates_when_the_stage_has_time_for_the_main_model():
+    agent = RoutedAgent()
+    assert run_in_stage(agent, timeout=settings.escalation_expected_latency + 5) == {"value": 1}
+    assert agent.models == ["fast-model", "main-model"]
+
+def test_skips_escalation_when_the_stage_budget_is_too_short():
+    agent = RoutedAgent()
+    assert run_in_stage(agent, timeout=settings.escalation_expected_latency / 2) is None
+    assert agent.models == ["fast-model"]
+
+class QualityCheckedAgent(BaseAgent):
+    """Agent whose quality check rejects zero"""
+
+    def __init__(self):
+        super().__init__("quality_checked", model="main-model", fast_model="fast-model")
+
+    def get_system_prompt(self) -> str:
+        return ""
+
+    async def process_request(self, request):
+        return await self.generate_json("prompt", Answer)
+
+    def check_output_quality(self, data):
+        return data["value"] != 0
+
+def test_fast_model_rejection_is_not_replayed(scripted_gemini):
+    calls = scripted_gemini(['{"value": 0}', '{"value": 1}', '{"value": 2}', '{"value": 3}'])
+    agent = QualityCheckedAgent()
+
+    async def run():
+        return [await agent.process_request({}) for _ in range(3)]
+
+    # Only the first request escalates; the accepted fast answer is then cached
+    assert asyncio.run(run()) == [{"value": 1}, {"value": 2}, {"value": 2}]
+    assert calls == ["fast-model", "main-model", "fast-model"]
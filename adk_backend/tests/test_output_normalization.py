@@ -0,0 +1,82 @@
+"""
+Out-of-range model output must not break the meal plan
+
+Gemini can return schema-valid values outside the ranges the result models
+accept, such as a confidence of 85 or a free-form date.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict
+
+from app.agents.meal_theme_agent import MealThemeAgent
+from app.devtools.benchmark import StubModel, stubbed_model, synthetic_fridge
+from app.models.schemas import (
+    MealPlanningRequest, RecipeSuggestionOutput, UnifiedMealPlanOutput, UserPreferences
+)
+from app.services.meal_planning_service import MealPlanningService
+
+OUT_OF_RANGE = {
+    "confidence": 85.0,
+    "nutrition_score": 140.0,
+    "efficiency_score": -5.0,
+    "total_cooking_time": 0,
+    "date": "今日の夕食",
+}
+
+def _out_of_range(value: Any) -> Any:
+    """Replace every known bounded field in a sampled response"""
+    if isinstance(value, dict):
+        return {key: OUT_OF_RANGE.get(key, _out_of_range(item)) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_out_of_range(item) for item in value]
+    return value
+
+class OutOfRangeStub(StubModel):
+    """Stub model whose responses carry out-of-range numbers and dates"""
+
+    async def __call__(self, generative_model, prompt, generation_config, request_options):
+        response = await super().__call__(generative_model, prompt, generation_config, request_options)
+        if response.text.startswith("{"):
+            response.text = json.dumps(_out_of_range(json.loads(response.text)), ensure_ascii=False)
+        return response
+
+def _dish() -> Dict[str, Any]:
+    return {"name": "肉じゃが"}
+
+def test_output_models_normalize_out_of_range_values():
+    suggestion = RecipeSuggestionOutput(
+        main_dish=_dish(), side_dish=_dish(), soup=_dish(), rice=_dish(),
+        total_cooking_time=0, difficulty="easy", nutrition_score=140.0, confidence=85.0
+    )
+    assert suggestion.confidence == 0.85
+    assert suggestion.nutrition_score == 100.0
+    assert suggestion.total_cooking_time == 1
+
+    unified = UnifiedMealPlanOutput(date="今日の夕食", confidence=-0.5)
+    assert unified.date is None
+    assert unified.confidence == 0.0
+    assert UnifiedMealPlanOutput(date="2025-01-31").date == "2025-01-31T00:00:00"
+
+def test_unified_meal_plan_tolerates_raw_out_of_range_data():
+    agent = MealThemeAgent()
+    plan = agent._create_unified_meal_plan([], dict(OUT_OF_RANGE))
+    assert plan.confidence == 0.85
+    assert plan.nutrition_score == 100.0
+    assert plan.total_cooking_time == 1
+
+def test_pipeline_succeeds_with_out_of_range_model_output():
+    request = MealPlanningRequest(
+        refrigerator_items=synthetic_fridge(10),
+        household_id="test",
+        user_preferences=UserPreferences()
+    )
+
+    async def run():
+        with stubbed_model(OutOfRangeStub(seed=1)):
+            service = MealPlanningService()
+            return await service.execute_meal_plan(request, generate_images=False)
+
+    execution = asyncio.run(run())
+    assert execution.meal_plan.confidence == 0.85
+    assert 0 <= execution.meal_plan.nutrition_score <= 100
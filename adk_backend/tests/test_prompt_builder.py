@@ -0,0 +1,76 @@
+"""
+Token-budgeted ingredient lists in prompts
+"""
+
+from datetime import datetime
+
+from app.core.prompt_builder import build_ingredient_section, estimate_tokens, merge_duplicates, rank_ingredients
+from app.models.schemas import ExpiryPriority, Ingredient
+
+def ingredient(name, quantity="1", unit="個", priority=ExpiryPriority.FRESH, category="野菜", **kwargs) -> Ingredient:
+    return Ingredient(name=name, quantity=quantity, unit=unit, priority=priority, category=category, **kwargs)
+
+def format_line(item: Ingredient) -> str:
+    return f"- {item.name}: {item.quantity}{item.unit}"
+
+def test_duplicates_add_up_quantities_and_keep_the_most_urgent_entry():
+    merged = merge_duplicates([
+        ingredient("にんじん", "2", priority=ExpiryPriority.FRESH),
+        ingredient("にんじん ", "1", priority=ExpiryPriority.URGENT, notes="早めに"),
+        ingredient("ｷｬﾍﾞﾂ", "1"),
+        ingredient("キャベツ", "0.5"),
+        ingredient("玉ねぎ"),
+    ])
+
+    by_name = {item.name: item for item in merged}
+    assert len(merged) == 3
+    assert by_name["にんじん "].quantity == "3"
+    assert by_name["にんじん "].priority == ExpiryPriority.URGENT
+    assert by_name["にんじん "].notes == "早めに"
+    # Half-width katakana is the same name
+    assert [item.quantity for item in merged if item.name in ("ｷｬﾍﾞﾂ", "キャベツ")] == ["1.5"]
+
+def test_quantities_in_different_units_are_listed_instead_of_added():
+    merged = merge_duplicates([ingredient("豚肉", "200", "g"), ingredient("豚肉", "1", "パック")])
+    assert (merged[0].quantity, merged[0].unit) == ("200g+1パック", "")
+
+def test_ranking_puts_urgent_and_earliest_expiry_first():
+    ranked = rank_ingredients([
+        ingredient("卵"),
+        ingredient("牛乳", priority=ExpiryPriority.SOON, expiry_date=datetime(2025, 1, 3)),
+        ingredient("豆腐", priority=ExpiryPriority.SOON, expiry_date=datetime(2025, 1, 2)),
+        ingredient("鶏肉", priority=ExpiryPriority.URGENT),
+    ])
+    assert [item.name for item in ranked] == ["鶏肉", "豆腐", "牛乳", "卵"]
+
+def test_small_fridge_is_listed_in_full():
+    items = [ingredient(f"食材{index}") for index in range(5)]
+    section = build_ingredient_section(items, format_line, agent="test", token_budget=1000, max_items=100)
+    assert section.included == section.total == 5
+    assert section.omitted == 0
+    assert not any(line.startswith("※") for line in section.lines)
+
+def test_large_fridge_stays_within_the_token_budget():
+    items = [ingredient(f"食材{index:03d}", category=f"分類{index % 3}") for index in range(300)]
+    section = build_ingredient_section(items, format_line, agent="test", token_budget=200, max_items=1000)
+
+    assert 0 < section.included < 300
+    assert section.estimated_tokens <= 200
+    assert section.estimated_tokens == estimate_tokens(section.text)
+
+def test_omitted_ingredients_are_summarized_by_category():
+    urgent = [ingredient(f"急ぎ{index}", priority=ExpiryPriority.URGENT, category="肉類") for index in range(3)]
+    rest = [ingredient(f"野菜{index}", category="野菜") for index in range(4)] + \
+        [ingredient(f"乳{index}", category="乳製品", priority=ExpiryPriority.SOON) for index in range(2)]
+    section = build_ingredient_section(urgent + rest, format_line, agent="test", token_budget=1000, max_items=3)
+
+    # The urgent ingredients are listed; the rest only counted
+    assert section.lines[:3] == [format_line(item) for item in urgent]
+    assert section.omitted == 6
+    assert section.lines[-1] == "※ほか6品（野菜 4品、乳製品 2品、うち期限間近 2品）"
+
+def test_merged_duplicates_are_counted():
+    items = [ingredient("卵", "6"), ingredient("卵", "4"), ingredient("牛乳")]
+    section = build_ingredient_section(items, format_line, agent="test", token_budget=1000, max_items=100)
+    assert section.duplicates_merged == 1
+    assert "- 卵: 10個" in section.lines
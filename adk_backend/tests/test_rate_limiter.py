@@ -0,0 +1,49 @@
+"""
+Slot accounting of the outbound Gemini rate limiter
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.exceptions import RateLimitExceededError
+from app.core.rate_limiter import ModelRateLimiter
+
+def make_limiter(max_wait: float) -> ModelRateLimiter:
+    return ModelRateLimiter("test-model", requests_per_window=100, window=1.0, max_concurrency=1, max_wait=max_wait)
+
+def test_queue_timeout_does_not_keep_a_slot():
+    async def run():
+        limiter = make_limiter(max_wait=0.02)
+
+        async def hold(seconds):
+            async with limiter.slot():
+                await asyncio.sleep(seconds)
+
+        holder = asyncio.create_task(hold(0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimitExceededError):
+            async with limiter.slot():
+                pass
+        await holder
+        await asyncio.sleep(0)
+        assert not limiter._slots.locked()
+
+        async with limiter.slot():
+            pass
+
+    asyncio.run(run())
+
+def test_cancelled_waiter_does_not_keep_a_slot():
+    async def run():
+        limiter = make_limiter(max_wait=1.0)
+        async with limiter.slot():
+            waiter = asyncio.create_task(limiter.slot().__aenter__())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        assert not limiter._slots.locked()
+
+    asyncio.run(run())
@@ -0,0 +1,132 @@
+"""
+Recipe suggestion cache keyed on fridge signatures
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import app.core.recipe_cache as recipe_cache_module
+from app.core.recipe_cache import FridgeSignature, RecipeSuggestionCache
+from app.models.schemas import (
+    ExpiryPriority, Ingredient, IngredientAnalysisResult, NutritionAnalysisResult,
+    RecipeSuggestionRequest, UserPreferences
+)
+
+URGENT, SOON, FRESH = ExpiryPriority.URGENT, ExpiryPriority.SOON, ExpiryPriority.FRESH
+
+BASE_FRIDGE = [
+    ("豚肉", "200", URGENT, "肉類"),
+    ("キャベツ", "1", URGENT, "野菜"),
+    ("玉ねぎ", "2", SOON, "野菜"),
+    ("にんじん", "1", SOON, "野菜"),
+    ("豆腐", "1", SOON, "大豆製品"),
+    ("卵", "6", FRESH, "卵"),
+    ("牛乳", "1", FRESH, "乳製品"),
+]
+
+def request_for(fridge: List[Tuple[str, str, ExpiryPriority, str]], **kwargs) -> RecipeSuggestionRequest:
+    ingredients = [
+        Ingredient(name=name, quantity=quantity, unit="個", priority=priority, category=category)
+        for name, quantity, priority, category in fridge
+    ]
+    return RecipeSuggestionRequest(
+        ingredient_analysis=IngredientAnalysisResult(
+            analyzed_ingredients=ingredients, priority_ingredients=[], expiring_soon=[], recommendations=[]
+        ),
+        nutrition_analysis=NutritionAnalysisResult(
+            nutrition_score=70, recommended_nutrients={}, warnings=[], suggestions=[]
+        ),
+        user_preferences=kwargs.pop("user_preferences", UserPreferences()),
+        **kwargs
+    )
+
+def signature(fridge, **kwargs) -> FridgeSignature:
+    return FridgeSignature.from_request(request_for(fridge, **kwargs))
+
+def make_cache(**kwargs) -> RecipeSuggestionCache:
+    return RecipeSuggestionCache(similarity_threshold=0.85, redis_url=None, **kwargs)
+
+def lookup_after_store(stored: FridgeSignature, looked_up: FridgeSignature, cache=None):
+    cache = cache or make_cache()
+
+    async def run():
+        await cache.store(stored, {"main_dish": "回鍋肉"})
+        return await cache.lookup(looked_up)
+
+    return asyncio.run(run())
+
+def test_identical_fridge_has_similarity_one():
+    assert signature(BASE_FRIDGE).similarity(signature(BASE_FRIDGE)) == 1.0
+
+def test_near_match_with_other_quantities_and_an_extra_fresh_item_hits():
+    near = [(name, "999", priority, category) for name, _, priority, category in BASE_FRIDGE]
+    near.append(("ピーマン", "3", FRESH, "野菜"))
+    assert signature(BASE_FRIDGE).similarity(signature(near)) >= 0.85
+    assert lookup_after_store(signature(BASE_FRIDGE), signature(near)) == {"main_dish": "回鍋肉"}
+
+def test_names_are_normalized():
+    widths = [("ｷｬﾍﾞﾂ" if name == "キャベツ" else name, quantity, priority, category)
+              for name, quantity, priority, category in BASE_FRIDGE]
+    assert signature(BASE_FRIDGE).similarity(signature(widths)) == 1.0
+
+def test_fridge_with_other_urgent_ingredients_misses():
+    other = [
+        ("鮭", "2", URGENT, "魚介類"),
+        ("ほうれん草", "1", URGENT, "野菜"),
+        ("しめじ", "1", SOON, "きのこ"),
+        ("卵", "6", FRESH, "卵"),
+    ]
+    assert signature(BASE_FRIDGE).similarity(signature(other)) < 0.85
+    assert lookup_after_store(signature(BASE_FRIDGE), signature(other)) is None
+
+def test_one_changed_priority_ingredient_is_below_the_threshold():
+    # Jaccard 4/6 on the priority ingredients, identical category histogram
+    changed = [("鶏肉" if name == "豚肉" else name, quantity, priority, category)
+               for name, quantity, priority, category in BASE_FRIDGE]
+    similarity = signature(BASE_FRIDGE).similarity(signature(changed))
+    assert abs(similarity - (0.7 * 4 / 6 + 0.3)) < 1e-9
+    assert lookup_after_store(signature(BASE_FRIDGE), signature(changed)) is None
+
+def test_changed_priority_of_an_ingredient_misses():
+    ripened = [(name, quantity, URGENT if name == "玉ねぎ" else priority, category)
+               for name, quantity, priority, category in BASE_FRIDGE]
+    assert lookup_after_store(signature(BASE_FRIDGE), signature(ripened)) is None
+
+def test_changed_preferences_miss_even_for_the_same_fridge():
+    stored = signature(BASE_FRIDGE)
+    for kwargs in (
+        {"user_preferences": UserPreferences(allergies=["卵"])},
+        {"variation_hint": "和食以外で"},
+        {"avoid_dishes": ["回鍋肉"]},
+    ):
+        assert lookup_after_store(stored, signature(BASE_FRIDGE, **kwargs)) is None
+
+def test_entries_expire_when_the_date_changes(monkeypatch):
+    cache = make_cache()
+
+    class Tomorrow(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(days=1)
+
+    async def run():
+        await cache.store(signature(BASE_FRIDGE), {"main_dish": "回鍋肉"})
+        monkeypatch.setattr(recipe_cache_module, "datetime", Tomorrow)
+        return await cache.lookup(signature(BASE_FRIDGE))
+
+    assert asyncio.run(run()) is None
+
+def test_bucket_keeps_only_the_most_recent_entries():
+    cache = make_cache(bucket_size=2)
+    fridges = [
+        [(f"食材{index}", "1", URGENT, "野菜"), (f"副材{index}", "1", SOON, "肉類")]
+        for index in range(3)
+    ]
+
+    async def run():
+        for index, fridge in enumerate(fridges):
+            await cache.store(signature(fridge), {"main_dish": f"料理{index}"})
+        return [await cache.lookup(signature(fridge)) for fridge in fridges]
+
+    assert asyncio.run(run()) == [None, {"main_dish": "料理1"}, {"main_dish": "料理2"}]
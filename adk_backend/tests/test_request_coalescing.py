@@ -0,0 +1,46 @@
+"""
+Single-flight coalescing of identical agent requests
+"""
+
+import asyncio
+
+from app.agents.base_agent import BaseAgent
+
+class SlowAgent(BaseAgent):
+    """Agent that echoes its request after a delay"""
+
+    def __init__(self):
+        super().__init__("slow_echo")
+        self.calls = 0
+
+    def get_system_prompt(self) -> str:
+        return ""
+
+    async def process_request(self, request):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        return request["value"]
+
+def test_request_after_last_waiter_cancels_starts_a_new_call():
+    async def run():
+        agent = SlowAgent()
+        first = asyncio.create_task(agent.process({"value": 1}))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # The shared call is still cancelling when the identical request arrives
+        await asyncio.sleep(0)
+        return agent, await agent.process({"value": 1})
+
+    agent, result = asyncio.run(run())
+    assert result == 1
+    assert agent.calls == 2
+
+def test_identical_concurrent_requests_share_one_call():
+    async def run():
+        agent = SlowAgent()
+        results = await asyncio.gather(*(agent.process({"value": 2}) for _ in range(3)))
+        return agent, results
+
+    agent, results = asyncio.run(run())
+    assert results == [2, 2, 2]
+    assert agent.calls == 1
@@ -0,0 +1,72 @@
+"""
+LLM response caching in BaseAgent
+"""
+
+import asyncio
+
+from pydantic import BaseModel
+
+from app.agents.base_agent import BaseAgent
+from app.core.cache import ResponseCache
+
+class Answer(BaseModel):
+    value: int
+
+class JsonAgent(BaseAgent):
+    """Agent asking the main model for one Answer"""
+
+    def __init__(self):
+        super().__init__("cached_json", model="main-model")
+
+    def get_system_prompt(self) -> str:
+        return ""
+
+    async def process_request(self, request):
+        return await self.generate_json("prompt", Answer)
+
+def test_unparseable_response_is_not_cached(scripted_gemini):
+    calls = scripted_gemini(["申し訳ありませんが、お答えできません。", '{"value": 2}'])
+    agent = JsonAgent()
+
+    async def run():
+        return [await agent.process_request({}) for _ in range(3)]
+
+    assert asyncio.run(run()) == [None, {"value": 2}, {"value": 2}]
+    # The refusal was asked again; the valid answer was then served from the cache
+    assert calls == ["main-model", "main-model"]
+
+def test_cache_key_depends_on_the_response_format():
+    cache = ResponseCache(redis_url=None)
+    keys = {
+        cache.make_key("main-model", 0.5, 100, "prompt", response_format=response_format)
+        for response_format in ("text", "json", "schema-0123456789abcdef", "schema-fedcba9876543210")
+    }
+    assert len(keys) == 4
+
+def test_text_and_json_calls_do_not_share_an_entry(scripted_gemini):
+    calls = scripted_gemini(["plain text", '{"value": 3}'])
+    agent = JsonAgent()
+
+    async def run():
+        text = await agent.generate_text("prompt")
+        return text, await agent.generate_json("prompt", Answer)
+
+    assert asyncio.run(run()) == ("plain text", {"value": 3})
+    assert len(calls) == 2
+
+class FastJsonAgent(JsonAgent):
+    """JsonAgent that tries a fast model first"""
+
+    def __init__(self):
+        BaseAgent.__init__(self, "cached_fast_json", model="main-model", fast_model="fast-model")
+
+def test_fast_model_schema_mismatch_is_not_cached(scripted_gemini):
+    calls = scripted_gemini(['{"value": "多い"}', '{"value": 1}', '{"value": 2}'])
+    agent = FastJsonAgent()
+
+    async def run():
+        return [await agent.process_request({}) for _ in range(2)]
+
+    # The mismatch escalated once; the next request asked the fast model afresh
+    assert asyncio.run(run()) == [{"value": 1}, {"value": 2}]
+    assert calls == ["fast-model", "main-model", "fast-model"]
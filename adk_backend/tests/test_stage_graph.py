@@ -0,0 +1,132 @@
+"""
+Dependency-graph executor for multi-agent pipelines
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.stage_graph import Stage, StageGraph, stage_time_left
+
+def run(graph: StageGraph, **kwargs):
+    return asyncio.run(graph.run(**kwargs))
+
+def value(result):
+    async def func(inputs):
+        return result
+    return func
+
+def sleeping(seconds, result=None):
+    async def func(inputs):
+        await asyncio.sleep(seconds)
+        return result
+    return func
+
+def failing(inputs):
+    raise RuntimeError("boom")
+
+async def failing_stage(inputs):
+    failing(inputs)
+
+def test_stages_start_after_their_dependencies_and_receive_their_results():
+    started = []
+
+    def recording(name, result):
+        async def func(inputs):
+            started.append(name)
+            await asyncio.sleep(0.01)
+            return result(inputs)
+        return func
+
+    graph = StageGraph([
+        Stage("total", recording("total", lambda inputs: inputs["a"] + inputs["b"]), depends_on=("a", "b")),
+        Stage("a", recording("a", lambda inputs: 1)),
+        Stage("b", recording("b", lambda inputs: 2)),
+    ])
+    result = run(graph)
+
+    assert result.results == {"a": 1, "b": 2, "total": 3}
+    assert started[-1] == "total"
+
+def test_independent_stages_run_concurrently():
+    graph = StageGraph([Stage(name, sleeping(0.1, name)) for name in ("a", "b", "c")])
+    result = run(graph)
+    assert result.total_time < 0.25
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    with pytest.raises(ValueError, match="Cycle"):
+        StageGraph([Stage("a", value(1), depends_on=("b",)), Stage("b", value(2), depends_on=("a",))])
+    with pytest.raises(ValueError, match="unknown stage"):
+        StageGraph([Stage("a", value(1), depends_on=("missing",))])
+
+def test_failed_optional_stage_skips_its_dependents():
+    graph = StageGraph([
+        Stage("flaky", failing_stage, optional=True),
+        Stage("after", value("ran"), depends_on=("flaky",), optional=True),
+        Stage("independent", value("ran")),
+    ])
+    result = run(graph)
+
+    assert result.errors["flaky"] == "boom"
+    assert result.errors["after"].startswith("Skipped: dependency failed (flaky)")
+    assert result.results == {"flaky": None, "after": None, "independent": "ran"}
+
+def test_failed_required_stage_fails_the_graph():
+    graph = StageGraph([Stage("broken", failing_stage), Stage("after", value(1), depends_on=("broken",))])
+    with pytest.raises(RuntimeError, match="boom"):
+        run(graph)
+
+def test_stage_over_its_timeout_uses_its_fallback():
+    graph = StageGraph([
+        Stage("slow", sleeping(1.0, "model"), timeout=0.05, fallback=value("fallback")),
+        Stage("after", lambda inputs: value(inputs["slow"])(inputs), depends_on=("slow",)),
+    ])
+    result = run(graph)
+
+    assert result.results["slow"] == "fallback"
+    assert result.results["after"] == "fallback"
+    assert result.degraded["slow"].startswith("timed out after 0.05")
+
+def test_stage_over_its_timeout_without_fallback_fails():
+    graph = StageGraph([Stage("slow", sleeping(1.0), timeout=0.05, optional=True)])
+    result = run(graph)
+    assert "timed out" in result.errors["slow"]
+
+def test_budget_is_clamped_to_the_remaining_deadline():
+    time_left = {}
+
+    async def measure(inputs):
+        time_left["second"] = stage_time_left()
+        await asyncio.sleep(1.0)
+
+    graph = StageGraph([
+        Stage("first", sleeping(0.1, "done"), timeout=5.0),
+        Stage("second", measure, depends_on=("first",), timeout=5.0, fallback=value("fallback")),
+    ])
+    result = run(graph, deadline=0.3)
+
+    # 5s stage timeout, but only about 0.2s of the deadline was left
+    assert 0.1 < time_left["second"] <= 0.2
+    assert result.results == {"first": "done", "second": "fallback"}
+    assert result.total_time < 0.5
+
+def test_exhausted_deadline_falls_back_before_starting_but_spares_local_stages():
+    graph = StageGraph([
+        # Local stages have no timeout, so the deadline does not cut them off
+        Stage("local", sleeping(0.2, "local")),
+        Stage("model", value("model"), depends_on=("local",), timeout=5.0, fallback=value("fallback")),
+        Stage("after", value("after"), depends_on=("local",)),
+    ])
+    result = run(graph, deadline=0.1)
+
+    assert result.results == {"local": "local", "model": "fallback", "after": "after"}
+    assert result.degraded == {"model": "deadline exceeded before start"}
+
+def test_stage_time_left_is_none_outside_a_budgeted_stage():
+    observed = {}
+
+    async def local(inputs):
+        observed["local"] = stage_time_left()
+
+    run(StageGraph([Stage("local", local)]))
+    assert observed["local"] is None
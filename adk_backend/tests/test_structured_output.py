@@ -0,0 +1,35 @@
+"""
+Tolerant parsing of JSON objects in model responses
+"""
+
+import pytest
+
+from app.core.structured_output import parse_json_object
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1, "b": [1, 2]}', {"a": 1, "b": [1, 2]}),
+    ('はい、こちらです。\n{"a": 1}\n以上です。', {"a": 1}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+])
+def test_well_formed_objects_are_not_repaired(text, expected):
+    assert parse_json_object(text) == (expected, False)
+
+@pytest.mark.parametrize("text, expected", [
+    # Trailing commas
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ('```json\n{"a": 1, "b": [1,]}\n```', {"a": 1, "b": [1]}),
+    # Prose after the object that contains another brace
+    ('{"a": 1} 補足: {"b": 2}', {"a": 1}),
+    # Truncated: every complete value before the cut is kept
+    ('{"a": "x", "b": "途中で切れ', {"a": "x"}),
+    ('{"a": 1, "b": {"c": 2, "d"', {"a": 1, "b": {"c": 2}}),
+    # A number at the very end may itself be cut short
+    ('{"a": 1, "b": [1, 2', {"a": 1, "b": [1]}),
+    ('{"a": "x", "b": tru', {"a": "x"}),
+])
+def test_malformed_objects_are_repaired(text, expected):
+    assert parse_json_object(text) == (expected, True)
+
+@pytest.mark.parametrize("text", [None, "", "申し訳ありませんが、お答えできません。", "[1, 2, 3]"])
+def test_responses_without_an_object_give_none(text):
+    assert parse_json_object(text) == (None, False)